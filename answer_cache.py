@@ -0,0 +1,170 @@
+# answer_cache.py
+"""
+rag.answer_question önündeki iki katmanlı cevap önbelleği.
+- Tam eşleşme katmanı: (normalleştirilmiş soru, top_k, temperature, bağlam sınırı, indeks sürümü).
+- Anlamsal katman: aynı parametrelerle sorulmuş bir sorunun embedding'ine kosinüs benzerliği
+  eşiği (cfg.ANSWER_CACHE_SIM) geçen yeni sorular aynı cevabı alır.
+Her iki katmanda TTL ve LRU tahliyesi vardır; indeks sürümü değişince önbellek tamamen boşaltılır.
+"""
+
+from __future__ import annotations
+import re, copy, time, threading, unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import cfg
+
+Params = Tuple[int, float, int]   # (top_k, temperature, max_context_tokens)
+
+
+def normalize_query(q: str) -> str:
+    q = unicodedata.normalize("NFC", q or "").casefold()
+    q = re.sub(r"[^\w\s]", " ", q)
+    return re.sub(r"\s+", " ", q).strip()
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        max_items: int = cfg.ANSWER_CACHE_SIZE,
+        ttl: float = cfg.ANSWER_CACHE_TTL,
+        sim_threshold: float = cfg.ANSWER_CACHE_SIM,
+    ) -> None:
+        """
+        :param max_items: Her katmandaki en fazla kayıt (LRU).
+        :param ttl: Kaydın geçerlilik süresi (sn); <= 0 ise süresiz.
+        :param sim_threshold: Anlamsal katman için en düşük kosinüs benzerliği.
+        """
+        self.max_items = max(1, int(max_items))
+        self.ttl = float(ttl)
+        self.sim_threshold = float(sim_threshold)
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        # tam: (norm soru, params) -> (zaman, cevap)
+        self._exact: "OrderedDict[Tuple[str, Params], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # anlamsal: anahtar -> (zaman, params, birim vektör, cevap)
+        self._sem: "OrderedDict[Tuple[str, Params], Tuple[float, Params, np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._mat: Optional[np.ndarray] = None
+        self._mat_keys: List[Tuple[str, Params]] = []
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ---- yardımcılar ----
+    def _expired(self, ts: float, now: float) -> bool:
+        return self.ttl > 0 and now - ts > self.ttl
+
+    def _check_version(self, version: str) -> None:
+        if self._version != version:
+            if self._version is not None:
+                self.invalidations += 1
+            self._exact.clear(); self._sem.clear()
+            self._mat, self._mat_keys = None, []
+            self._version = version
+
+    def _matrix(self) -> Tuple[Optional[np.ndarray], List[Tuple[str, Params]]]:
+        if self._mat is None and self._sem:
+            self._mat_keys = list(self._sem)
+            self._mat = np.stack([self._sem[k][2] for k in self._mat_keys])
+        return self._mat, self._mat_keys
+
+    @staticmethod
+    def _unit(vec: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n else v
+
+    @staticmethod
+    def _out(resp: Dict[str, Any]) -> Dict[str, Any]:
+        return copy.deepcopy(resp)
+
+    # ---- okuma ----
+    def get_exact(self, query: str, params: Params, version: str) -> Optional[Dict[str, Any]]:
+        key = (normalize_query(query), params)
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            item = self._exact.get(key)
+            if item is None or self._expired(item[0], now):
+                if item is not None:
+                    del self._exact[key]
+                return None
+            self._exact.move_to_end(key)
+            self.exact_hits += 1
+            return self._out(item[1])
+
+    def get_semantic(self, qvec: Sequence[float], params: Params, version: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            mat, keys = self._matrix()
+            if mat is None:
+                self.misses += 1
+                return None
+            sims = mat @ self._unit(qvec)
+            for i in np.argsort(-sims):
+                if sims[i] < self.sim_threshold:
+                    break
+                key = keys[i]
+                item = self._sem.get(key)
+                if item is None or item[1] != params or self._expired(item[0], now):
+                    continue
+                self._sem.move_to_end(key)
+                self.semantic_hits += 1
+                return self._out(item[3])
+            self.misses += 1
+            return None
+
+    # ---- yazma ----
+    def put(self, query: str, qvec: Optional[Sequence[float]], params: Params, version: str,
+            resp: Dict[str, Any]) -> None:
+        key = (normalize_query(query), params)
+        now = time.time()
+        stored = self._out(resp)
+        with self._lock:
+            self._check_version(version)
+            self._exact[key] = (now, stored)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_items:
+                self._exact.popitem(last=False)
+            if qvec is not None:
+                self._sem[key] = (now, params, self._unit(qvec), stored)
+                self._sem.move_to_end(key)
+                while len(self._sem) > self.max_items:
+                    self._sem.popitem(last=False)
+                self._mat = None   # bir sonraki anlamsal aramada yeniden kurulur
+
+    def clear(self) -> None:
+        with self._lock:
+            self._exact.clear(); self._sem.clear()
+            self._mat, self._mat_keys = None, []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "requests": total,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "exact_hit_rate": round(self.exact_hits / total, 4) if total else 0.0,
+                "semantic_hit_rate": round(self.semantic_hits / total, 4) if total else 0.0,
+                "hit_rate": round((self.exact_hits + self.semantic_hits) / total, 4) if total else 0.0,
+                "entries": len(self._exact),
+                "invalidations": self.invalidations,
+            }
+
+
+_shared: Optional[AnswerCache] = None
+_shared_lock = threading.Lock()
+
+def get_answer_cache() -> AnswerCache:
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = AnswerCache()
+    return _shared
@@ -2,16 +2,17 @@
 # — Ak-Koç — GenAI Destekli Genç Kart Koçu (Streamlit) —
 import os
 import traceback
-import pandas as pd
 import streamlit as st
 
 from config import cfg
-from rag import answer_question
-from rules import detect_recurring, risk_check
+from rag import answer_question_stream, FLIGHTS
+from risk_stream import RiskStream
+import tx_store
 
 # Opsiyonel: iç teşhis için
 from retriever import get_collection, search
-from ingest import ingest_docs
+from telemetry import get_aggregator
+# ingest (pypdf, çıkarma süreç havuzu, dedup) yalnızca Reindex'e basılınca yüklenir
 
 st.set_page_config(
     page_title="Ak-Koç — Genç Kart Koçu",
@@ -21,13 +22,34 @@ st.set_page_config(
 
 # ----------------------------- Yardımcılar -----------------------------
 def _load_tx():
+    """İşlemler: sütunsal depo (varsa ve CSV'den eski değilse) ya da CSV; ikisi de değişmedikçe önbellekten."""
     path = os.path.join("data", "transactions.csv")
-    if not os.path.exists(path):
-        return None, path
     try:
-        return pd.read_csv(path), path
+        store = cfg.TX_STORE_DIR
+        if tx_store.available() and tx_store.exists(store) and not tx_store.stale(store, path):
+            return tx_store.load(store), store
+        if os.path.exists(path):
+            return tx_store.read_csv(path), path   # tarih bir kez çözülür (kurallar tekrar çözmez)
     except Exception:
-        return None, path
+        pass
+    return None, path
+
+@st.cache_resource
+def _risk_stream():
+    return RiskStream.load(cfg.RISK_STATE_PATH)   # yeniden başlatmada anlık görüntüden devam
+
+def _latest(df, n: int = 25):
+    """En son eklenen n işlem (depo bölüm sırasıyla döner; yazım sırası seq sütunundadır)."""
+    if "seq" in df.columns:
+        return df.nlargest(n, "seq").sort_values("seq")
+    return df.tail(n)
+
+def _tx_state(df):
+    """Kurallar ve abonelikler için akış durumu: yalnızca yeni eklenen işlemler işlenir."""
+    rs = _risk_stream()
+    if rs.sync(df):
+        rs.save(cfg.RISK_STATE_PATH)
+    return rs
 
 def _pill(text: str):
     st.markdown(
@@ -54,9 +76,10 @@ st.sidebar.caption("RAG kaynakları için `data/docs/` klasörüne PDF/TXT ekley
 if st.sidebar.button("🔄 İndeksi Tekrar Kur (Reindex)", use_container_width=True):
     with st.spinner("İndeks tekrar kuruluyor..."):
         try:
+            from ingest import ingest_docs
             added = ingest_docs(verbose=True)
             col = get_collection()
-            _notice(f"İndeks güncellendi. Eklenen parça: **{added}** | Toplam kayıt: **{col.count()}**", "success")
+            _notice(f"İndeks güncellendi. Yazılan (yeni/değişen) parça: **{added}** | Toplam kayıt: **{col.count()}**", "success")
         except Exception as e:
             st.sidebar.error("Reindex sırasında hata!")
             st.sidebar.code(traceback.format_exc())
@@ -68,6 +91,17 @@ try:
 except Exception:
     st.sidebar.markdown("**📊 Kayıt sayısı:** —")
 
+# İzleme modu (python ingest.py --watch) çalışıyorsa durumunu göster
+_watch_status = os.path.join(cfg.ROOT_DIR, ".cache", "watch_status.json")
+if os.path.exists(_watch_status):
+    try:
+        import json
+        with open(_watch_status, "r", encoding="utf-8") as f:
+            _ws = json.load(f)
+        st.sidebar.caption(f"👀 İzleme: kuyruk **{_ws.get('queue_depth', 0)}** | gecikme **{_ws.get('lag_seconds', 0)} sn**")
+    except Exception:
+        pass
+
 # ----------------------------- Başlık -----------------------------
 st.title("💳 Ak-Koç — GenAI Destekli Genç Kart Koçu")
 st.caption("RAG + Koçluk Kuralları + Streamlit arayüz")
@@ -96,27 +130,38 @@ with tab_chat:
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Model cevabı
+        # Model cevabı (akış: önce kaynaklar, sonra model ürettikçe cevap parçaları)
         with st.chat_message("assistant"):
-            with st.spinner("Yanıt üretiliyor..."):
-                try:
-                    resp = answer_question(prompt.strip(), top_k=top_k, temperature=temperature)
-                except Exception:
-                    st.error("Cevap üretirken hata oluştu.")
-                    st.code(traceback.format_exc())
-                    resp = {"answer": "Üzgünüm, şu an cevap üretilemiyor.", "sources": []}
-
-            st.markdown("### 🧠 Yanıt")
-            st.write(resp.get("answer", ""))
-
-            # Kaynaklar
-            sources = resp.get("sources") or []
-            if sources:
-                st.markdown("### 📚 Kaynaklar")
-                for s in sources:
-                    _pill(f"{s['title']} (chunk {s['chunk']})")
-            else:
-                st.info("Kaynak bulunamadı. Muhtemel nedenler: indeks boş veya farklı dizin. Yan menüden **Reindex** deneyin.")
+            resp = {"answer": "Üzgünüm, şu an cevap üretilemiyor.", "sources": []}
+            try:
+                with st.spinner("Kaynaklar aranıyor..."):
+                    events = answer_question_stream(prompt.strip(), top_k=top_k, temperature=temperature)
+                    first = next(events)
+
+                # Kaynaklar
+                sources = first.get("sources") or []
+                if sources:
+                    st.markdown("### 📚 Kaynaklar")
+                    for s in sources:
+                        _pill(f"{s['title']} (chunk {s['chunk']})")
+                else:
+                    st.info("Kaynak bulunamadı. Muhtemel nedenler: indeks boş veya farklı dizin. Yan menüden **Reindex** deneyin.")
+
+                def _deltas():
+                    for ev in events:
+                        if ev["type"] == "delta":
+                            yield ev["text"]
+                        elif ev["type"] == "done":
+                            resp.update(ev["response"])
+
+                st.markdown("### 🧠 Yanıt")
+                st.write_stream(_deltas())
+                ttft = resp.get("meta", {}).get("ttft_ms")
+                if ttft is not None:
+                    st.caption(f"⚡ İlk yanıt: {ttft:.0f} ms")
+            except Exception:
+                st.error("Cevap üretirken hata oluştu.")
+                st.code(traceback.format_exc())
 
         # Cevabı state’e ekle
         st.session_state.chat.append(("assistant", resp.get("answer", "")))
@@ -130,6 +175,8 @@ with tab_chat:
                 {"title": h["meta"].get("title"), "chunk": h["meta"].get("chunk")}
                 for h in sample
             ])
+            st.write("⏱️ Aşama gecikmeleri (ms, p50/p95/p99):", get_aggregator().percentiles("rag"))
+            st.write("🧵 İstek birleştirme:", FLIGHTS.stats())
             st.write("DOCS_DIR:", cfg.DOCS_DIR)
             st.write("CHROMA_DIR:", cfg.CHROMA_DIR)
         except Exception:
@@ -148,10 +195,10 @@ with tab_subs:
             st.rerun()
     else:
         st.caption(f"Dosya: `{tx_path}`")
-        st.dataframe(df.tail(25), width="stretch")  # <- deprecation fix: width='stretch'
+        st.dataframe(_latest(df, 25), width="stretch")  # <- deprecation fix: width='stretch'
         subs = []
         try:
-            subs = detect_recurring(df, days_ahead=7)
+            subs = _tx_state(df).upcoming(days_ahead=7)
         except Exception:
             st.error("Abonelik tespitinde hata:")
             st.code(traceback.format_exc())
@@ -170,7 +217,7 @@ with tab_risk:
         st.warning(f"`{tx_path}` bulunamadı. `python simulator.py` ile oluşturabilirsiniz.")
     else:
         try:
-            alerts = risk_check(df)
+            alerts = _tx_state(df).alerts()
             if alerts:
                 for a in alerts:
                     st.error(a)
@@ -0,0 +1,97 @@
+# compress.py
+"""
+Vektör sıkıştırma: Matryoshka tarzı boyut kesme + float16 / int8 nicemleme (quantization).
+- Kesme: gemini-embedding-001 vektörlerinin ilk `dim` bileşeni alınıp yeniden normalize edilir
+  (Matryoshka eğitimli modellerde ilk bileşenler en çok bilgiyi taşır). retriever.index_texts ve
+  search her arka uçta bunu uygular.
+- Nicemleme: numpy arka ucunda (vector_store.py) matris float16 ya da vektör başına ölçekli int8
+  olarak saklanır; skorlar bloklar halinde float32'ye açılarak hesaplanır (RAM'de sıkıştırılmış kalır).
+- Kalite ölçümü: python compression_report.py (sıkıştırılmamış indekse göre recall@k).
+"""
+
+from __future__ import annotations
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+from config import cfg
+
+QUANT_KINDS = ("none", "float16", "int8")
+_DTYPES = {"none": np.float32, "float16": np.float16, "int8": np.int8}
+SCORE_BLOCK = 8192   # skor hesabında bir seferde float32'ye açılan satır sayısı
+
+
+def unit_rows(vecs: Any) -> np.ndarray:
+    m = np.asarray(vecs, dtype=np.float32)
+    if m.ndim == 1:
+        m = m[None, :]
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+def truncate(vecs: Any, dim: int = 0) -> np.ndarray:
+    """İlk `dim` bileşen + yeniden normalize (dim <= 0 ya da daha büyükse yalnızca normalize)."""
+    m = np.asarray(vecs, dtype=np.float32)
+    if m.ndim == 1:
+        m = m[None, :]
+    if 0 < dim < m.shape[1]:
+        m = m[:, :dim]
+    return unit_rows(m)
+
+def quantize(rows: np.ndarray, kind: str = "none") -> Tuple[np.ndarray, np.ndarray]:
+    """(kodlar, vektör başına ölçek). int8 dışında ölçek 1'dir."""
+    if kind not in QUANT_KINDS:
+        raise ValueError(f"Bilinmeyen nicemleme: {kind!r} (seçenekler: {', '.join(QUANT_KINDS)})")
+    rows = np.asarray(rows, dtype=np.float32)
+    scales = np.ones(len(rows), dtype=np.float32)
+    if kind != "int8":
+        return rows.astype(_DTYPES[kind]), scales
+    peak = np.abs(rows).max(axis=1) if rows.size else scales
+    scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(rows / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return np.asarray(codes, dtype=np.float32) * np.asarray(scales, dtype=np.float32)[:, None]
+
+def kind_of(codes: np.ndarray) -> str:
+    for kind, dt in _DTYPES.items():
+        if codes.dtype == dt:
+            return kind
+    raise ValueError(f"Desteklenmeyen matris tipi: {codes.dtype}")
+
+def scores(codes: np.ndarray, scales: np.ndarray, q: np.ndarray, block: int = SCORE_BLOCK) -> np.ndarray:
+    """q (sorgu, D) ile tüm satırların iç çarpımı -> (sorgu, N); float32 değilse bloklar halinde açılır."""
+    q = np.asarray(q, dtype=np.float32)
+    n = len(codes)
+    if codes.dtype == np.float32:
+        out = q @ np.asarray(codes).T
+    else:
+        out = np.empty((len(q), n), dtype=np.float32)
+        for s in range(0, n, block):
+            out[:, s:s + block] = q @ np.asarray(codes[s:s + block], dtype=np.float32).T
+    if codes.dtype == np.int8:
+        out *= np.asarray(scales, dtype=np.float32)[None, :]
+    return out
+
+
+class VectorCodec:
+    """retriever'ın kullandığı sıkıştırma ayarı (cfg.EMBED_DIM, cfg.VECTOR_QUANT)."""
+
+    def __init__(self, dim: Optional[int] = None, quant: Optional[str] = None) -> None:
+        self.dim = int(cfg.EMBED_DIM if dim is None else dim)
+        self.quant = cfg.VECTOR_QUANT if quant is None else quant
+        if self.quant not in QUANT_KINDS:
+            raise ValueError(f"Bilinmeyen VECTOR_QUANT: {self.quant!r} (seçenekler: {', '.join(QUANT_KINDS)})")
+
+    @property
+    def signature(self) -> str:
+        """Manifest'te saklanır; değişirse indeks yeniden kurulur."""
+        return f"{self.dim if self.dim > 0 else 'full'}:{self.quant}"
+
+    def prepare(self, vecs: Any) -> np.ndarray:
+        return truncate(vecs, self.dim)
+
+    def bytes_per_vector(self, full_dim: int) -> int:
+        d = self.dim if 0 < self.dim < full_dim else full_dim
+        return d * np.dtype(_DTYPES[self.quant]).itemsize + (4 if self.quant == "int8" else 0)
@@ -0,0 +1,106 @@
+# compression_report.py
+"""
+Vektör sıkıştırma ayarlarının kalite/bellek/gecikme karşılaştırması.
+Mevcut indeksteki (sıkıştırılmamış) embedding'ler referans alınır; her (boyut, nicemleme) için:
+- recall@k: sıkıştırılmış aramanın ilk k sonucunun, tam hassasiyetli ilk k ile örtüşme oranı
+- bayt/vektör ve toplam matris boyutu
+- sorgu başına kaba kuvvet (brute-force) arama süresi
+Sorgular: --queries dosyasındaki sorular (her satır bir soru, embed edilir) ya da
+indeksten örneklenen parçalar (kendisi sonuçlardan çıkarılarak).
+
+Kullanım: python compression_report.py --k 5 --dims 0,1536,768,256 --quants none,float16,int8
+"""
+
+from __future__ import annotations
+import argparse, time
+from typing import List, Optional
+
+import numpy as np
+
+from compress import QUANT_KINDS, VectorCodec, quantize, scores, truncate
+
+
+def _topk(sims: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, sims.shape[1])
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(sims, top, axis=1), axis=1), axis=1)
+
+def evaluate(base: np.ndarray, queries: np.ndarray, k: int, dims: List[int], quants: List[str],
+             exclude: Optional[np.ndarray] = None) -> List[dict]:
+    """
+    :param base: (N, D) sıkıştırılmamış embedding'ler.
+    :param queries: (Q, D) sorgu embedding'leri.
+    :param exclude: Her sorgu için sonuçlardan çıkarılacak satır (indeksten örneklenen sorgularda kendisi).
+    """
+    def search(codes, scales, q):
+        sims = scores(codes, scales, q)
+        if exclude is not None:
+            sims[np.arange(len(q)), exclude] = -np.inf
+        return _topk(sims, k)
+
+    full_dim = base.shape[1]
+    ref_codes, ref_scales = quantize(truncate(base), "none")
+    truth = search(ref_codes, ref_scales, truncate(queries))
+    rows = []
+    for dim in dims:
+        for quant in quants:
+            codec = VectorCodec(dim=dim, quant=quant)
+            codes, scales = quantize(codec.prepare(base), quant)
+            q = codec.prepare(queries)
+            search(codes, scales, q[:1])   # ısınma
+            t0 = time.perf_counter()
+            got = search(codes, scales, q)
+            ms = 1e3 * (time.perf_counter() - t0) / len(q)
+            recall = np.mean([len(set(g) & set(t)) / len(t) for g, t in zip(got, truth)])
+            bpv = codec.bytes_per_vector(full_dim)
+            rows.append({
+                "config": codec.signature,
+                f"recall@{k}": round(float(recall), 4),
+                "bytes/vec": bpv,
+                "size_mb": round(bpv * len(base) / 2**20, 2),
+                "ratio": round(full_dim * 4 / bpv, 1),
+                "ms/query": round(ms, 3),
+            })
+    return rows
+
+
+def _load_base():
+    from retriever import get_collection, CODEC
+    if CODEC.signature != "full:none":
+        print(f"⚠️ İndeks zaten sıkıştırılmış ({CODEC.signature}); referans olarak sıkıştırılmamış bir indeks kullanın.")
+    res = get_collection().get(include=["embeddings"])
+    return np.asarray(res["embeddings"], dtype=np.float32)
+
+
+# --------- Çalıştırma ---------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Vektör sıkıştırma recall@k raporu")
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--dims", default="0,1536,768,512,256", help="0 = tam boyut")
+    ap.add_argument("--quants", default=",".join(QUANT_KINDS))
+    ap.add_argument("--queries", help="her satırı bir soru olan metin dosyası")
+    ap.add_argument("--sample", type=int, default=200, help="soru dosyası yoksa indeksten örneklenecek parça sayısı")
+    args = ap.parse_args()
+
+    base = _load_base()
+    if len(base) < 2:
+        raise SystemExit("❌ İndeks boş — önce python ingest.py çalıştırın.")
+    exclude = None
+    if args.queries:
+        from gemini_client import embed_queries
+        with open(args.queries, "r", encoding="utf-8") as f:
+            qs = [ln.strip() for ln in f if ln.strip()]
+        queries = np.asarray(embed_queries(qs), dtype=np.float32)
+    else:
+        rng = np.random.default_rng(0)
+        exclude = rng.choice(len(base), size=min(args.sample, len(base)), replace=False)
+        queries = base[exclude]
+
+    dims = [int(d) for d in args.dims.split(",")]
+    quants = [q.strip() for q in args.quants.split(",")]
+    print(f"📊 {len(base)} vektör × {base.shape[1]} boyut | {len(queries)} sorgu | k={args.k}")
+    rows = evaluate(base, queries, args.k, dims, quants, exclude)
+    cols = list(rows[0])
+    print("  ".join(f"{c:>12}" for c in cols))
+    for r in rows:
+        print("  ".join(f"{str(r[c]):>12}" for c in cols))
@@ -10,7 +10,10 @@ class Config:
     # Dizinler
     ROOT_DIR: str = os.path.abspath(os.path.dirname(__file__))
     DATA_DIR: str = os.path.join(os.path.abspath(os.path.dirname(__file__)), "data")
-    DOCS_DIR: str = os.path.join(os.path.abspath(os.path.dirname(__file__)), "data", "docs")
+    DOCS_DIR: str = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    os.getenv("DOCS_DIR", os.path.join("data", "docs"))
+    )
     CHROMA_DIR: str = os.path.join(
     os.path.abspath(os.path.dirname(__file__)),
     os.getenv("CHROMA_DIR", ".chroma")
@@ -21,15 +24,103 @@ class Config:
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
     GEMINI_EMBED_MODEL: str = os.getenv("GEMINI_EMBED_MODEL", "gemini-embedding-001")
 
+    # Embedding önbelleği (SQLite + bellek içi LRU)
+    EMBED_CACHE_PATH: str = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    os.getenv("EMBED_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite"))
+    )
+    EMBED_CACHE_MAX_MB: float = float(os.getenv("EMBED_CACHE_MAX_MB", "256"))
+    EMBED_CACHE_MEM_ITEMS: int = int(os.getenv("EMBED_CACHE_MEM_ITEMS", "2048"))
+
+    # PDF çıkarma (süreç havuzu + sayfa önbelleği)
+    EXTRACT_WORKERS: int = int(os.getenv("EXTRACT_WORKERS", "0"))  # 0 = çekirdek sayısı
+    EXTRACT_CACHE_PATH: str = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    os.getenv("EXTRACT_CACHE_PATH", os.path.join(".cache", "pages.sqlite"))
+    )
+    EXTRACT_CACHE_MAX_PAGES: int = int(os.getenv("EXTRACT_CACHE_MAX_PAGES", "200000"))  # aşılınca en eskiler silinir
+
+    # Embedding motoru (eşzamanlılık / hız sınırı)
+    EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    EMBED_CONCURRENCY: int = int(os.getenv("EMBED_CONCURRENCY", "4"))
+    EMBED_RPS: float = float(os.getenv("EMBED_RPS", "10"))
+
+    # Vektör arka ucu: "chroma" ya da "numpy" (bellek eşlemeli matris, vector_store.py)
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "chroma")
+
+    # Vektör sıkıştırma: EMBED_DIM > 0 ise Matryoshka kesmesi; VECTOR_QUANT "none" | "float16" | "int8"
+    # (nicemleme yalnızca numpy arka ucunda saklamaya yansır). Değiştirince indeks kendiliğinden yeniden kurulur.
+    EMBED_DIM: int = int(os.getenv("EMBED_DIM", "0"))
+    VECTOR_QUANT: str = os.getenv("VECTOR_QUANT", "none")
+
+    # Arama: "vector" (varsayılan), "hybrid" (BM25 + vektör, RRF) ya da "lexical".
+    # hybrid/lexical modda yalnızca BM25'ten gelen hit'lerde "distance" None'dır (bkz. retriever.search).
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "vector")
+    EMBED_TIMEOUT: float = float(os.getenv("EMBED_TIMEOUT", "2.0"))    # sorgu embedding'i için (sn)
+    EMBED_COOLDOWN: float = float(os.getenv("EMBED_COOLDOWN", "30"))   # hata sonrası BM25'e düşme süresi (sn)
+    EMBED_FAIL_THRESHOLD: int = int(os.getenv("EMBED_FAIL_THRESHOLD", "3"))   # devre kesiciyi açan ardışık hata sayısı
+
+    # RAG bağlamı için token bütçesi (context_builder.py)
+    MAX_CONTEXT_TOKENS: int = int(os.getenv("MAX_CONTEXT_TOKENS", "1000"))
+
+    # Cevap önbelleği (tam eşleşme + anlamsal)
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+    ANSWER_CACHE_TTL: float = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    ANSWER_CACHE_SIM: float = float(os.getenv("ANSWER_CACHE_SIM", "0.95"))
+
+    # Eşzamanlı aynı sorular tek hesaplamayı paylaşır (singleflight.py)
+    SINGLE_FLIGHT: bool = os.getenv("SINGLE_FLIGHT", "1") == "1"
+    # Üretim gecikme bütçesi (sn): aşılırsa ya da üretim hata verirse bağlamdan özetleyici cevap (0: kapalı)
+    GENERATE_BUDGET: float = float(os.getenv("GENERATE_BUDGET", "12"))
+
+    # İstek günlüğü ve önceden hesaplanan sıcak cevaplar (hot_answers.py)
+    REQUEST_LOG_PATH: str = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    os.getenv("REQUEST_LOG_PATH", os.path.join("logs", "requests.jsonl"))
+    )
+    HOT_ANSWERS_PATH: str = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    os.getenv("HOT_ANSWERS_PATH", os.path.join(".cache", "hot_answers.json"))
+    )
+    REQUEST_LOG_BATCH: int = int(os.getenv("REQUEST_LOG_BATCH", "32"))          # satır
+    REQUEST_LOG_FLUSH_SEC: float = float(os.getenv("REQUEST_LOG_FLUSH_SEC", "2"))
+    REQUEST_LOG_QUERY_TEXT: bool = os.getenv("REQUEST_LOG_QUERY_TEXT", "0") == "1"   # 1: soru metni de (hot_answers için gerekli)
+    TELEMETRY_WINDOW: int = int(os.getenv("TELEMETRY_WINDOW", "4096"))         # yüzdelik için son ölçüm sayısı
+    HOT_ANSWERS_TOP: int = int(os.getenv("HOT_ANSWERS_TOP", "50"))
+    HOT_ANSWERS_MIN_COUNT: int = int(os.getenv("HOT_ANSWERS_MIN_COUNT", "3"))
+    HOT_ANSWERS_QUIET_SEC: float = float(os.getenv("HOT_ANSWERS_QUIET_SEC", "120"))       # sürüm bu kadar sabit kalmalı
+    HOT_ANSWERS_MIN_INTERVAL: float = float(os.getenv("HOT_ANSWERS_MIN_INTERVAL", "1800"))  # iki kurulum arası en az (sn)
+
+    # Sütunsal işlem deposu (tx_store.py; Parquet, user/month bölümlü)
+    TX_STORE_DIR: str = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    os.getenv("TX_STORE_DIR", os.path.join("data", "transactions"))
+    )
+
+    # Akış değerlendiricisinin (risk_stream.py) durum anlık görüntüsü
+    RISK_STATE_PATH: str = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    os.getenv("RISK_STATE_PATH", os.path.join(".cache", "risk_state.json"))
+    )
+
     # Uygulama
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.2"))
 
 cfg = Config()
 
-# Gerekli klasörleri garanti altına al
-os.makedirs(cfg.DATA_DIR, exist_ok=True)
-os.makedirs(cfg.DOCS_DIR, exist_ok=True)
-os.makedirs(cfg.CHROMA_DIR, exist_ok=True)
+# Gerekli klasörler import anında değil, ilk yazan tarafından (ingest / retriever) kurulur;
+# böylece config'i yalnızca okuyan CLI araçları ve işçiler diske dokunmaz.
+_dirs_ready = False
+
+def ensure_dirs() -> None:
+    """DATA_DIR, DOCS_DIR ve CHROMA_DIR'i (yoksa) oluşturur; süreç başına bir kez."""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    os.makedirs(cfg.DATA_DIR, exist_ok=True)
+    os.makedirs(cfg.DOCS_DIR, exist_ok=True)
+    os.makedirs(cfg.CHROMA_DIR, exist_ok=True)
+    _dirs_ready = True
 
 def check_config() -> None:
     """Zorunlu değişkenleri doğrula."""
@@ -0,0 +1,166 @@
+# context_builder.py
+"""
+RAG bağlamı için token bütçeli, overlap farkındalıklı bağlam kurucu (rag._format_context yerine).
+- Aynı kaynaktan (source) ardışık parça numaralı hit'ler tek bir kesintisiz metin aralığına (span) birleştirilir;
+  ingest'in CHUNK_OVERLAP ile tekrarladığı ortak metin bir kez yazılır.
+- Her span'in değeri, içerdiği hit'lerin sıralama puanlarının toplamıdır (1 / sıra); bütçe önce en değerli
+  span'lere harcanır, sığmayan span cümle sınırından kırpılır.
+- Bütçe karakter değil token ile sayılır. Gemini'nin count_tokens'ı ağ çağrısı olduğundan yerel bir
+  tahminci kullanılır (kelime başına ~4 karakterde bir token + noktalama).
+- extractive_answer: model yavaş/kapalıyken hit'lerden soruyla en çok terim paylaşan cümlelerle yedek cevap.
+"""
+
+from __future__ import annotations
+import re, html, math
+from typing import Any, Dict, List, Tuple
+
+from lexical import tokenize
+
+CHUNK_OVERLAP = 120   # ingest.CHUNK_OVERLAP — önce tam bu uzunluk denenir
+MIN_OVERLAP = 16      # bundan kısa ortak ek/önek tesadüf sayılır
+MAX_OVERLAP = 400     # aranan en uzun overlap (karakter)
+MIN_CLIP_TOKENS = 48  # kalan bütçe bundan azsa span kırpılmaz, atlanır
+
+_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENT_END = re.compile(r"[.!?…]\s")
+_SENTENCE = re.compile(r"[^.!?…\n]+[.!?…]*", re.UNICODE)
+
+
+def _piece_tokens(piece: str) -> int:
+    return max(1, math.ceil(len(piece) / 4)) if piece[0].isalnum() or piece[0] == "_" else 1
+
+def count_tokens(text: str) -> int:
+    """Yaklaşık token sayısı (SentencePiece benzeri: uzun Türkçe kelimeler birden çok token)."""
+    return sum(_piece_tokens(m.group()) for m in _PIECE.finditer(text or ""))
+
+def clip_tokens(text: str, max_tokens: int) -> str:
+    """Metni ~max_tokens'a kırpar; mümkünse son cümle sonunda keser."""
+    used, cut = 0, None
+    for m in _PIECE.finditer(text):
+        used += _piece_tokens(m.group())
+        if used > max_tokens:
+            cut = m.start()
+            break
+    if cut is None:
+        return text
+    head = text[:cut]
+    ends = [m.end() for m in _SENT_END.finditer(head)]
+    if ends and ends[-1] >= 0.6 * len(head):
+        head = head[:ends[-1]]
+    return head.rstrip() + "…"
+
+def _overlap(a: str, b: str) -> int:
+    """a'nın sonu ile b'nin başının örtüştüğü uzunluk: önce ingest'in overlap'i, yoksa en uzun eşleşme (yoksa 0)."""
+    if len(a) >= CHUNK_OVERLAP and a.endswith(b[:CHUNK_OVERLAP]) and len(b) >= CHUNK_OVERLAP:
+        return CHUNK_OVERLAP
+    for k in range(min(len(a), len(b), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if a.endswith(b[:k]):
+            return k
+    return 0
+
+def merge_spans(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Hit'leri kaynak + ardışık parça numarasına göre span'lere birleştirir.
+    Dönüş: [{"title", "source", "chunks": [..], "text", "value", "hits": [..]}] (değere göre azalan).
+    """
+    by_src: Dict[Tuple[str, str], Dict[int, Tuple[int, Dict[str, Any]]]] = {}
+    for rank, h in enumerate(hits, 1):
+        meta = h.get("meta") or {}
+        title = meta.get("title") or meta.get("source") or "dokuman"
+        key = (meta.get("source", "") or title, title)
+        by_src.setdefault(key, {}).setdefault(int(meta.get("chunk", 0)), (rank, h))
+
+    spans: List[Dict[str, Any]] = []
+    for (source, title), chunks in by_src.items():
+        cur = None
+        for c in sorted(chunks):
+            rank, h = chunks[c]
+            doc = (h.get("doc") or "").strip()
+            if cur is not None and c == cur["chunks"][-1] + 1:
+                k = _overlap(cur["text"], doc)
+                cur["text"] += doc[k:] if k else "\n" + doc
+                cur["chunks"].append(c); cur["hits"].append(h); cur["value"] += 1.0 / rank
+                continue
+            cur = {"title": title, "source": source, "chunks": [c], "text": doc, "value": 1.0 / rank, "hits": [h]}
+            spans.append(cur)
+    spans.sort(key=lambda s: -s["value"])
+    return spans
+
+def build_context(hits: List[Dict[str, Any]], max_tokens: int = 1000) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Token bütçesine sığan bağlam metni ve bağlama giren hit'ler.
+    Bloklar "[i] başlık (chunk a–b):" başlığıyla, değere göre sırayla yazılır.
+    """
+    out: List[str] = []
+    used_hits: List[Dict[str, Any]] = []
+    budget = max_tokens
+    for span in merge_spans(hits):
+        c0, c1 = span["chunks"][0], span["chunks"][-1]
+        header = f"[{len(out) + 1}] {span['title']} (chunk {c0}{'' if c0 == c1 else f'–{c1}'}):\n"
+        cost_header = count_tokens(header)
+        body = span["text"]
+        cost = cost_header + count_tokens(body)
+        if cost > budget:
+            if budget - cost_header < MIN_CLIP_TOKENS:
+                continue
+            body = clip_tokens(body, budget - cost_header)
+            cost = cost_header + count_tokens(body)
+        out.append(header + body + "\n")
+        used_hits.extend(span["hits"])
+        budget -= cost
+        if budget < MIN_CLIP_TOKENS:
+            break
+    return "\n".join(out), used_hits
+
+def extractive_answer(query: str, hits: List[Dict[str, Any]], max_sentences: int = 3, max_tokens: int = 160) -> str:
+    """
+    Modelsiz kısa cevap: hit'lerdeki cümleler soruyla ortak terim sayısına (eşitlikte hit sırasına) göre
+    seçilir, metindeki sıralarıyla yazılır. Overlap nedeniyle tekrarlanan cümleler bir kez alınır.
+    """
+    q = set(tokenize(query))
+    seen, cands = set(), []   # (puan, hit sırası, cümle sırası, cümle, başlık)
+    for rank, h in enumerate(hits):
+        meta = h.get("meta") or {}
+        title = meta.get("title") or meta.get("source") or "dokuman"
+        for j, m in enumerate(_SENTENCE.finditer(html.unescape(h.get("doc") or ""))):
+            sent = " ".join(m.group().split())
+            # Parça sınırında kesilmiş yarım cümleler (küçük harfle başlayan / noktalamasız biten) atlanır
+            if len(sent) < 20 or sent[0].islower() or sent[-1] not in ".!?…" or sent in seen:
+                continue
+            seen.add(sent)
+            overlap = len(q & set(tokenize(sent)))
+            cands.append((overlap + 1.0 / (rank + 2), rank, j, sent, title))
+    if not cands:
+        return "Bilmiyorum. Şu an için ilgili bir kaynak bulamadım."
+    best = sorted(cands, key=lambda c: -c[0])[:max_sentences]
+    best = [c for c in best if c[0] >= 1.0] or best[:1]   # terim ortaklığı yoksa yalnızca en iyi hit'in cümlesi
+    best.sort(key=lambda c: (c[1], c[2]))
+    body, budget = [], max_tokens
+    for c in best:
+        cost = count_tokens(c[3])
+        if body and cost > budget:
+            break
+        body.append("- " + (clip_tokens(c[3], budget) if cost > budget else c[3]))
+        budget -= cost
+    titles = list(dict.fromkeys(c[4] for c in best))
+    return ("Şu an ayrıntılı bir cevap üretemedim; kaynaklardaki ilgili bilgiler:\n" + "\n".join(body)
+            + "\n\nKaynaklar: " + ", ".join(titles))
+
+
+# --------- Hızlı test ---------
+if __name__ == "__main__":
+    text = ("Ekstre, bir hesap dönemindeki tüm harcamaların özetidir. Son ödeme tarihi ekstre kesiminden "
+            "sonra belirlenir. Harçlık kampanyalara göre kullanılır. ") * 12
+    size, ov = 300, CHUNK_OVERLAP
+    chunks, s = [], 0
+    while True:
+        chunks.append(text[s:s + size])
+        if s + size >= len(text):
+            break
+        s += size - ov
+    hits = [{"doc": chunks[i], "meta": {"title": "sss", "source": "sss.txt", "chunk": i}} for i in (2, 1, 3, 6)]
+    old = sum(count_tokens(h["doc"]) for h in hits)
+    ctx, used = build_context(hits, max_tokens=300)
+    print(f"🧮 ham: {old} token | bağlam: {count_tokens(ctx)} token | kullanılan hit: {len(used)}")
+    print(ctx)
+    print(extractive_answer("Son ödeme tarihi ne zaman belirlenir?", hits))
@@ -0,0 +1,291 @@
+# dedup.py
+"""
+MinHash + LSH ile neredeyse-aynı (near-duplicate) parça tespiti.
+ingest aşamasında parçalama ile embedding arasına girer:
+- Her parça için kelime 3-gram'larından MinHash imzası çıkarılır.
+- LSH bantlarında aday bulunur; tahmini Jaccard benzerliği eşiği geçerse parça
+  "takma ad" (alias) olur: embed edilmez, Chroma'ya yazılmaz; kanonik kaydın
+  metadata'sındaki `sources` listesine eklenir.
+- Durum (kanonikler, imzalar, takma adlar) ayrı bir SQLite deposunda (DedupStore) saklanır ve
+  her çalıştırmada yalnızca değişen satırlar yazılır; böylece artımlı indekslemede kanonik kayıt
+  silinir/değişirse takma adları yeniden değerlendirilir.
+"""
+
+from __future__ import annotations
+import os, re, json, zlib, random, sqlite3
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16            # 16 bant x 4 satır: ~%50 benzerlikten itibaren aday üretir
+THRESHOLD = 0.85      # Bu tahmini Jaccard değerinden itibaren parça kopya sayılır
+_PRIME = np.uint64((1 << 61) - 1)
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, ngram: int = 3, seed: int = 1) -> None:
+        rnd = random.Random(seed)
+        self.num_perm = num_perm
+        self.ngram = ngram
+        self._a = np.array([rnd.randrange(1, 1 << 32) for _ in range(num_perm)], dtype=np.uint64)
+        self._b = np.array([rnd.randrange(0, 1 << 32) for _ in range(num_perm)], dtype=np.uint64)
+
+    def shingles(self, text: str) -> Set[int]:
+        words = _WORD.findall(text.casefold())
+        if len(words) < self.ngram:
+            return {zlib.crc32(" ".join(words).encode("utf-8"))}
+        return {
+            zlib.crc32(" ".join(words[i : i + self.ngram]).encode("utf-8"))
+            for i in range(len(words) - self.ngram + 1)
+        }
+
+    def signature(self, text: str) -> np.ndarray:
+        x = np.fromiter(self.shingles(text), dtype=np.uint64)
+        # (a*x + b) mod p — a, x, b < 2^32 olduğu için uint64 taşmaz
+        h = (np.outer(x, self._a) + self._b) % _PRIME
+        return (h.min(axis=0) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def _pack(sig: np.ndarray) -> bytes:
+    return sig.astype("<u4").tobytes()
+
+def _unpack(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<u4").astype(np.uint32)
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """İki imza arasındaki tahmini Jaccard benzerliği."""
+    return float(np.mean(a == b))
+
+
+class DedupIndex:
+    """
+    Başlangıç durumu (DedupStore.state()):
+      {"canon": {id: {"sig": ndarray, "meta": {...}, "members": [alias_id, ...]}},
+       "alias": {alias_id: {"canon": id, "source": str, "chunk": int}}}
+    Bellekte imzalar yalnızca LSH tablosunda tutulur; değişen id'ler `dirty` kümesinde birikir.
+    """
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None, threshold: float = THRESHOLD,
+                 hasher: Optional[MinHasher] = None, bands: int = BANDS) -> None:
+        state = state or {}
+        self.canon: Dict[str, Dict[str, Any]] = {
+            cid: {"meta": e["meta"], "members": list(e["members"])} for cid, e in state.get("canon", {}).items()
+        }
+        self.alias: Dict[str, Dict[str, Any]] = dict(state.get("alias", {}))
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self._sigs: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        for cid, entry in state.get("canon", {}).items():
+            self._index(cid, entry["sig"])
+        self.touched: Set[str] = set()     # metadata'sı güncellenecek kanonikler
+        self.dirty: Set[str] = set()       # depoda satırı değişecek id'ler (kanonik ya da takma ad)
+        self.orphans: Dict[str, Dict[str, Any]] = {}  # kanoniği kaybolan takma adlar
+        self.seen = 0
+        self.duplicates = 0
+
+    # ---- LSH ----
+    def _band_keys(self, sig: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for b in range(self.bands):
+            yield b, sig[b * self.rows : (b + 1) * self.rows].tobytes()
+
+    def _index(self, cid: str, sig: np.ndarray) -> None:
+        self._sigs[cid] = sig
+        for key in self._band_keys(sig):
+            self._buckets.setdefault(key, set()).add(cid)
+
+    def _unindex(self, cid: str) -> None:
+        sig = self._sigs.pop(cid, None)
+        if sig is None:
+            return
+        for key in self._band_keys(sig):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(cid)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _best_match(self, sig: np.ndarray, exclude: str) -> Optional[str]:
+        cands: Set[str] = set()
+        for key in self._band_keys(sig):
+            cands |= self._buckets.get(key, set())
+        cands.discard(exclude)
+        best, best_sim = None, self.threshold
+        for cid in cands:
+            sim = similarity(sig, self._sigs[cid])
+            if sim >= best_sim:
+                best, best_sim = cid, sim
+        return best
+
+    # ---- durum değişiklikleri ----
+    def forget(self, id_: str) -> None:
+        """id artık eski içeriğini temsil etmiyor (değişti/silindi)."""
+        self.orphans.pop(id_, None)
+        a = self.alias.pop(id_, None)
+        if a is not None:
+            self.dirty.add(id_)
+            c = self.canon.get(a["canon"])
+            if c is not None and id_ in c["members"]:
+                c["members"].remove(id_)
+                self.touched.add(a["canon"])
+                self.dirty.add(a["canon"])
+            return
+        c = self.canon.pop(id_, None)
+        if c is not None:
+            self.dirty.add(id_)
+            self._unindex(id_)
+            self.touched.discard(id_)
+            for m in c["members"]:
+                info = self.alias.pop(m, None)
+                if info is not None:
+                    self.orphans[m] = info
+                    self.dirty.add(m)
+
+    def add(self, id_: str, text: str, meta: Dict[str, Any]) -> Optional[str]:
+        """
+        Parçayı kaydeder. Kopya ise kanonik id'yi, değilse None döndürür
+        (None -> parça embed edilip yazılmalı).
+        """
+        self.forget(id_)
+        self.seen += 1
+        sig = self.hasher.signature(text)
+        cid = self._best_match(sig, exclude=id_)
+        if cid is not None:
+            self.duplicates += 1
+            self.alias[id_] = {"canon": cid, "source": meta.get("source", ""), "chunk": meta.get("chunk", 0)}
+            self.canon[cid]["members"].append(id_)
+            self.touched.add(cid)
+            self.dirty.update((id_, cid))
+            return cid
+        self.canon[id_] = {"meta": dict(meta), "members": []}
+        self._index(id_, sig)
+        self.dirty.add(id_)
+        return None
+
+    def canonical_metadata(self, cid: str) -> Dict[str, Any]:
+        """Kanonik kaydın metadata'sı + tüm kaynakları (Chroma skaler değer istediği için metin)."""
+        c = self.canon[cid]
+        meta = dict(c["meta"])
+        srcs = [f"{meta.get('source', '')}#{meta.get('chunk', 0)}"]
+        srcs += [f"{self.alias[m]['source']}#{self.alias[m]['chunk']}" for m in c["members"] if m in self.alias]
+        meta["sources"] = ";".join(srcs)
+        meta["dup_count"] = len(srcs) - 1
+        return meta
+
+    def report(self, dim: int = 0, avg_doc_bytes: int = 0) -> Dict[str, Any]:
+        """Bu çalıştırmadaki ve toplamdaki kazanç (yaklaşık bayt: vektör float32 + belge metni)."""
+        total_alias = len(self.alias)
+        per_record = dim * 4 + avg_doc_bytes
+        return {
+            "chunks_seen": self.seen,
+            "duplicates": self.duplicates,
+            "embeddings_saved": self.duplicates,
+            "aliases_total": total_alias,
+            "canonical_total": len(self.canon),
+            "index_bytes_saved_est": total_alias * per_record,
+        }
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS canon (
+    id      TEXT PRIMARY KEY,
+    sig     BLOB NOT NULL,
+    meta    TEXT NOT NULL,
+    members TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alias (
+    id     TEXT PRIMARY KEY,
+    canon  TEXT NOT NULL,
+    source TEXT NOT NULL,
+    chunk  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS info (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class DedupStore:
+    """
+    DedupIndex durumunun kalıcı hali (SQLite). save() yalnızca index.dirty'deki satırları yazar;
+    `stamp` her kayıtta yenilenir ve ingest manifest'ine de yazılır (ikisi uyuşmazsa durum güvenilmez).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def stamp(self) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM info WHERE key = 'stamp'").fetchone()
+        return row[0] if row else None
+
+    def alias_count(self) -> int:
+        return int(self._db.execute("SELECT COUNT(*) FROM alias").fetchone()[0])
+
+    def state(self) -> Dict[str, Any]:
+        """DedupIndex(state) için tüm durum."""
+        canon = {
+            cid: {"sig": _unpack(sig), "meta": json.loads(meta), "members": json.loads(members)}
+            for cid, sig, meta, members in self._db.execute("SELECT id, sig, meta, members FROM canon")
+        }
+        alias = {
+            aid: {"canon": cid, "source": source, "chunk": chunk}
+            for aid, cid, source, chunk in self._db.execute("SELECT id, canon, source, chunk FROM alias")
+        }
+        return {"canon": canon, "alias": alias}
+
+    def save(self, index: DedupIndex, stamp: str, rewrite: bool = False) -> None:
+        """Değişen satırları tek işlemde yazar; rewrite=True ise tablo baştan kurulur (sıfırdan indeksleme/taşıma)."""
+        ids = set(index.canon) | set(index.alias) if rewrite else index.dirty
+        with self._db:
+            if rewrite:
+                self._db.execute("DELETE FROM canon")
+                self._db.execute("DELETE FROM alias")
+            for id_ in ids:
+                c = index.canon.get(id_)
+                if c is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO canon (id, sig, meta, members) VALUES (?, ?, ?, ?)",
+                        (id_, _pack(index._sigs[id_]), json.dumps(c["meta"], ensure_ascii=False), json.dumps(c["members"])),
+                    )
+                elif not rewrite:
+                    self._db.execute("DELETE FROM canon WHERE id = ?", (id_,))
+                a = index.alias.get(id_)
+                if a is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO alias (id, canon, source, chunk) VALUES (?, ?, ?, ?)",
+                        (id_, a["canon"], a["source"], int(a["chunk"])),
+                    )
+                elif not rewrite:
+                    self._db.execute("DELETE FROM alias WHERE id = ?", (id_,))
+            self._db.execute("INSERT OR REPLACE INTO info (key, value) VALUES ('stamp', ?)", (stamp,))
+        index.dirty.clear()
+
+    def close(self) -> None:
+        self._db.close()
+
+
+# --------- Hızlı test ---------
+if __name__ == "__main__":
+    boiler = ("Kredi kartı ekstresi dönem içindeki harcamaları gösterir. Son ödeme tarihine kadar "
+              "asgari tutarı ödemeniz gerekir. Detaylı bilgi için Akbank mobil uygulamasını ziyaret edin. ") * 3
+    idx = DedupIndex()
+    print("a-0 ->", idx.add("a-0", boiler, {"source": "a.txt", "chunk": 0}))
+    print("b-0 ->", idx.add("b-0", boiler + " Harçlık", {"source": "b.txt", "chunk": 0}))
+    print("c-0 ->", idx.add("c-0", "Tamamen farklı bir metin, limit artırımı hakkında.", {"source": "c.txt", "chunk": 0}))
+    print("📎", idx.canonical_metadata("a-0"))
+    print("📊", idx.report(dim=3072, avg_doc_bytes=800))
+    store = DedupStore(":memory:")
+    store.save(idx, "t1")
+    again = DedupIndex(store.state())
+    print("💾 depodan geri yükleme:", again.canonical_metadata("a-0") == idx.canonical_metadata("a-0"),
+          "| takma ad:", store.alias_count())
@@ -0,0 +1,238 @@
+# embed_cache.py
+"""
+Kalıcı embedding önbelleği.
+Anahtar: (embedding modeli, normalleştirilmiş metnin SHA-1 hash'i).
+- Diskte SQLite; vektörler float32 blob olarak (array('f')) saklanır.
+- Önde bellek içi LRU katmanı; disk boyutu sınırı aşılınca en eski kullanılanlar silinir.
+- hit/miss sayaçları stats() ile okunur.
+"""
+
+from __future__ import annotations
+import os, re, time, sqlite3, hashlib, threading, unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import cfg
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key       TEXT PRIMARY KEY,
+    model     TEXT NOT NULL,
+    dim       INTEGER NOT NULL,
+    vec       BLOB NOT NULL,
+    nbytes    INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used);
+"""
+
+def normalize_text(text: str) -> str:
+    """Önbellek anahtarı için metni NFC + tek boşluk biçimine getirir."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+def cache_key(model: str, text: str) -> str:
+    h = hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}|{h}"
+
+def _pack(vec: Sequence[float]) -> bytes:
+    return array("f", vec).tobytes()
+
+def _unpack(blob: bytes) -> List[float]:
+    a = array("f")
+    a.frombytes(blob)
+    return a.tolist()
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        mem_items: int = 2048,
+    ) -> None:
+        """
+        :param path: SQLite dosya yolu (":memory:" da olabilir).
+        :param max_bytes: Diskteki vektör verisi için üst sınır; aşılınca LRU tahliye.
+        :param mem_items: Bellek içi LRU katmanındaki en fazla vektör sayısı.
+        """
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.mem_items = int(mem_items)
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.mem_hits = 0
+        self.evictions = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        row = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()
+        self._size = int(row[0])
+
+    # ---- bellek içi LRU ----
+    def _mem_get(self, key: str) -> Optional[List[float]]:
+        vec = self._mem.get(key)
+        if vec is not None:
+            self._mem.move_to_end(key)
+        return vec
+
+    def _mem_put(self, key: str, vec: List[float]) -> None:
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_items:
+            self._mem.popitem(last=False)
+
+    # ---- okuma ----
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Her metin için önbellekteki vektörü ya da None döndürür (sıra korunur)."""
+        keys = [cache_key(model, t) for t in texts]
+        out: List[Optional[List[float]]] = [None] * len(keys)
+        with self._lock:
+            missing: Dict[str, List[int]] = {}
+            for i, k in enumerate(keys):
+                vec = self._mem_get(k)
+                if vec is not None:
+                    out[i] = vec
+                    self.mem_hits += 1
+                else:
+                    missing.setdefault(k, []).append(i)
+
+            if missing:
+                found = self._db_get(list(missing))
+                for k, vec in found.items():
+                    self._mem_put(k, vec)
+                    for i in missing[k]:
+                        out[i] = vec
+
+            n_hit = sum(1 for v in out if v is not None)
+            self.hits += n_hit
+            self.misses += len(out) - n_hit
+        return out
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def _db_get(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        # SQLite parametre sınırına takılmamak için parça parça sorgula
+        for i in range(0, len(keys), 500):
+            part = keys[i : i + 500]
+            q = f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})"
+            for k, blob in self._db.execute(q, part):
+                found[k] = _unpack(blob)
+        if found:
+            now = time.time()
+            self._db.executemany(
+                "UPDATE embeddings SET last_used=? WHERE key=?", [(now, k) for k in found]
+            )
+            self._db.commit()
+        return found
+
+    # ---- yazma ----
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        if len(texts) != len(vectors):
+            raise ValueError("texts/vectors uzunlukları eşleşmiyor.")
+        if not texts:
+            return
+        now = time.time()
+        rows: List[Tuple] = []
+        with self._lock:
+            for t, v in zip(texts, vectors):
+                k = cache_key(model, t)
+                vec = list(v)
+                self._mem_put(k, vec)
+                blob = _pack(vec)
+                rows.append((k, model, len(vec), blob, len(blob), now))
+            keys = [r[0] for r in rows]
+            old = 0
+            for i in range(0, len(keys), 500):
+                part = keys[i : i + 500]
+                q = f"SELECT COALESCE(SUM(nbytes), 0) FROM embeddings WHERE key IN ({','.join('?' * len(part))})"
+                old += int(self._db.execute(q, part).fetchone()[0])
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings(key, model, dim, vec, nbytes, last_used) VALUES (?,?,?,?,?,?)",
+                rows,
+            )
+            self._size += sum(r[4] for r in rows) - old
+            self._evict()
+            self._db.commit()
+
+    def put(self, model: str, text: str, vector: Sequence[float]) -> None:
+        self.put_many(model, [text], [vector])
+
+    def _evict(self) -> None:
+        """Boyut sınırı aşıldıysa en eski kullanılanları sınırın %90'ına inene kadar siler."""
+        if self.max_bytes <= 0 or self._size <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        cur = self._db.execute("SELECT key, nbytes FROM embeddings ORDER BY last_used ASC")
+        victims: List[str] = []
+        size = self._size
+        for k, nb in cur:
+            if size <= target:
+                break
+            victims.append(k)
+            size -= int(nb)
+        cur.close()
+        self._db.executemany("DELETE FROM embeddings WHERE key=?", [(k,) for k in victims])
+        for k in victims:
+            self._mem.pop(k, None)
+        self._size = size
+        self.evictions += len(victims)
+
+    # ---- yönetim ----
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = int(self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0])
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "mem_hits": self.mem_hits,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "mem_entries": len(self._mem),
+                "size_bytes": self._size,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM embeddings")
+            self._db.commit()
+            self._mem.clear()
+            self._size = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_shared: Optional[EmbeddingCache] = None
+_shared_lock = threading.Lock()
+
+def get_cache() -> EmbeddingCache:
+    """Süreç genelinde paylaşılan önbellek (Embedder ve embed_query ortak kullanır)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = EmbeddingCache(
+                    cfg.EMBED_CACHE_PATH,
+                    max_bytes=int(cfg.EMBED_CACHE_MAX_MB * 1024 * 1024),
+                    mem_items=cfg.EMBED_CACHE_MEM_ITEMS,
+                )
+    return _shared
+
+
+# --------- Hızlı test ---------
+if __name__ == "__main__":
+    c = EmbeddingCache(":memory:", max_bytes=4 * 1024, mem_items=2)
+    c.put_many("demo", ["Ekstre nedir?", "Limit nedir?"], [[0.1, 0.2], [0.3, 0.4]])
+    print("🔎 get:", c.get("demo", "  Ekstre   nedir? "), c.get("demo", "yok"))
+    print("📊 stats:", c.stats())
@@ -0,0 +1,235 @@
+# embed_engine.py
+"""
+Eşzamanlı, hız sınırlı (rate-limited) toplu embedding motoru.
+- Metinler çok içerikli (multi-content) partiler halinde gönderilir.
+- Sınırlı bir thread havuzu partileri paralel işler; çıktı sırası korunur.
+- Token-bucket istek/sn sınırını uygular.
+- 429/5xx hatalarında eşzamanlılık yarıya iner (AIMD), başarıyla yavaşça artar.
+- Yeniden deneme parti değil öğe bazlıdır: kısmi sonuçta yalnızca eksik öğeler,
+  hata veren partide ise ikiye bölünmüş yarılar tekrar kuyruğa girer.
+"""
+
+from __future__ import annotations
+import time, heapq, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+SendFn = Callable[[Sequence[str]], List[List[float]]]
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        """
+        :param rate: Saniyede eklenen token (istek) sayısı; <= 0 ise sınırsız.
+        :param burst: Kovanın kapasitesi (varsayılan: max(1, rate)).
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._t) * self.rate)
+        self._t = now
+
+    def acquire(self, n: float = 1.0) -> float:
+        """n token alınana kadar bekler; beklenen süreyi (sn) döndürür."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return waited
+                need = (n - self._tokens) / self.rate
+            time.sleep(need)
+            waited += need
+
+
+class AdaptiveConcurrency:
+    """AIMD: kısıtlama hatasında limit yarıya iner, her `increase_every` başarıda 1 artar."""
+
+    def __init__(self, max_limit: int, start: Optional[int] = None, increase_every: int = 4) -> None:
+        self.max_limit = max(1, int(max_limit))
+        self.limit = max(1, min(self.max_limit, int(start or self.max_limit)))
+        self.increase_every = max(1, int(increase_every))
+        self._ok = 0
+        self.backoffs = 0
+
+    def on_success(self) -> None:
+        self._ok += 1
+        if self._ok >= self.increase_every and self.limit < self.max_limit:
+            self.limit += 1
+            self._ok = 0
+
+    def on_throttle(self) -> None:
+        self.limit = max(1, self.limit // 2)
+        self._ok = 0
+        self.backoffs += 1
+
+
+def _status_code(e: BaseException) -> Optional[int]:
+    for attr in ("code", "status_code", "status"):
+        v = getattr(e, attr, None)
+        if callable(v):
+            try:
+                v = v()
+            except Exception:
+                v = None
+        v = getattr(v, "value", v)  # grpc.StatusCode / enum
+        if isinstance(v, int):
+            return v
+        if isinstance(v, tuple) and v and isinstance(v[0], int):
+            return v[0]
+    return None
+
+def is_throttle_error(e: BaseException) -> bool:
+    """429 (kota/hız) ve 5xx (geçici sunucu) hatalarını tanır."""
+    code = _status_code(e)
+    if code is not None and (code == 429 or 500 <= code < 600):
+        return True
+    msg = str(e).lower()
+    return any(s in msg for s in ("429", "resource exhausted", "rate limit", "quota",
+                                  "503", "500 ", "unavailable", "deadline exceeded"))
+
+
+class EmbedEngine:
+    def __init__(
+        self,
+        send: SendFn,
+        batch_size: int = 32,
+        max_workers: int = 4,
+        rate_per_sec: float = 0.0,
+        max_retries: int = 3,
+        base_sleep: float = 0.5,
+        max_sleep: float = 20.0,
+    ) -> None:
+        """
+        :param send: Bir metin partisini vektör listesine çeviren fonksiyon (aynı sıra/uzunluk).
+        :param batch_size: Tek istekte gönderilecek en fazla metin.
+        :param max_workers: Aynı anda uçuşta olabilecek en fazla istek.
+        :param rate_per_sec: İstek/sn sınırı (token-bucket); 0 = sınırsız.
+        :param max_retries: Bir öğe için en fazla yeniden deneme.
+        :param base_sleep: Üssel backoff başlangıcı (sn).
+        :param max_sleep: Backoff üst sınırı (sn).
+        """
+        self.send = send
+        self.batch_size = max(1, int(batch_size))
+        self.max_workers = max(1, int(max_workers))
+        self.bucket = TokenBucket(rate_per_sec)
+        self.max_retries = max_retries
+        self.base_sleep = base_sleep
+        self.max_sleep = max_sleep
+        self.stats: Dict[str, int] = {"requests": 0, "items": 0, "retries": 0, "throttled": 0, "splits": 0}
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_sleep, self.base_sleep * (2 ** max(0, attempt - 1)))
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Tüm metinleri embed eder; çıktı girişle aynı sıradadır."""
+        n = len(texts)
+        out: List[Optional[List[float]]] = [None] * n
+        if n == 0:
+            return []
+
+        # İş birimi: (deneme sayısı, [indeksler])
+        ready: Deque[Tuple[int, List[int]]] = deque(
+            (0, list(range(i, min(n, i + self.batch_size)))) for i in range(0, n, self.batch_size)
+        )
+        delayed: List[Tuple[float, int, int, List[int]]] = []  # (hazır olma zamanı, sıra, deneme, indeksler)
+        seq = 0
+        conc = AdaptiveConcurrency(self.max_workers)
+        inflight: Dict = {}
+
+        def _requeue(attempt: int, idxs: List[int], delay: float, err: BaseException) -> None:
+            nonlocal seq
+            if attempt > self.max_retries:
+                raise RuntimeError(f"Embedding başarısız (denemeler bitti): {err}") from err
+            self.stats["retries"] += len(idxs)
+            seq += 1
+            heapq.heappush(delayed, (time.monotonic() + delay, seq, attempt, idxs))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embed") as pool:
+            while ready or delayed or inflight:
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    _, _, attempt, idxs = heapq.heappop(delayed)
+                    ready.append((attempt, idxs))
+
+                while ready and len(inflight) < conc.limit:
+                    attempt, idxs = ready.popleft()
+                    self.bucket.acquire()
+                    fut = pool.submit(self.send, [texts[i] for i in idxs])
+                    inflight[fut] = (attempt, idxs)
+                    self.stats["requests"] += 1
+
+                if not inflight:
+                    if delayed:
+                        time.sleep(max(0.0, delayed[0][0] - time.monotonic()))
+                    continue
+
+                timeout = max(0.0, delayed[0][0] - time.monotonic()) if delayed else None
+                done, _ = wait(list(inflight), timeout=timeout, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    attempt, idxs = inflight.pop(fut)
+                    try:
+                        vecs = fut.result()
+                    except Exception as e:
+                        if is_throttle_error(e):
+                            # Kısıtlama: hiçbir öğe işlenmedi; eşzamanlılığı düşür, bekle, tekrar dene
+                            self.stats["throttled"] += 1
+                            conc.on_throttle()
+                            _requeue(attempt + 1, idxs, self._backoff(attempt + 1), e)
+                        elif len(idxs) > 1:
+                            # Sorunlu öğeyi yalıtmak için partiyi ikiye böl; bölme bir deneme sayılmaz,
+                            # deneme bütçesi yalnızca aynı dilimin tekrarında harcanır
+                            self.stats["splits"] += 1
+                            mid = len(idxs) // 2
+                            ready.append((attempt, idxs[:mid]))
+                            ready.append((attempt, idxs[mid:]))
+                        else:
+                            _requeue(attempt + 1, idxs, self._backoff(attempt + 1), e)
+                        continue
+
+                    conc.on_success()
+                    vecs = list(vecs or [])
+                    failed: List[int] = []
+                    for j, i in enumerate(idxs):
+                        v = vecs[j] if j < len(vecs) else None
+                        if v is None or len(v) == 0:
+                            failed.append(i)
+                        else:
+                            out[i] = list(v)
+                    self.stats["items"] += len(idxs) - len(failed)
+                    if failed:
+                        # Kısmi sonuç: yalnızca eksik öğeleri tekrar gönder
+                        _requeue(attempt + 1, failed, self._backoff(attempt + 1),
+                                 RuntimeError(f"{len(failed)} öğe için boş embedding döndü"))
+
+        return out  # type: ignore[return-value]
+
+
+# --------- Hızlı test ---------
+if __name__ == "__main__":
+    import random
+
+    calls = {"n": 0}
+
+    def fake_send(batch: Sequence[str]) -> List[List[float]]:
+        calls["n"] += 1
+        time.sleep(0.01)
+        if random.random() < 0.2:
+            raise RuntimeError("429 Resource exhausted")
+        return [[float(len(t)), float(sum(map(ord, t)) % 97)] for t in batch]
+
+    texts = [f"metin {i}" for i in range(100)]
+    eng = EmbedEngine(fake_send, batch_size=8, max_workers=4, rate_per_sec=50, base_sleep=0.01)
+    t0 = time.time()
+    vecs = eng.embed(texts)
+    ok = all(v == [float(len(t)), float(sum(map(ord, t)) % 97)] for t, v in zip(texts, vecs))
+    print(f"✅ embed_engine OK — sıra korundu: {ok} | istek: {calls['n']} | {eng.stats} | {time.time() - t0:.2f}s")
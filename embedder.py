@@ -2,37 +2,64 @@
 """
 Gemini embedding çağrılarını toplu (batch) ve güvenli (retry/backoff) şekilde saran yardımcılar.
 google-generativeai -> gemini_client.embed_texts fonksiyonunu kullanır.
+Partiler embed_engine.EmbedEngine ile eşzamanlı ve hız sınırlı gönderilir.
+Daha önce embed edilmiş metinler embed_cache üzerinden diskten/bellekten okunur.
 """
 
 from __future__ import annotations
-import time
 from typing import List, Sequence, Iterable, Callable, Optional
 
 # Tekil embedding çağrımızı buradan içe aktarıyoruz
-from gemini_client import embed_texts as _embed_texts
+from gemini_client import embed_texts as _embed_texts, EMB_MODEL
+from embed_cache import EmbeddingCache, get_cache
+from embed_engine import EmbedEngine
+from config import cfg
 
 
 class Embedder:
     def __init__(
         self,
-        batch_size: int = 32,
+        batch_size: int = cfg.EMBED_BATCH_SIZE,
         max_retries: int = 3,
         base_sleep: float = 0.5,
-        per_call_sleep: float = 0.02,
+        per_call_sleep: float = 0.0,
+        max_workers: int = cfg.EMBED_CONCURRENCY,
+        rate_per_sec: float = cfg.EMBED_RPS,
         embed_fn: Optional[Callable[[Sequence[str], float], List[List[float]]]] = None,
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: Optional[bool] = None,
+        model: Optional[str] = None,
     ) -> None:
         """
         :param batch_size: Her partide kaç metin işlenecek.
         :param max_retries: Hata durumunda yeniden deneme sayısı.
         :param base_sleep: Retry backoff için başlangıç bekleme süresi (sn).
-        :param per_call_sleep: Başarılı her alt çağrıdan sonra nazik bekleme (sn).
+        :param per_call_sleep: Başarılı her alt çağrıdan sonra nazik bekleme (sn); hız sınırı
+            artık rate_per_sec ile uygulandığı için varsayılan 0.
+        :param max_workers: Aynı anda uçuşta olabilecek en fazla parti isteği.
+        :param rate_per_sec: İstek/sn sınırı (token-bucket); 0 = sınırsız.
         :param embed_fn: Dışarıdan farklı bir embedding fonksiyonu enjekte etmek için (opsiyonel).
+        :param cache: Kullanılacak embedding önbelleği (varsayılan: paylaşılan get_cache()).
+        :param use_cache: Önbellek açık mı? Varsayılan: embed_fn verilmediyse ya da cache verildiyse açık.
+        :param model: Önbellek anahtarındaki model adı (varsayılan: gemini_client.EMB_MODEL).
         """
         self.batch_size = batch_size
         self.max_retries = max_retries
         self.base_sleep = base_sleep
         self.per_call_sleep = per_call_sleep
         self._embed_fn = embed_fn or _embed_texts
+        self.model = model or EMB_MODEL
+        if use_cache is None:
+            use_cache = embed_fn is None or cache is not None
+        self.cache: Optional[EmbeddingCache] = (cache or get_cache()) if use_cache else None
+        self.engine = EmbedEngine(
+            self._embed_once,
+            batch_size=batch_size,
+            max_workers=max_workers,
+            rate_per_sec=rate_per_sec,
+            max_retries=max_retries,
+            base_sleep=base_sleep,
+        )
 
     def _embed_once(self, texts: Sequence[str]) -> List[List[float]]:
         # gemini_client.embed_texts(texts, sleep=per_call_sleep)
@@ -41,28 +68,32 @@ class Embedder:
     def embed_batched(self, texts: Sequence[str]) -> List[List[float]]:
         """
         Büyük bir metin listesini parçalara bölerek embedding üretir.
-        Hata durumunda üssel (exponential) backoff ile yeniden dener.
+        Önbellekte olanlar ağa gitmez; yalnızca eksik (ve tekilleştirilmiş) metinler embed edilir.
         """
-        vectors: List[List[float]] = []
         if not texts:
-            return vectors
+            return []
+        if self.cache is None:
+            return self._embed_remote(texts)
 
-        for i in range(0, len(texts), self.batch_size):
-            chunk = texts[i : i + self.batch_size]
-            attempt = 0
-            while True:
-                try:
-                    vecs = self._embed_once(chunk)
-                    vectors.extend(vecs)
-                    break
-                except Exception as e:
-                    attempt += 1
-                    if attempt > self.max_retries:
-                        raise RuntimeError(f"Embedding başarısız (denemeler bitti): {e}") from e
-                    # üssel backoff
-                    sleep_sec = self.base_sleep * (2 ** (attempt - 1))
-                    time.sleep(sleep_sec)
-        return vectors
+        cached = self.cache.get_many(self.model, texts)
+        todo: List[str] = []
+        seen = set()
+        for t, v in zip(texts, cached):
+            if v is None and t not in seen:
+                seen.add(t); todo.append(t)
+        if todo:
+            fresh = self._embed_remote(todo)
+            self.cache.put_many(self.model, todo, fresh)
+            by_text = dict(zip(todo, fresh))
+            cached = [v if v is not None else by_text[t] for t, v in zip(texts, cached)]
+        return cached  # type: ignore[return-value]
+
+    def _embed_remote(self, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Metinleri EmbedEngine ile paralel partiler halinde uzak modele gönderir.
+        429/5xx'te eşzamanlılık düşer; yeniden denemeler öğe bazlıdır.
+        """
+        return self.engine.embed(texts)
 
 
 # --------- Hızlı test ---------
@@ -72,7 +103,10 @@ if __name__ == "__main__":
         "Kredi karti limitim dolarsa ne olur?",
         "Kazanilan Harçlik (bonus) nasil kullanilir?"
     ]
-    emb = Embedder(batch_size=2, max_retries=3, base_sleep=0.5, per_call_sleep=0.02)
+    emb = Embedder(batch_size=2, max_retries=3, base_sleep=0.5)
     vecs = emb.embed_batched(demo_texts)
     dims = len(vecs[0]) if vecs else 0
     print(f"✅ embedder.py OK — {len(vecs)} adet vektör üretildi, boyut: {dims}")
+    if emb.cache is not None:
+        print("📊 Önbellek:", emb.cache.stats())
+    print("📊 Motor:", emb.engine.stats)
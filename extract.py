@@ -0,0 +1,328 @@
+# extract.py
+"""
+PDF metin çıkarma aşaması (ingest için).
+- Eksik sayfalar bir süreç havuzunda (ProcessPoolExecutor) dosya + sayfa aralıkları üzerine dağıtılır;
+  birkaç dosya önceden kuyruğa alındığı için çıkarma hızı çekirdek sayısıyla ölçeklenir.
+- Her sayfanın metni (dosya hash'i, sayfa no) anahtarıyla SQLite'ta önbelleğe alınır.
+  Sayfanın içerik akışı ve kaynaklarından (/Resources: font, XObject...) hesaplanan parmak izi de saklanır;
+  böylece tek sayfası değişen
+  bir kılavuzda (dosya hash'i değişse bile) yalnızca değişen sayfalar yeniden çıkarılır.
+- Havuz fork yerine forkserver (yoksa spawn) ile süreç başlatır: ingest havuzu üretici iş parçacığından
+  kullanır ve çok iş parçacıklı bir süreçten fork, başka bir iş parçacığının tuttuğu kilitleri çocuğa
+  kilitli kopyalayabilir. Bu yüzden havuzu kullanan betikler `if __name__ == "__main__":` korumalı olmalıdır.
+- Parmak izleri de havuzda (dosya başına bir görev) ve akışların ham (çözülmemiş) baytlarından hesaplanır.
+- Önbellek cfg.EXTRACT_CACHE_MAX_PAGES sayfayla sınırlıdır; aşılınca en eski yazılan sayfalar silinir.
+"""
+
+from __future__ import annotations
+import os, time, sqlite3, hashlib, threading
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import cfg
+
+_PdfReader = None   # pypdf ilk PDF açılışında yüklenir (import'ta ve yalnızca TXT olan korpuslarda hiç yüklenmez)
+
+PAGES_PER_TASK = 16     # Bir süreç görevinde çıkarılan sayfa sayısı
+LOOKAHEAD_FILES = 4     # Tüketilmeden önce çıkarması başlatılan dosya sayısı
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    file_hash TEXT NOT NULL,
+    page      INTEGER NOT NULL,
+    page_hash TEXT NOT NULL,
+    text      TEXT NOT NULL,
+    PRIMARY KEY (file_hash, page)
+);
+CREATE INDEX IF NOT EXISTS idx_pages_page_hash ON pages(page_hash);
+"""
+
+def open_pdf(path: str):
+    global _PdfReader
+    if _PdfReader is None:
+        try:
+            from pypdf import PdfReader            # PDF için
+        except Exception:
+            raise RuntimeError("pypdf kurulu değil. `pip install pypdf` ile kurun veya TXT kullanın.")
+        _PdfReader = PdfReader
+    return _PdfReader(path)
+
+def _obj_digest(obj, memo: Dict[Tuple[int, int], bytes], stack: set) -> bytes:
+    """PDF nesnesinin (sözlük, dizi, akış; dolaylı referanslar izlenerek) içerik özeti.
+    memo: dosya içinde paylaşılan nesneler (fontlar, form XObject'leri) sayfa başına yeniden özetlenmez."""
+    key = None
+    if hasattr(obj, "idnum") and hasattr(obj, "get_object"):      # IndirectObject
+        key = (obj.idnum, obj.generation)
+        if key in memo:
+            return memo[key]
+        if key in stack:
+            return b"<cycle>"
+        stack.add(key)
+        obj = obj.get_object()
+    h = hashlib.sha1()
+    h.update(type(obj).__name__.encode())
+    if isinstance(obj, dict):
+        for k in sorted(obj.keys()):
+            if k == "/Parent":   # sayfa ağacına geri referans: içerik değil
+                continue
+            h.update(str(k).encode())
+            h.update(_obj_digest(obj.raw_get(k) if hasattr(obj, "raw_get") else obj[k], memo, stack))
+        if hasattr(obj, "get_data"):                              # akış: sözlük + ham (çözülmemiş) veri
+            h.update(getattr(obj, "_data", b"") or b"")           # filtre çözmek (görüntüler!) gereksiz maliyet
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            h.update(_obj_digest(v, memo, stack))
+    else:
+        h.update(repr(obj).encode())
+    out = h.digest()
+    if key is not None:
+        stack.discard(key)
+        memo[key] = out
+    return out
+
+def _page_fingerprint(page, memo: Optional[Dict[Tuple[int, int], bytes]] = None) -> str:
+    """
+    Sayfanın parmak izi (metin çıkarmadan): içerik akışı + döndürme + /Resources (fontlar, XObject'ler,
+    özyinelemeli). Yalnızca içerik akışına bakmak yetmez: `/Fm0 Do` gibi yalnızca bir form XObject'i çağıran ya da
+    aynı akışı farklı fontlarla çizen sayfalar aynı izi alır ve başka bir belgenin metni yeniden kullanılırdı.
+    Akışların ham baytları özetlenir (get_contents() / get_data() filtreleri çözerdi).
+    """
+    memo = {} if memo is None else memo
+    h = hashlib.sha1()
+    try:
+        contents = page.raw_get("/Contents") if "/Contents" in page else None
+        if contents is not None:
+            h.update(_obj_digest(contents, memo, set()))
+    except Exception:
+        h.update(b"<contents?>")
+    h.update(str(page.get("/Rotate", 0)).encode())
+    try:
+        res = page.raw_get("/Resources") if "/Resources" in page else None   # pypdf miras alınanı sayfaya kopyalar
+        if res is not None:
+            h.update(_obj_digest(res, memo, set()))
+    except Exception:
+        h.update(b"<resources?>")
+    return h.hexdigest()
+
+def page_fingerprints(path: str) -> List[str]:
+    """Süreç havuzunda da çalışır: dosyanın tüm sayfalarının parmak izleri."""
+    reader = open_pdf(path)
+    memo: Dict[Tuple[int, int], bytes] = {}
+    return [_page_fingerprint(p, memo) for p in reader.pages]
+
+def _mp_context():
+    methods = mp.get_all_start_methods()
+    return mp.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _extract_range(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Süreç havuzunda çalışır: [start, stop) sayfalarının metnini döndürür."""
+    reader = open_pdf(path)
+    return [(i, reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+
+class PageCache:
+    def __init__(self, path: str, max_pages: Optional[int] = None) -> None:
+        """
+        :param max_pages: En fazla saklanan sayfa (varsayılan cfg.EXTRACT_CACHE_MAX_PAGES; 0 = sınırsız).
+                          Aşılınca en eski yazılan sayfalar silinir (INSERT OR REPLACE satırı tazeler).
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.max_pages = cfg.EXTRACT_CACHE_MAX_PAGES if max_pages is None else max_pages
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, file_hash: str, fingerprints: List[str]) -> Dict[int, str]:
+        """Önbellekte bulunan sayfalar: {sayfa no: metin}."""
+        found: Dict[int, str] = {}
+        with self._lock:
+            for page, text, ph in self._db.execute(
+                "SELECT page, text, page_hash FROM pages WHERE file_hash=?", (file_hash,)
+            ):
+                if page < len(fingerprints) and fingerprints[page] == ph:
+                    found[page] = text
+            # Dosya değişmiş olabilir: aynı içerik akışına sahip sayfaları parmak iziyle bul
+            missing = [(i, fp) for i, fp in enumerate(fingerprints) if i not in found]
+            for i, fp in missing:
+                row = self._db.execute("SELECT text FROM pages WHERE page_hash=? LIMIT 1", (fp,)).fetchone()
+                if row is not None:
+                    found[i] = row[0]
+            self.hits += len(found)
+            self.misses += len(fingerprints) - len(found)
+        return found
+
+    def put_many(self, file_hash: str, rows: List[Tuple[int, str, str]]) -> None:
+        """rows: (sayfa no, parmak izi, metin)"""
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pages(file_hash, page, page_hash, text) VALUES (?,?,?,?)",
+                [(file_hash, p, ph, t) for p, ph, t in rows],
+            )
+            if self.max_pages > 0:
+                excess = self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0] - self.max_pages
+                if excess > 0:
+                    self._db.execute("DELETE FROM pages WHERE rowid IN "
+                                     "(SELECT rowid FROM pages ORDER BY rowid LIMIT ?)", (excess,))
+            self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class _Prepared:
+    """Bir PDF için parmak izi future'ı; izler gelince önbellekten gelen sayfalar + eksik aralıkların future'ları."""
+
+    def __init__(self, path: str, file_hash: str, fps: Future) -> None:
+        self.path = path
+        self.file_hash = file_hash
+        self.fps = fps
+        self.fingerprints: Optional[List[str]] = None   # _plan() doldurur
+        self.cached: Dict[int, str] = {}
+        self.futures: List[Tuple[int, int, Future]] = []
+
+
+class PdfExtractor:
+    def __init__(
+        self,
+        workers: int = 0,
+        pages_per_task: int = PAGES_PER_TASK,
+        lookahead: int = LOOKAHEAD_FILES,
+        cache: Optional[PageCache] = None,
+    ) -> None:
+        """
+        :param workers: Süreç sayısı (0 = çekirdek sayısı, 1 = süreç havuzu olmadan).
+        :param pages_per_task: Bir görevde çıkarılan sayfa sayısı.
+        :param lookahead: Çıkarması önceden başlatılan en fazla dosya.
+        :param cache: Sayfa önbelleği (varsayılan: cfg.EXTRACT_CACHE_PATH).
+        """
+        self.workers = workers or (os.cpu_count() or 1)
+        self.pages_per_task = max(1, pages_per_task)
+        self.lookahead = max(1, lookahead)
+        self.cache = cache or PageCache(cfg.EXTRACT_CACHE_PATH)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.extracted_pages = 0
+        self.seconds = 0.0
+
+    def __enter__(self) -> "PdfExtractor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        if self.workers <= 1:
+            fut: Future = Future()
+            try:
+                fut.set_result(fn(*args))
+            except Exception as e:
+                fut.set_exception(e)
+            return fut
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context())
+        return self._pool.submit(fn, *args)
+
+    def _prepare(self, path: str, file_hash: str) -> _Prepared:
+        return _Prepared(path, file_hash, self._submit(page_fingerprints, path))
+
+    def _plan(self, prep: _Prepared) -> None:
+        """Parmak izleri gelince (gerekirse bekler) önbelleğe bakar ve eksik aralıkları havuza verir."""
+        if prep.fingerprints is not None:
+            return
+        fps = prep.fps.result()
+        prep.cached = self.cache.lookup(prep.file_hash, fps)
+        missing = [i for i in range(len(fps)) if i not in prep.cached]
+        # Ardışık eksik sayfaları pages_per_task'lik aralıklara böl
+        run: List[int] = []
+        for i in missing + [-1]:
+            if run and (i != run[-1] + 1 or len(run) >= self.pages_per_task):
+                prep.futures.append((run[0], run[-1] + 1, self._submit(_extract_range, prep.path, run[0], run[-1] + 1)))
+                run = []
+            if i >= 0:
+                run.append(i)
+        prep.fingerprints = fps
+
+    def _iter_prepared(self, prep: _Prepared) -> Iterator[str]:
+        t0 = time.time()
+        fresh: Dict[int, str] = {}
+        pending = deque(prep.futures)
+        for i in range(len(prep.fingerprints)):
+            if i in prep.cached:
+                text = prep.cached[i]
+            else:
+                while i not in fresh:
+                    _, _, fut = pending.popleft()
+                    fresh.update(fut.result())
+                text = fresh[i]
+            if i:
+                yield "\n"  # ingest._read_pdf ile aynı sayfa ayırıcı
+            yield text
+        self.cache.put_many(prep.file_hash, [(i, prep.fingerprints[i], t) for i, t in fresh.items()])
+        self.extracted_pages += len(fresh)
+        self.seconds += time.time() - t0
+
+    def iter_files(
+        self,
+        items: Iterable[Tuple[str, str]],
+        fallback: Callable[[str], Iterator[str]],
+    ) -> Iterator[Tuple[str, Iterator[str]]]:
+        """
+        (yol, dosya hash'i) çiftlerini sırayla işler; her dosya için (yol, metin parçaları) üretir.
+        PDF'lerin çıkarması `lookahead` dosya önceden başlatılır; diğer türler `fallback` ile okunur.
+        Her dosyanın parçaları bir sonraki dosyaya geçmeden tüketilmelidir.
+        """
+        window: Deque[Tuple[str, Optional[_Prepared]]] = deque()
+        it = iter(items)
+
+        def _fill() -> None:
+            while len(window) < self.lookahead:
+                nxt = next(it, None)
+                if nxt is None:
+                    return
+                path, fhash = nxt
+                is_pdf = os.path.splitext(path)[1].lower() == ".pdf"
+                window.append((path, self._prepare(path, fhash) if is_pdf else None))
+
+        _fill()
+        while window:
+            path, prep = window.popleft()
+            if prep is not None:
+                self._plan(prep)
+            _fill()
+            for _, nxt in window:   # izleri hazır olan sonraki dosyaların çıkarması da şimdiden başlasın
+                if nxt is not None and nxt.fps.done():
+                    self._plan(nxt)
+            yield path, (self._iter_prepared(prep) if prep is not None else fallback(path))
+
+    def stats(self) -> Dict[str, float]:
+        return {**self.cache.stats(), "extracted_pages": self.extracted_pages,
+                "workers": self.workers, "seconds": round(self.seconds, 3)}
+
+
+# --------- Hızlı test ---------
+if __name__ == "__main__":
+    import sys
+    pdfs = [p for p in sys.argv[1:] if p.lower().endswith(".pdf")]
+    if not pdfs:
+        print("ℹ️ Kullanım: python extract.py dosya1.pdf [dosya2.pdf ...]")
+    else:
+        def _fh(p: str) -> str:
+            with open(p, "rb") as f:
+                return hashlib.sha1(f.read()).hexdigest()
+        with PdfExtractor() as ex:
+            t0 = time.time()
+            for path, parts in ex.iter_files(((p, _fh(p)) for p in pdfs), fallback=lambda p: iter(())):
+                n = sum(len(x) for x in parts)
+                print(f"📄 {os.path.basename(path)}: {n} karakter")
+            print(f"✅ extract.py OK — {ex.stats()} | {time.time() - t0:.2f}s")
@@ -0,0 +1,156 @@
+# fake_backends.py
+"""
+Ağ gerektirmeyen, deterministik Gemini yerine geçen arka uç (yük testi / çevrimdışı geliştirme için).
+- gemini_client'ın kullandığı google.generativeai alt kümesini uygular: configure, embed_content(_async),
+  GenerativeModel.generate_content(stream=...) ve generate_content_async.
+- Embedding: terimlerin (lexical.tokenize) özellik karması (feature hashing) -> benzer metinler benzer vektör,
+  böylece retrieval anlamlı sonuç döndürür.
+- Gecikme: çağrı başına taban süre + öğe/token başına süre; sapma (jitter) ve seyrek kuyruk (tail)
+  girdinin karmasından türetilir, yani aynı girdi her koşuda aynı gecikmeyi alır.
+
+Kullanım: install(FakeGenAI(...)) -> gemini_client üzerinden yapılan tüm çağrılar sahte arka uca gider.
+"""
+
+from __future__ import annotations
+import re, time, zlib, asyncio, threading
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+from lexical import tokenize
+
+
+def _unit_hash(text: str, salt: str = "") -> float:
+    """Girdiye bağlı, [0, 1) aralığında deterministik sayı."""
+    return (zlib.crc32((salt + text).encode("utf-8")) & 0xFFFFFFFF) / 2**32
+
+
+class _Resp:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class _FakeModel:
+    def __init__(self, owner: "FakeGenAI", name: str) -> None:
+        self.owner = owner
+        self.model_name = name
+
+    def generate_content(self, contents: str, generation_config: Any = None, stream: bool = False, **kw: Any):
+        tokens = self.owner._answer_tokens(contents)
+        first, per_token = self.owner._gen_latency(contents)
+        self.owner._count("generate")
+        if not stream:
+            time.sleep(first + per_token * len(tokens))
+            return _Resp("".join(tokens).strip())
+
+        def _iter() -> Iterator[_Resp]:
+            time.sleep(first)
+            for i in range(0, len(tokens), 4):      # parça başına ~4 token
+                part = tokens[i:i + 4]
+                if i:
+                    time.sleep(per_token * len(part))
+                yield _Resp("".join(part))
+        return _iter()
+
+    async def generate_content_async(self, contents: str, generation_config: Any = None, **kw: Any) -> _Resp:
+        tokens = self.owner._answer_tokens(contents)
+        first, per_token = self.owner._gen_latency(contents)
+        self.owner._count("generate")
+        await asyncio.sleep(first + per_token * len(tokens))
+        return _Resp("".join(tokens).strip())
+
+
+class FakeGenAI:
+    def __init__(
+        self,
+        dim: int = 256,
+        embed_ms: float = 40.0,
+        embed_item_ms: float = 0.5,
+        ttft_ms: float = 350.0,
+        token_ms: float = 12.0,
+        answer_tokens: int = 60,
+        jitter: float = 0.2,
+        tail_p: float = 0.01,
+        tail_x: float = 4.0,
+    ) -> None:
+        """
+        :param dim: Embedding boyutu.
+        :param embed_ms: Embedding isteği başına taban gecikme (ms).
+        :param embed_item_ms: Batch'teki her içerik için ek gecikme (ms).
+        :param ttft_ms: Üretimde ilk token'a kadar gecikme (ms).
+        :param token_ms: Sonraki her token için gecikme (ms).
+        :param answer_tokens: Üretilen cevabın yaklaşık token sayısı.
+        :param jitter: Gecikmelere uygulanan ±oran.
+        :param tail_p: Çağrının kuyruk gecikmesine düşme olasılığı.
+        :param tail_x: Kuyruk gecikmesinin çarpanı.
+        """
+        self.dim = dim
+        self.embed_ms, self.embed_item_ms = embed_ms, embed_item_ms
+        self.ttft_ms, self.token_ms = ttft_ms, token_ms
+        self.answer_tokens = answer_tokens
+        self.jitter, self.tail_p, self.tail_x = jitter, tail_p, tail_x
+        self.calls: Dict[str, int] = {"embed": 0, "embed_items": 0, "generate": 0}
+        self._lock = threading.Lock()
+
+    # ---- yardımcılar ----
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.calls[key] += n
+
+    def _scale(self, text: str) -> float:
+        f = 1.0 + self.jitter * (2.0 * _unit_hash(text, "j") - 1.0)
+        if _unit_hash(text, "t") < self.tail_p:
+            f *= self.tail_x
+        return max(0.0, f)
+
+    def _embed_latency(self, texts: Sequence[str]) -> float:
+        key = texts[0] if texts else ""
+        return self._scale(key) * (self.embed_ms + self.embed_item_ms * len(texts)) / 1e3
+
+    def _gen_latency(self, prompt: str) -> Tuple[float, float]:
+        f = self._scale(prompt)
+        return f * self.ttft_ms / 1e3, f * self.token_ms / 1e3
+
+    def vector(self, text: str) -> List[float]:
+        v = [0.0] * self.dim
+        toks = tokenize(text) or [text or " "]
+        for t in toks:
+            h = zlib.crc32(t.encode("utf-8"))
+            v[h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        n = sum(x * x for x in v) ** 0.5 or 1.0
+        return [x / n for x in v]
+
+    def _answer_tokens(self, prompt: str) -> List[str]:
+        # Bağlamdan ilk kelimeler + kaynak satırı: deterministik, bağlama dayalı bir "cevap"
+        m = re.search(r"--- BAĞLAM BAŞI ---(.*?)--- BAĞLAM SONU ---", prompt, re.S)
+        words = re.findall(r"\w+[.,]?", m.group(1) if m else prompt)[: self.answer_tokens]
+        return [w + " " for w in words] + ["\nKaynaklar: bağlam"]
+
+    # ---- google.generativeai arayüzü ----
+    def configure(self, **kw: Any) -> None:
+        pass
+
+    def embed_content(self, model: str, content: Union[str, Sequence[str]], **kw: Any) -> Dict[str, Any]:
+        many = not isinstance(content, str)
+        texts = list(content) if many else [content]
+        self._count("embed"); self._count("embed_items", len(texts))
+        time.sleep(self._embed_latency(texts))
+        vecs = [self.vector(t) for t in texts]
+        return {"embedding": vecs if many else vecs[0]}
+
+    async def embed_content_async(self, model: str, content: Union[str, Sequence[str]], **kw: Any) -> Dict[str, Any]:
+        many = not isinstance(content, str)
+        texts = list(content) if many else [content]
+        self._count("embed"); self._count("embed_items", len(texts))
+        await asyncio.sleep(self._embed_latency(texts))
+        vecs = [self.vector(t) for t in texts]
+        return {"embedding": vecs if many else vecs[0]}
+
+    def GenerativeModel(self, name: str, **kw: Any) -> _FakeModel:
+        return _FakeModel(self, name)
+
+
+def install(fake: FakeGenAI) -> FakeGenAI:
+    """gemini_client'ı sahte arka uca yönlendirir (önbellekli model nesneleri de sıfırlanır)."""
+    import gemini_client
+    gemini_client.genai = fake
+    gemini_client.get_model.cache_clear()
+    return fake
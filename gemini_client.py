@@ -1,8 +1,10 @@
 # gemini_client.py  — test çıktılı sürüm
-import os, time
-from typing import List, Sequence
+import os, time, threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Sequence
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from embed_cache import get_cache
 
 # .env dosyasını oku
 load_dotenv()
@@ -12,44 +14,151 @@ API_KEY = os.getenv("GEMINI_API_KEY", "")
 GEN_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
 EMB_MODEL = os.getenv("GEMINI_EMBED_MODEL", "models/embedding-001")
 TEMP = float(os.getenv("TEMPERATURE", "0.2"))
+BACKEND = os.getenv("LLM_BACKEND", "gemini")   # "gemini" ya da "fake" (fake_backends.py, ağsız)
+
+# -------- İstemci (ilk kullanımda kurulur) --------
+# google.generativeai ağır bir import (grpc, protobuf); anahtar kontrolü ve configure() ilk çağrıya
+# ertelenir ki bu modülü (retriever/rag üzerinden) import eden CLI araçları ve işçiler hızlı açılsın.
+genai: Any = None   # fake_backends.install() bunu doğrudan değiştirebilir
+_genai_lock = threading.Lock()
+
+def _load_gemini() -> Any:
+    # Anahtar kontrolü
+    if not API_KEY:
+        raise RuntimeError("GEMINI_API_KEY .env içinde bulunamadı — anahtarı ekle!")
+    import google.generativeai as sdk
+    # Gemini istemcisini yapılandır
+    sdk.configure(api_key=API_KEY)
+    return sdk
 
-# Anahtar kontrolü
-if not API_KEY:
-    raise RuntimeError("GEMINI_API_KEY .env içinde bulunamadı — anahtarı ekle!")
+def _load_fake() -> Any:
+    from fake_backends import FakeGenAI
+    return FakeGenAI()
 
-# Gemini istemcisini yapılandır
-genai.configure(api_key=API_KEY)
+# ad -> yükleyici (google.generativeai ile aynı arayüzü sunan nesne döndürür)
+_BACKENDS: Dict[str, Callable[[], Any]] = {
+    "gemini": _load_gemini,
+    "fake": _load_fake,
+}
+
+def _sdk() -> Any:
+    global genai
+    if genai is None:
+        with _genai_lock:
+            if genai is None:
+                try:
+                    loader = _BACKENDS[BACKEND]
+                except KeyError:
+                    raise ValueError(f"Bilinmeyen LLM_BACKEND: {BACKEND!r} (seçenekler: {', '.join(_BACKENDS)})")
+                genai = loader()
+    return genai
+
+def warm_up() -> None:
+    """İstemciyi (ağır import + configure) şimdi kurar; zaman ölçülen ilk çağrı bunu ödemesin diye."""
+    _sdk()
 
 # -------- Metin Üretimi --------
+@lru_cache(maxsize=8)
+def get_model(name: str = GEN_MODEL) -> Any:
+    """Model nesnesi süreç başına bir kez kurulur ve tüm çağrılarda (eşzamanlı olanlar dahil) paylaşılır."""
+    return _sdk().GenerativeModel(name)
+
 def generate_text(prompt: str, temperature: float | None = None, system: str = "") -> str:
     """
     Gemini modelinden kısa bir yanıt alır.
     """
     temperature = TEMP if temperature is None else temperature
-    model = genai.GenerativeModel(GEN_MODEL)
+    model = get_model()
     contents = f"{system}\n\n{prompt}" if system else prompt
     resp = model.generate_content(contents, generation_config={"temperature": temperature})
     return (resp.text or "").strip()
 
+def generate_text_stream(prompt: str, temperature: float | None = None, system: str = "") -> Iterator[str]:
+    """
+    generate_text'in akış sürümü: model ürettikçe metin parçalarını (delta) döndürür.
+    """
+    temperature = TEMP if temperature is None else temperature
+    model = get_model()
+    contents = f"{system}\n\n{prompt}" if system else prompt
+    resp = model.generate_content(contents, generation_config={"temperature": temperature}, stream=True)
+    for chunk in resp:
+        try:
+            text = chunk.text
+        except ValueError:   # güvenlik filtresi vb. nedeniyle metinsiz parça
+            continue
+        if text:
+            yield text
+
+async def generate_text_async(prompt: str, temperature: float | None = None, system: str = "") -> str:
+    """
+    generate_text'in asyncio sürümü: ağ beklemesi sırasında olay döngüsü diğer isteklere döner.
+    """
+    temperature = TEMP if temperature is None else temperature
+    contents = f"{system}\n\n{prompt}" if system else prompt
+    resp = await get_model().generate_content_async(contents, generation_config={"temperature": temperature})
+    return (resp.text or "").strip()
+
 # -------- Embedding (RAG için) --------
-def embed_texts(texts: Sequence[str], sleep: float = 0.02) -> List[List[float]]:
+EMBED_MAX_BATCH = 100  # Gemini tek istekte en fazla 100 içerik kabul eder
+
+def embed_texts(texts: Sequence[str], sleep: float = 0.0) -> List[List[float]]:
     """
     Metin listesini embedding vektörlerine çevirir.
+    Metinler tek tek değil, çok içerikli (batch) isteklerle gönderilir.
     """
     vecs: List[List[float]] = []
-    for t in texts:
-        r = genai.embed_content(model=EMB_MODEL, content=t)
-        vecs.append(r["embedding"])
+    for i in range(0, len(texts), EMBED_MAX_BATCH):
+        part = list(texts[i : i + EMBED_MAX_BATCH])
+        r = _sdk().embed_content(model=EMB_MODEL, content=part)
+        vecs.extend(r["embedding"])
         if sleep:
             time.sleep(sleep)
     return vecs
 
-def embed_query(text: str) -> List[float]:
+def embed_query(text: str, use_cache: bool = True) -> List[float]:
     """
     Tek bir sorgu cümlesi için embedding döndürür.
+    Aynı (model, normalleştirilmiş metin) daha önce embed edildiyse önbellekten gelir.
+    """
+    cache = get_cache() if use_cache else None
+    if cache is not None:
+        vec = cache.get(EMB_MODEL, text)
+        if vec is not None:
+            return vec
+    r = _sdk().embed_content(model=EMB_MODEL, content=text)
+    vec = r["embedding"]
+    if cache is not None:
+        cache.put(EMB_MODEL, text, vec)
+    return vec
+
+async def embed_query_async(text: str, use_cache: bool = True) -> List[float]:
+    """
+    embed_query'nin asyncio sürümü (önbellek aynı).
+    """
+    cache = get_cache() if use_cache else None
+    if cache is not None:
+        vec = cache.get(EMB_MODEL, text)
+        if vec is not None:
+            return vec
+    r = await _sdk().embed_content_async(model=EMB_MODEL, content=text)
+    vec = r["embedding"]
+    if cache is not None:
+        cache.put(EMB_MODEL, text, vec)
+    return vec
+
+def embed_queries(texts: Sequence[str], use_cache: bool = True) -> List[List[float]]:
+    """
+    Birden çok sorguyu tek (batch) istekte embed eder; önbellekte olanlar ağa gitmez.
     """
-    r = genai.embed_content(model=EMB_MODEL, content=text)
-    return r["embedding"]
+    cache = get_cache() if use_cache else None
+    out = cache.get_many(EMB_MODEL, texts) if cache is not None else [None] * len(texts)
+    todo = list(dict.fromkeys(t for t, v in zip(texts, out) if v is None))
+    if todo:
+        fresh = dict(zip(todo, embed_texts(todo)))
+        if cache is not None:
+            cache.put_many(EMB_MODEL, todo, [fresh[t] for t in todo])
+        out = [v if v is not None else fresh[t] for t, v in zip(texts, out)]
+    return out
 
 # -------- Test Bloğu --------
 if __name__ == "__main__":
@@ -0,0 +1,221 @@
+# hot_answers.py
+"""
+En sık sorulan sorular için önceden hesaplanmış (offline) cevaplar.
+- Toplu iş: istek günlüğü (cfg.REQUEST_LOG_PATH, her satır "query" alanlı bir JSON) okunur; sorular
+  normalize edilmiş tam metne göre (answer_cache.normalize_query: büyük/küçük harf, noktalama, boşluk)
+  gruplanır, en sık soruların cevabı rag.answer_question ile güncel indeks sürümüne karşı üretilir.
+  Yalnızca aynı soru eşleşir: aynı kelimeleri farklı soruda kullanan bir soru başkasının cevabını almaz.
+- Sonuç küçük bir JSON dosyasına (cfg.HOT_ANSWERS_PATH) yazılır; sohbet yolu (rag._start) önce buraya bakar.
+  Arama tek sözlük erişimidir -> milisaniyenin altında.
+- Dosyadaki indeks sürümü güncel değilse cevaplar verilmez. Yeniden kurulum (en çok HOT_ANSWERS_TOP ücretli
+  üretim) ancak indeks sürümü HOT_ANSWERS_QUIET_SEC boyunca değişmeden kaldıysa ve son kurulumdan bu yana
+  HOT_ANSWERS_MIN_INTERVAL geçtiyse arka planda başlatılır; ingest sırasında her yazma yeni kurulum tetiklemez.
+- Açıkça etkinleştirilmelidir: günlük varsayılan olarak yalnızca sorgu hash'i tutar (kişisel veri).
+  Soru metni REQUEST_LOG_QUERY_TEXT=1 ile yazılır; kapalıyken arka planda kurulum yapılmaz (var olan dosya
+  boş bir kurulumla ezilmez) ve elle kurulum uyarı verir.
+
+Kullanım: python hot_answers.py [--top 50] [--min-count 3]
+"""
+
+from __future__ import annotations
+import os, json, time, threading, traceback
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import cfg
+from answer_cache import Params, normalize_query
+from telemetry import trace
+
+
+def iter_logged_queries(path: str = cfg.REQUEST_LOG_PATH) -> Iterator[str]:
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except OSError:
+        return
+    with f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+                # Yalnızca kullanıcı istekleri (ön hesaplama / yük testi gibi iç çağrılar "parent" taşır)
+                if rec.get("kind", "rag") != "rag" or rec.get("parent"):
+                    continue
+                q = rec.get("query")
+            except (ValueError, AttributeError):
+                continue
+            if isinstance(q, str) and q.strip():
+                yield q.strip()
+
+def cluster_queries(queries: Iterator[str], top: int, min_count: int) -> List[Tuple[str, int, str]]:
+    """
+    En sık sorular: [(temsilci yazım, toplam sayı, normalize soru)], sayıya göre azalan.
+    Gruplar normalize tam metindir; temsilci, grupta en sık geçen yazımdır.
+    """
+    counts: Counter = Counter()
+    variants: Dict[str, Counter] = defaultdict(Counter)
+    for q in queries:
+        key = normalize_query(q)
+        if not key:
+            continue
+        counts[key] += 1
+        variants[key][q] += 1
+    out = []
+    for key, n in counts.most_common():
+        if n < min_count or len(out) >= top:
+            break
+        out.append((variants[key].most_common(1)[0][0], n, key))
+    return out
+
+
+class HotAnswerStore:
+    def __init__(self, path: str = cfg.HOT_ANSWERS_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[int] = None
+        self._checked = 0.0
+        self.version: Optional[str] = None
+        self.params: Optional[Params] = None
+        self._by_query: Dict[str, int] = {}
+        self._answers: List[Dict[str, Any]] = []
+        self._building = False
+        self._seen_version: Optional[str] = None   # en son görülen indeks sürümü ve ilk görülme anı
+        self._seen_since = 0.0
+        self._last_build: Optional[float] = None
+        self.hits = 0
+
+    # ---- okuma ----
+    def _refresh(self) -> None:
+        # Dosya kontrolü saniyede en fazla bir kez (sıcak yolda stat bile yapılmasın)
+        now = time.monotonic()
+        if now - self._checked < 1.0:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.version, self.params = data.get("version"), tuple(data.get("params") or ()) or None
+        self._by_query = data.get("by_query", {})
+        self._answers, self._mtime = data.get("answers", []), mtime
+
+    def get(self, query: str, params: Params, version: str) -> Optional[Dict[str, Any]]:
+        """Önceden hesaplanmış cevap (parametreler ve indeks sürümü eşleşirse)."""
+        self._refresh()
+        # Sürüm kontrolü önce: hiç kurulmamış ya da boş kurulmuş depo da indeks değişince yeniden kurulur
+        if self.version != version:
+            self._maybe_rebuild(version)
+            return None
+        if not self._answers or self.params != tuple(params):
+            return None
+        i = self._by_query.get(normalize_query(query))
+        if i is None:
+            return None
+        self.hits += 1
+        resp = json.loads(json.dumps(self._answers[i]))   # çağıran değiştirebilir; kopya ver
+        resp.setdefault("meta", {})["cache"] = "hot"
+        return resp
+
+    # ---- kurulum ----
+    def build(self, top: int = cfg.HOT_ANSWERS_TOP, min_count: int = cfg.HOT_ANSWERS_MIN_COUNT,
+              log_path: str = cfg.REQUEST_LOG_PATH, verbose: bool = True) -> int:
+        """Günlükten en sık soruları kümeleyip cevaplarını üretir; yazılan küme sayısını döndürür."""
+        from rag import answer_question          # döngüsel import'tan kaçınmak için geç yükleme
+        from retriever import index_version
+
+        version = index_version()
+        if not cfg.REQUEST_LOG_QUERY_TEXT and verbose:
+            print("⚠️ REQUEST_LOG_QUERY_TEXT kapalı: günlükte soru metni yok (yalnızca hash). "
+                  "Sıcak cevaplar için REQUEST_LOG_QUERY_TEXT=1 ayarlayın; şimdilik yalnızca eski kayıtlar kullanılır.",
+                  flush=True)
+        clusters = cluster_queries(iter_logged_queries(log_path), top, min_count)
+        params: Params = (5, float(cfg.TEMPERATURE), cfg.MAX_CONTEXT_TOKENS)
+        by_query: Dict[str, int] = {}
+        answers: List[Dict[str, Any]] = []
+        for rep, n, norm in clusters:
+            with trace("hot_build"):
+                resp = answer_question(rep, top_k=params[0], temperature=params[1],
+                                       max_context_tokens=params[2], use_cache=False)
+            if not resp.get("sources"):
+                continue   # kaynaksız ("Bilmiyorum") cevaplar önceden hesaplanmaz
+            resp["meta"] = {k: v for k, v in resp.get("meta", {}).items() if k != "cache_stats"}
+            resp["meta"]["hot_count"] = n
+            by_query[norm] = len(answers)
+            answers.append(resp)
+            if verbose:
+                print(f"🔥 {n:>5}× {rep}", flush=True)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "params": list(params), "built_at": time.time(),
+                       "by_query": by_query, "answers": answers},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        self._checked = 0.0
+        if verbose:
+            print(f"✅ {len(answers)} sıcak cevap yazıldı (indeks sürümü {version}) -> {self.path}", flush=True)
+        return len(answers)
+
+    def _maybe_rebuild(self, version: str) -> None:
+        # Soru metni loglanmıyorsa kurulum boş çıkar: otomatik kurulum yalnızca açıkça etkinleştirilince
+        if not cfg.REQUEST_LOG_QUERY_TEXT:
+            return
+        # Sürüm ingest boyunca her yazmada değişir: yalnızca sakinleşince ve aralık dolunca kur
+        now = time.monotonic()
+        with self._lock:
+            if version != self._seen_version:
+                self._seen_version, self._seen_since = version, now
+                return
+            if now - self._seen_since < cfg.HOT_ANSWERS_QUIET_SEC:
+                return
+            if self._last_build is not None and now - self._last_build < cfg.HOT_ANSWERS_MIN_INTERVAL:
+                return
+        self.rebuild_async(version)
+
+    def rebuild_async(self, version: str) -> None:
+        """İndeks sürümü değiştiyse arka planda tek bir yeniden kurulum başlatır."""
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+            self._last_build = time.monotonic()
+
+        def _run():
+            try:
+                self.build(verbose=False)
+            except Exception:
+                print("❌ hot_answers: yeniden kurulum başarısız\n" + traceback.format_exc(), flush=True)
+            finally:
+                with self._lock:
+                    self._building = False
+
+        threading.Thread(target=_run, name="hot-answers", daemon=True).start()
+
+
+_shared: Optional[HotAnswerStore] = None
+_shared_lock = threading.Lock()
+
+def get_hot_store() -> HotAnswerStore:
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = HotAnswerStore()
+    return _shared
+
+
+# --------- Çalıştırma ---------
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Sık sorulan sorular için cevapları önceden hesapla")
+    ap.add_argument("--top", type=int, default=cfg.HOT_ANSWERS_TOP)
+    ap.add_argument("--min-count", type=int, default=cfg.HOT_ANSWERS_MIN_COUNT)
+    ap.add_argument("--log", default=cfg.REQUEST_LOG_PATH)
+    args = ap.parse_args()
+    get_hot_store().build(top=args.top, min_count=args.min_count, log_path=args.log)
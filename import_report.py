@@ -0,0 +1,97 @@
+# import_report.py
+"""
+Soğuk başlangıç (import süresi) ölçümü: her modül temiz bir Python sürecinde import edilir.
+- Süre: en iyi (min) ve medyan duvar saati, --repeat kez ölçülür.
+- Ağır bağımlılıklar: import sonrası sys.modules'te hangilerinin (pandas, chromadb, google.generativeai,
+  pypdf, streamlit, numpy) yüklendiği — tembel import'ların bozulduğu burada hemen görünür.
+- -X importtime çıktısından en pahalı (kümülatif) alt import'lar listelenir.
+- --max-ms verilirse herhangi bir modülün en iyi süresi eşiği aşınca çıkış kodu 1 olur.
+
+Not: app.py bir Streamlit betiği olduğundan (import = sayfayı çalıştırmak) listede yoktur.
+
+Kullanım: python import_report.py [--modules config,retriever,rag] [--repeat 5] [--top 5] [--json rapor.json]
+"""
+
+from __future__ import annotations
+import os, sys, json, argparse, statistics, subprocess
+from typing import Any, Dict, List, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.dirname(__file__))
+
+MODULES = ["config", "telemetry", "gemini_client", "retriever", "rag", "ingest", "rules", "simulator", "hot_answers"]
+HEAVY = ["numpy", "pandas", "chromadb", "google.generativeai", "pypdf", "streamlit"]
+
+_PROBE = (
+    "import sys, time, json\n"
+    "t = time.perf_counter()\n"
+    "import {mod}\n"
+    "ms = 1e3 * (time.perf_counter() - t)\n"
+    "print(json.dumps({{'ms': ms, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))\n"
+)
+
+
+def _importtime(stderr: str, top: int) -> List[Tuple[str, float]]:
+    """`-X importtime` satırlarından (modül, kümülatif ms) — en pahalı `top` tanesi."""
+    rows: List[Tuple[str, float]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cum, name = line[len("import time:"):].split("|", 2)
+            rows.append((name.strip(), int(cum) / 1e3))
+        except ValueError:
+            continue
+    rows.sort(key=lambda r: -r[1])
+    return rows[:top]
+
+def measure(mod: str, repeat: int = 5, top: int = 5) -> Dict[str, Any]:
+    code = _PROBE.format(mod=mod, heavy=HEAVY)
+    times: List[float] = []
+    heavy: List[str] = []
+    slowest: List[Tuple[str, float]] = []
+    for i in range(repeat):
+        args = [sys.executable] + (["-X", "importtime"] if i == 0 else []) + ["-c", code]
+        p = subprocess.run(args, cwd=ROOT_DIR, capture_output=True, text=True)
+        if p.returncode != 0:
+            err = (p.stderr.strip().splitlines() or ["?"])[-1]
+            return {"module": mod, "error": err}
+        out = json.loads(p.stdout.strip().splitlines()[-1])
+        times.append(out["ms"])
+        heavy = out["heavy"]
+        if i == 0:
+            slowest = [(n, round(ms, 1)) for n, ms in _importtime(p.stderr, top + 1) if n != mod][:top]
+    return {
+        "module": mod,
+        "best_ms": round(min(times), 1),
+        "median_ms": round(statistics.median(times), 1),
+        "heavy": heavy,
+        "slowest": slowest,
+    }
+
+
+# --------- Çalıştırma ---------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Modül import süreleri (soğuk başlangıç)")
+    ap.add_argument("--modules", default=",".join(MODULES))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--top", type=int, default=5, help="modül başına gösterilen en pahalı alt import sayısı")
+    ap.add_argument("--json", help="sonuçları bu dosyaya JSON olarak yaz")
+    ap.add_argument("--max-ms", type=float, help="en iyi süre bu değeri aşarsa çıkış kodu 1")
+    args = ap.parse_args()
+
+    results = [measure(m.strip(), args.repeat, args.top) for m in args.modules.split(",") if m.strip()]
+    print(f"{'modül':<16}{'en iyi':>10}{'medyan':>10}  ağır bağımlılıklar")
+    for r in results:
+        if "error" in r:
+            print(f"{r['module']:<16}{'—':>10}{'—':>10}  ❌ {r['error']}")
+            continue
+        print(f"{r['module']:<16}{r['best_ms']:>10.1f}{r['median_ms']:>10.1f}  {', '.join(r['heavy']) or '-'}")
+        for name, ms in r["slowest"]:
+            print(f"{'':<18}↳ {name:<34}{ms:>8.1f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    bad = [r for r in results if "error" in r or (args.max_ms is not None and r["best_ms"] > args.max_ms)]
+    if bad:
+        print(f"❌ Eşik aşıldı / hata: {', '.join(r['module'] for r in bad)}")
+        sys.exit(1)
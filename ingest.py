@@ -1,24 +1,29 @@
 # ingest.py
 # --- Akbank GenAI Bootcamp: Belgeleri indeksleme ---
 from __future__ import annotations
-import os, re, time, traceback
-from typing import List, Dict
+import os, re, time, json, uuid, queue, codecs, hashlib, threading, traceback, contextvars
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Set, Tuple, TypeVar
 
-from config import cfg
+from config import cfg, ensure_dirs
 from embedder import Embedder               # <-- DÜZELTME: Embedder sınıfını kullanıyoruz
-from retriever import get_collection, index_texts
-
-try:
-    from pypdf import PdfReader            # PDF için
-    HAS_PYPDF = True
-except Exception:
-    HAS_PYPDF = False
+from retriever import (
+    get_collection, index_texts, delete_ids, update_metadatas, reset_collection, flush as flush_indexes, CODEC,
+)
+from extract import PdfExtractor, open_pdf
+from dedup import DedupIndex, DedupStore
+from telemetry import trace, span, timed_iter, annotate
 
 # ---- Ayarlar ----
 CHUNK_SIZE = 800
 CHUNK_OVERLAP = 120
 BATCH_SIZE = 16
-MAX_CHUNKS = 200
+WRITE_BATCH = 64        # Chroma'ya tek seferde yazılan/silinen kayıt sayısı
+QUEUE_BATCHES = 4       # Aşamalar arası kuyrukta bekleyebilecek en fazla parti
+TXT_BLOCK = 1 << 16     # TXT dosyaları bu boyutta bloklarla okunur
+MAX_DEDUP_ROUNDS = 4    # Kanoniği değişen kopyalar için en fazla yeniden değerlendirme turu
+MANIFEST_PATH = os.path.join(cfg.CHROMA_DIR, "ingest_manifest.json")
+MANIFEST_VERSION = 3     # 3: parça id'leri uzantılı göreli yoldan (a.txt ile a.pdf çakışmasın)
+DEDUP_PATH = os.path.join(cfg.CHROMA_DIR, "dedup.sqlite")
 
 def _read_txt(path: str) -> str:
     # Windows'ta encoding sorunu yaşamamak için birkaç deneme
@@ -32,9 +37,7 @@ def _read_txt(path: str) -> str:
         return f.read()
 
 def _read_pdf(path: str) -> str:
-    if not HAS_PYPDF:
-        raise RuntimeError("pypdf kurulu değil. `pip install pypdf` ile kurun veya TXT kullanın.")
-    reader = PdfReader(path)
+    reader = open_pdf(path)
     pages = []
     for p in reader.pages:
         pages.append(p.extract_text() or "")
@@ -43,23 +46,88 @@ def _read_pdf(path: str) -> str:
 def _normalize(text: str) -> str:
     return re.sub(r"\s+", " ", (text or "")).strip()
 
+# ---- Akış (streaming) okuma: dosyanın tamamı belleğe alınmaz ----
+
+def _detect_encoding(path: str) -> Optional[str]:
+    """_read_txt ile aynı sırayla, dosyayı bellekte tutmadan uygun kodlamayı bulur."""
+    for enc in ("utf-8", "utf-8-sig", "latin-1"):
+        dec = codecs.getincrementaldecoder(enc)(errors="strict")
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(TXT_BLOCK), b""):
+                    dec.decode(block)
+            dec.decode(b"", final=True)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return None
+
+def _iter_txt(path: str) -> Iterator[str]:
+    enc = _detect_encoding(path)
+    with open(path, "r", encoding=enc or "utf-8", errors="strict" if enc else "ignore") as f:
+        for block in iter(lambda: f.read(TXT_BLOCK), ""):
+            yield block
+
+def _normalize_stream(parts: Iterable[str]) -> Iterator[str]:
+    """
+    Parça parça gelen metni _normalize ile birebir aynı sonucu verecek şekilde normalleştirir
+    (parça sınırındaki boşluklar tek boşluğa iner, baştaki/sondaki boşluk atılır).
+    """
+    started, pending_space = False, False
+    for p in parts:
+        if not p:
+            continue
+        lead, trail = p[0].isspace(), p[-1].isspace()
+        n = _normalize(p)
+        if not n:
+            pending_space = True
+            continue
+        if started and (pending_space or lead):
+            yield " "
+        yield n
+        started, pending_space = True, trail
+
 def _chunk(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
     out, start, L = [], 0, len(text)
     if L == 0: return out
     while start < L:
         end = min(L, start + size)
         out.append(text[start:end])
+        if end >= L: break  # son parça — overlap geri sarması sonsuz döngüye sokmasın
         start = max(0, end - overlap)
-        if start >= L: break
     return out
 
+def _chunk_stream(pieces: Iterable[str], size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> Iterator[str]:
+    """_chunk ile aynı parçaları, metnin tamamını belleğe almadan üretir."""
+    buf = ""
+    for piece in pieces:
+        buf += piece
+        # Sonrasında en az bir karakter varsa bu parça son parça değildir
+        while len(buf) > size:
+            yield buf[:size]
+            buf = buf[max(1, size - overlap):]
+    if buf:
+        yield buf
+
+def _is_doc(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.lower().endswith((".txt", ".pdf")) and not name.startswith((".", "~$"))
+
 def _scan_docs() -> List[str]:
+    # Alt klasörler de taranır
     os.makedirs(cfg.DOCS_DIR, exist_ok=True)
-    return sorted(
-        os.path.join(cfg.DOCS_DIR, n)
-        for n in os.listdir(cfg.DOCS_DIR)
-        if n.lower().endswith((".txt", ".pdf"))
-    )
+    out = []
+    for root, dirs, names in os.walk(cfg.DOCS_DIR):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        out.extend(os.path.join(root, n) for n in names if _is_doc(n))
+    return sorted(out)
+
+def _rel(path: str) -> str:
+    """DOCS_DIR'e göre göreli yol; manifest anahtarı ve `source` metadata'sı (üst düzeyde dosya adı)."""
+    return os.path.relpath(os.path.abspath(path), cfg.DOCS_DIR).replace(os.sep, "/")
+
+def _title(rel: str) -> str:
+    return os.path.splitext(rel)[0]
 
 def _ensure_demo(files: List[str]) -> List[str]:
     if files:
@@ -74,7 +142,240 @@ def _ensure_demo(files: List[str]) -> List[str]:
     print(f"ℹ️ Demo dosyası oluşturuldu: {demo}")
     return [demo]
 
-def ingest_docs(verbose: bool = True) -> int:
+# ---- Manifest (artımlı indeksleme) ----
+# Yapı: {"version": 3, "codec": str, "files": {"dosya.txt": {"size", "mtime_ns", "file_hash", "chunks": [hash, ...]}},
+#        "dedup_stamp": DEDUP_PATH deposunun (kanonik parçalar + takma adlar) son kayıt damgası}
+# Dosya boyutu+mtime aynıysa dosya hiç okunmaz; içerik hash'i aynıysa yeniden parçalanmaz;
+# değişen dosyada sadece hash'i değişen parçalar embed edilir.
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+def _chunk_hash(chunk: str) -> str:
+    return _sha1(chunk.encode("utf-8"))
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _load_manifest(path: str = MANIFEST_PATH) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION and isinstance(data.get("files"), dict):
+            return data
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+def _save_manifest(manifest: Dict[str, Any], path: str = MANIFEST_PATH) -> None:
+    # Yarım yazılmış manifest kalmasın diye önce geçici dosyaya yaz, sonra atomik değiştir
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _manifest_total(manifest: Dict[str, Any], aliases: int) -> int:
+    """Koleksiyonda olması gereken kayıt sayısı (kopya olarak birleştirilen parçalar hariç)."""
+    chunks = sum(len(e.get("chunks", [])) for e in manifest["files"].values())
+    return chunks - aliases
+
+_DEDUP_STORE: Optional[DedupStore] = None
+
+def _dedup_store() -> DedupStore:
+    # _INGEST_LOCK altında çağrılır; CHROMA_DIR elle silindiyse dosya yeniden açılır
+    global _DEDUP_STORE
+    if _DEDUP_STORE is None or not os.path.exists(DEDUP_PATH):
+        if _DEDUP_STORE is not None:
+            _DEDUP_STORE.close()
+        _DEDUP_STORE = DedupStore(DEDUP_PATH)
+    return _DEDUP_STORE
+
+def _save_state(files: Dict[str, Any], index: DedupIndex, rewrite: bool) -> None:
+    # Önce kopya eleme deposu, sonra manifest; arada kesilirse damgalar uyuşmaz ve
+    # sonraki çalıştırma tam yeniden indeksler (embedding'ler önbellekten gelir)
+    stamp = uuid.uuid4().hex
+    _dedup_store().save(index, stamp, rewrite=rewrite)
+    _save_manifest({"version": MANIFEST_VERSION, "codec": CODEC.signature, "files": files, "dedup_stamp": stamp})
+
+def _chunk_id(rel: str, i: int) -> str:
+    # Uzantı ve alt klasör dahil göreli yol: a.txt / a.pdf ya da iki klasördeki aynı ad çakışmaz
+    return f"{rel}#{i}"
+
+def _doc_ids(rel: str, n: int, start: int = 0) -> List[str]:
+    return [_chunk_id(rel, i) for i in range(start, n)]
+
+# ---- Boru hattı yardımcıları ----
+T = TypeVar("T")
+
+def _batched(it: Iterable[T], n: int) -> Iterator[List[T]]:
+    batch: List[T] = []
+    for x in it:
+        batch.append(x)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _prefetch(it: Iterable[T], maxsize: int) -> Iterator[T]:
+    """
+    Üreticiyi arka plan thread'inde çalıştırır; aradaki kuyruk sınırlıdır (maxsize),
+    böylece hızlı aşama yavaş aşamanın önüne en fazla maxsize öğe geçebilir.
+    Üreticideki hata tüketici tarafında yeniden fırlatılır.
+    """
+    q: "queue.Queue" = queue.Queue(maxsize=max(1, maxsize))
+    done, stop = object(), threading.Event()
+
+    def _run() -> None:
+        try:
+            for x in it:
+                while not stop.is_set():
+                    try:
+                        q.put((None, x), timeout=0.1); break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            q.put((None, done))
+        except BaseException as e:  # tüketiciye taşı
+            q.put((e, None))
+
+    # Bağlam kopyalanır ki aşamalardaki telemetry span'leri aynı ingest kaydına yazsın
+    th = threading.Thread(target=contextvars.copy_context().run, args=(_run,), name="ingest-stage", daemon=True)
+    th.start()
+    try:
+        while True:
+            err, x = q.get()
+            if err is not None:
+                raise err
+            if x is done:
+                return
+            yield x
+    finally:
+        stop.set()
+
+# ---- Aşamalar: oku -> normalleştir -> parçala -> embed -> upsert ----
+Item = Tuple[str, Dict[str, Any], str]   # (chunk metni, metadata, id)
+
+def _changed_chunks(
+    files: List[str],
+    old_files: Dict[str, Any],
+    new_files: Dict[str, Any],
+    stale_ids: List[str],
+    extractor: PdfExtractor,
+    verbose: bool = True,
+    forced: Optional[Dict[str, Set[int]]] = None,
+) -> Iterator[Item]:
+    """
+    Dosyaları sırayla akıtır; yalnızca yeni/değişen parçaları üretir.
+    forced: {dosya: {parça no}} — hash'i aynı olsa da yeniden üretilecek parçalar
+    (kanoniği silinen kopyalar için).
+    Yan etki olarak new_files (manifest girdileri) ve stale_ids (silinecek kuyruklar) doldurulur.
+    """
+    forced = forced or {}
+    # 1) Ucuz geçiş: hangi dosyalar değişti? (boyut+mtime, gerekirse içerik hash'i)
+    changed: List[Tuple[str, str, Any, Optional[Dict[str, Any]]]] = []
+    for path in files:
+        base = _rel(path)
+        st = os.stat(path)
+        prev: Optional[Dict[str, Any]] = old_files.get(base)
+
+        # Hızlı yol: boyut ve mtime aynı -> dosyayı açmadan atla
+        if base not in forced and prev and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns:
+            new_files[base] = prev
+            continue
+
+        fhash = _file_hash(path)
+        if base not in forced and prev and prev.get("file_hash") == fhash:
+            new_files[base] = dict(prev, size=st.st_size, mtime_ns=st.st_mtime_ns)
+            continue
+        changed.append((path, fhash, st, prev))
+
+    # 2) Değişen dosyalar: PDF sayfaları süreç havuzunda (önceden) çıkarılır, sırayla parçalanır
+    meta = {path: (fhash, st, prev) for path, fhash, st, prev in changed}
+    for path, parts in extractor.iter_files(((p, fh) for p, fh, _, _ in changed), fallback=_iter_txt):
+        fhash, st, prev = meta[path]
+        base = _rel(path)
+        title = _title(base)
+        ext = os.path.splitext(path)[1].lower()
+        if verbose:
+            print(f"\n📄 İşleniyor: {base} ({ext})", flush=True)
+        old_hashes: List[str] = (prev or {}).get("chunks", [])
+        redo = forced.get(base, set())
+        hashes: List[str] = []
+        n_changed = 0
+        for i, ch in enumerate(_chunk_stream(_normalize_stream(parts))):
+            h = _chunk_hash(ch)
+            hashes.append(h)
+            if i not in redo and i < len(old_hashes) and old_hashes[i] == h:
+                continue
+            n_changed += 1
+            yield ch, {"source": base, "title": title, "chunk": i}, _chunk_id(base, i)
+
+        # Kısalan dosyanın kuyruk parçaları
+        stale_ids.extend(_doc_ids(base, len(old_hashes), start=len(hashes)))
+        if verbose:
+            print(f"   - Chunk: {len(hashes)} | Değişen: {n_changed}"
+                  f" | Silinecek kuyruk: {max(0, len(old_hashes) - len(hashes))}", flush=True)
+
+        new_files[base] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "file_hash": fhash,
+            "chunks": hashes,
+        }
+
+def _dedup(items: Iterable[Item], index: DedupIndex, aliased: List[str]) -> Iterator[Item]:
+    """
+    Neredeyse-aynı parçaları eler: kopyalar embed edilmez, id'leri `aliased`e eklenir
+    (önceden kanonik olarak yazılmış olabilecekleri için koleksiyondan silinir).
+    Kanonik parçalar index'teki metadata ile (kaynak listesi dahil) devam eder.
+    """
+    for ch, meta, id_ in items:
+        if index.add(id_, ch, meta) is not None:
+            aliased.append(id_)
+            continue
+        yield ch, meta, id_
+
+def _embed_batches(batches: Iterable[List[Item]], emb: Embedder) -> Iterator[Tuple[List[Item], List[List[float]]]]:
+    for batch in batches:
+        with span("embed"):
+            vectors = emb.embed_batched([ch for ch, _, _ in batch])
+        yield batch, vectors
+
+_INGEST_LOCK = threading.Lock()  # Reindex butonu ile izleme modu aynı anda manifest yazmasın
+
+def ingest_docs(
+    verbose: bool = True,
+    force: bool = False,
+    paths: Optional[Iterable[str]] = None,
+    raise_errors: bool = False,
+) -> int:
+    """
+    data/docs altındaki belgeleri artımlı olarak indeksler.
+    Akış: oku -> normalleştir -> parçala -> embed -> upsert; aşamalar arasında sınırlı
+    kuyruklar vardır ve Chroma'ya WRITE_BATCH'lik partilerle yazılır, bu yüzden
+    bellek kullanımı korpus boyutundan bağımsızdır (parça sayısı üst sınırı yok).
+    Yalnızca yeni/değişen parçalar embed edilir; silinen dosyaların ve kısalan
+    dosyaların kuyruk parçaları koleksiyondan kaldırılır. Neredeyse-aynı parçalar
+    (MinHash/LSH, bkz. dedup.py) tek vektörde birleştirilir.
+    paths verilirse yalnızca bu dosyalar işlenir (izleme modu); diğerlerinin manifest
+    kaydı olduğu gibi korunur, artık var olmayan yollar indeksten silinir.
+    raise_errors: True ise hata yazdırılıp 0 döndürülmez, yeniden fırlatılır (izleme modu partiyi tekrar dener).
+    Dönüş: bu çalıştırmada yazılan (upsert) parça sayısı.
+    """
+    if paths is not None:
+        paths = list(paths)   # aşağıda iki kez dolaşılır; üreteç verilirse tükenmesin
+    with _INGEST_LOCK, trace("ingest", force=force, scoped=paths is not None) as tr:
+        added = _ingest_locked(verbose, force, paths, raise_errors)
+        tr.set(added=added)
+        return added
+
+def _ingest_locked(verbose: bool, force: bool, paths: Optional[Iterable[str]], raise_errors: bool = False) -> int:
     t0 = time.time()
     try:
         if verbose:
@@ -82,71 +383,160 @@ def ingest_docs(verbose: bool = True) -> int:
             print("📂 DOCS_DIR   :", cfg.DOCS_DIR)
             print("💾 CHROMA_DIR :", cfg.CHROMA_DIR)
 
-        # Chroma koleksiyonunu hazırla
+        # Klasörleri ve Chroma koleksiyonunu hazırla
+        ensure_dirs()
         col = get_collection()
 
-        # Dosyaları topla (yoksa demo yarat)
-        files = _ensure_demo(_scan_docs())
-        if verbose:
-            print(f"🔎 Bulunan dosyalar ({len(files)}): {[os.path.basename(x) for x in files]}")
-
-        all_chunks: List[str] = []
-        metadatas: List[Dict] = []
-        ids: List[str] = []
-
-        # Dosya okuma + parçalama
-        for path in files:
-            ext = os.path.splitext(path)[1].lower()
-            print(f"\n📄 İşleniyor: {os.path.basename(path)} ({ext})", flush=True)
-            raw = _read_pdf(path) if ext == ".pdf" else _read_txt(path)
-            print("   - Okunan karakter:", len(raw))
-            text = _normalize(raw)
-            chunks = _chunk(text)
-            print("   - Normalleşmiş:", len(text), "| Chunk:", len(chunks))
-
-            base = os.path.basename(path)
-            title = os.path.splitext(base)[0]
-            for i, ch in enumerate(chunks):
-                all_chunks.append(ch)
-                metadatas.append({"source": base, "title": title, "chunk": i})
-                ids.append(f"{title}-{i}")
-
-        if not all_chunks:
-            print("⚠️ Parçalanacak veri yok.")
-            return 0
+        # Manifest koleksiyonla ya da kopya eleme deposuyla tutarlı değilse (ör. reset_collection sonrası) sıfırdan başla
+        manifest = {"version": MANIFEST_VERSION, "files": {}} if force else _load_manifest()
+        store = _dedup_store()
+        consistent = manifest.get("dedup_stamp") == store.stamp()
+        if manifest["files"] and (not consistent or col.count() != _manifest_total(manifest, store.alias_count())):
+            if verbose:
+                print("ℹ️ Manifest koleksiyonla uyuşmuyor — tam yeniden indeksleme yapılacak.")
+            manifest = {"version": MANIFEST_VERSION, "files": {}}
+        # Sıkıştırma ayarı (EMBED_DIM / VECTOR_QUANT) değiştiyse eski vektörler uyumsuz: sıfırdan kur
+        # (embedding'ler önbellekten gelir, API çağrısı gerekmez)
+        if manifest["files"] and manifest.get("codec", "full:none") != CODEC.signature:
+            if verbose:
+                print(f"ℹ️ Vektör sıkıştırma ayarı değişti ({manifest.get('codec', 'full:none')} -> {CODEC.signature}) — indeks yeniden kurulacak.")
+            col = reset_collection()
+            manifest = {"version": MANIFEST_VERSION, "files": {}}
+        if not manifest["files"] and col.count():
+            # Manifest yok/uyumsuz (ör. eski id şeması) ama koleksiyonda kayıt var: sahipsiz kayıtlar
+            # kalırsa sayım bir daha tutmaz; koleksiyon boşaltılıp sıfırdan kurulur
+            col = reset_collection()
+        # Sıfırdan başlanıyorsa depo baştan yazılır
+        rewrite = not manifest["files"]
+        dedup_state = store.state() if manifest["files"] else None
+        old_files: Dict[str, Any] = manifest["files"]
+        new_files: Dict[str, Any] = {}
+        stale_ids: List[str] = []
 
-        # (opsiyonel) güvenli üst sınır
-        if len(all_chunks) > MAX_CHUNKS:
-            all_chunks = all_chunks[:MAX_CHUNKS]
-            metadatas = metadatas[:MAX_CHUNKS]
-            ids = ids[:MAX_CHUNKS]
-            print(f"ℹ️ Geçici limit: ilk {MAX_CHUNKS} parça işlenecek.")
+        if paths is None:
+            # Dosyaları topla (yoksa demo yarat)
+            with span("scan"):
+                files = _ensure_demo(_scan_docs())
+        else:
+            # Yalnızca verilen dosyalar; kapsam dışındakiler manifest'ten aynen taşınır
+            scope = {_rel(p) for p in paths}
+            files = sorted({os.path.abspath(p) for p in paths if os.path.isfile(p) and _is_doc(p)})
+            new_files.update({k: e for k, e in old_files.items() if k not in scope})
+        annotate(files=len(files))
+        if verbose:
+            print(f"🔎 Bulunan dosyalar ({len(files)}): {[_rel(x) for x in files]}")
 
-        # Embedding üret
-        print(f"\n🧩 Embedding başlıyor — toplam parça: {len(all_chunks)} (batch={BATCH_SIZE})", flush=True)
         emb = Embedder(batch_size=BATCH_SIZE)
-        t1 = time.time()
-        vectors = emb.embed_batched(all_chunks)
-        t2 = time.time()
-        dim = len(vectors[0]) if vectors else 0
-        print(f"✅ Embedding tamam: {len(vectors)} vektör | boyut={dim} | süre={t2 - t1:.1f}s")
+        index = DedupIndex(dedup_state)
+        added, removed, dim, t_embed = 0, 0, 0, time.time()
+        forced: Dict[str, Set[int]] = {}
+        with PdfExtractor(workers=cfg.EXTRACT_WORKERS) as extractor:
+            # Kanoniği silinen/değişen kopyalar bir sonraki turda yeniden değerlendirilir
+            for round_no in range(MAX_DEDUP_ROUNDS):
+                aliased: List[str] = []
+                items = timed_iter(_changed_chunks(files, old_files, new_files, stale_ids, extractor, verbose, forced),
+                                   "extract")
+                chunks = _prefetch(_dedup(items, index, aliased), maxsize=QUEUE_BATCHES * WRITE_BATCH)
+                embedded = _prefetch(_embed_batches(_batched(chunks, WRITE_BATCH), emb), maxsize=QUEUE_BATCHES)
 
-        # Chroma'ya yaz
-        print("🗂️ Chroma'ya yazılıyor…")
-        added = index_texts(all_chunks, metadatas, ids, vectors)
-        print(f"🎉 İndekse eklenen: {added}")
+                for batch, vectors in embedded:
+                    # Chroma'ya sabit boyutlu partilerle yaz
+                    with span("write"):
+                        added += index_texts(
+                            [ch for ch, _, _ in batch],
+                            [m for _, m, _ in batch],
+                            [i for _, _, i in batch],
+                            vectors,
+                        )
+                    dim = len(vectors[0]) if vectors else dim
+                    if verbose:
+                        print(f"🗂️ Chroma'ya yazıldı (upsert): {added} parça | boyut={dim}"
+                              f" | {time.time() - t_embed:.1f}s", flush=True)
 
-        try:
-            print("📊 Koleksiyon toplam kayıt:", col.count())
-        except Exception:
-            pass
+                # Kaldırılan dosyalar (yalnızca ilk turda anlamlı)
+                for base, prev in old_files.items():
+                    if base not in new_files:
+                        stale_ids.extend(_doc_ids(base, len(prev.get("chunks", []))))
+                        if verbose:
+                            print(f"🗑️ Kaldırılan dosya: {base} ({len(prev.get('chunks', []))} parça)")
+
+                for id_ in stale_ids:
+                    index.forget(id_)
+                with span("delete"):
+                    for part in _batched(stale_ids, WRITE_BATCH):
+                        removed += delete_ids(part)
+                    # Kopya olarak birleşen parçaların eski (tekil) kayıtları
+                    for part in _batched(aliased, WRITE_BATCH):
+                        delete_ids(part)
+                stale_ids = []
 
-        print(f"🏁 ingest.py bitti | toplam süre: {time.time() - t0:.1f}s")
+                forced = {}
+                for id_, info in index.orphans.items():
+                    if info["source"] in new_files:
+                        forced.setdefault(info["source"], set()).add(int(info["chunk"]))
+                index.orphans.clear()
+                if not forced:
+                    break
+                if verbose:
+                    print(f"🔁 Kanoniği değişen {sum(map(len, forced.values()))} kopya parça yeniden değerlendiriliyor…")
+                # Sonraki turda kopyaların dosyaları da işlenir; diğerleri aynen taşınır
+                files = sorted(set(files) | {os.path.join(cfg.DOCS_DIR, *rel.split("/")) for rel in forced})
+                in_play = {_rel(p) for p in files}
+                old_files = new_files
+                new_files = {k: e for k, e in old_files.items() if k not in in_play}
+
+            if verbose and extractor.extracted_pages:
+                print("📊 PDF çıkarma:", extractor.stats())
+
+        # Kaynak listesi değişen kanonik kayıtların metadata'sını güncelle
+        touched = [cid for cid in index.touched if cid in index.canon]
+        for part in _batched(touched, WRITE_BATCH):
+            update_metadatas(part, [index.canonical_metadata(cid) for cid in part])
+
+        if not added and not removed and not touched:
+            if (rewrite or index.dirty or new_files != manifest["files"]
+                    or manifest.get("codec") != CODEC.signature):
+                _save_state(new_files, index, rewrite)
+            if verbose:
+                print(f"✅ İndeks güncel — değişiklik yok | süre: {time.time() - t0:.3f}s")
+            return 0
+
+        # Manifest yalnızca yazma başarılı olduktan sonra güncellenir
+        with span("flush"):
+            flush_indexes()
+            _save_state(new_files, index, rewrite)
+        annotate(removed=removed)
+
+        if verbose and index.seen:
+            print("📊 Kopya eleme:", index.report(dim=dim, avg_doc_bytes=CHUNK_SIZE))
+        if verbose:
+            print(f"🎉 İndekse yazılan: {added} | silinen: {removed}")
+            if emb.cache is not None:
+                print("📊 Embedding önbelleği:", emb.cache.stats())
+            try:
+                print("📊 Koleksiyon toplam kayıt:", col.count())
+            except Exception:
+                pass
+            print(f"🏁 ingest.py bitti | toplam süre: {time.time() - t0:.1f}s")
         return added
 
     except Exception as e:
+        if raise_errors:
+            raise
         print("❌ ingest.py hata yakalandı!\n" + traceback.format_exc())
         return 0
 
 if __name__ == "__main__":
-    ingest_docs(verbose=True)
+    import argparse
+    ap = argparse.ArgumentParser(description="data/docs belgelerini indeksler.")
+    ap.add_argument("--force", action="store_true", help="manifest'i yok sayıp tümünü yeniden indeksle")
+    ap.add_argument("--watch", action="store_true", help="ilk indekslemeden sonra DOCS_DIR'i izlemeye devam et")
+    args = ap.parse_args()
+    ingest_docs(verbose=True, force=args.force)
+    if args.watch:
+        from watcher import DocsWatcher
+        w = DocsWatcher(status_path=os.path.join(cfg.ROOT_DIR, ".cache", "watch_status.json"))
+        try:
+            w.run_forever()
+        except KeyboardInterrupt:
+            print("\n🛑 watcher durdu:", w.status())
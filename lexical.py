@@ -0,0 +1,189 @@
+# lexical.py
+"""
+Türkçe'ye duyarlı, kalıcı BM25 ters indeks (inverted index).
+- Büyük/küçük harf: Türkçe kurallı (I -> ı, İ -> i), ardından ASCII'ye katlama
+  (ç->c, ğ->g, ı->i, ö->o, ş->s, ü->u); "Harçlık", "HARÇLIK" ve "harclik" aynı terime düşer.
+- Kök bulma yerine Türkçe bilgi erişiminde yaygın olan ilk-5-karakter kesmesi (F5) kullanılır:
+  "ekstrenin", "ekstreden" -> "ekstr".
+- retriever.index_texts / delete_ids / update_metadatas ile aynı parçaları tutar.
+- Depolama diskte SQLite FTS5 (CHROMA_DIR/lexical.sqlite): terim listeleri (postings) ve parça
+  metinleri dosyada durur, bellekte yalnızca SQLite sayfa önbelleği vardır; korpus büyüse de bellek sabit.
+  FTS5 tablosu içeriksizdir (content=''): yalnızca tokenize() çıktısı indekslenir, metin `docs` tablosundadır.
+  Her yazma çağrısı kendi işlemiyle hemen işlenir; diğer süreçler (ingest/watcher) yazınca okuyucular
+  bir sonraki sorguda görür. Sıralama FTS5'in yerleşik bm25() fonksiyonuyla (k1=1.2, b=0.75).
+"""
+
+from __future__ import annotations
+import os, re, json, sqlite3, threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import cfg
+
+LEXICAL_PATH = os.path.join(cfg.CHROMA_DIR, "lexical.sqlite")
+PREFIX_LEN = 5
+
+_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+_ASCII = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = {
+    "ve", "veya", "ile", "bir", "bu", "şu", "da", "de", "mi", "mı", "mu", "mü", "ne", "nedir",
+    "nasıl", "için", "gibi", "çok", "daha", "ama", "ya", "ki", "olan", "olarak", "ise", "her",
+}
+_STOP = {w.translate(_ASCII) for w in STOPWORDS}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    n    INTEGER PRIMARY KEY,
+    id   TEXT UNIQUE NOT NULL,
+    doc  TEXT NOT NULL,
+    meta TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS terms USING fts5(
+    body, content = '', tokenize = "unicode61 remove_diacritics 0 tokenchars '_'"
+);
+"""
+
+
+def fold(text: str) -> str:
+    """Türkçe kurallı küçük harf + ASCII katlama."""
+    return (text or "").translate(_UPPER).lower().translate(_ASCII)
+
+def tokenize(text: str) -> List[str]:
+    return [t[:PREFIX_LEN] for t in _TOKEN.findall(fold(text)) if t not in _STOP]
+
+def _body(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+class LexicalIndex:
+    def __init__(self, path: Optional[str] = LEXICAL_PATH) -> None:
+        """:param path: SQLite dosya yolu (None ya da ":memory:" -> yalnızca bellekte)."""
+        self.path = path or ":memory:"
+        self._lock = threading.RLock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    # ---- yazma (her çağrı tek işlem) ----
+    def _remove(self, id_: str) -> Optional[int]:
+        row = self._db.execute("SELECT n, doc FROM docs WHERE id = ?", (id_,)).fetchone()
+        if row is None:
+            return None
+        # İçeriksiz FTS5 tablosundan silmek için indekslenen metnin aynısı verilmeli
+        self._db.execute("INSERT INTO terms (terms, rowid, body) VALUES ('delete', ?, ?)", (row[0], _body(row[1])))
+        return row[0]
+
+    def add(self, ids: Sequence[str], docs: Sequence[str], metas: Sequence[Dict[str, Any]]) -> None:
+        with self._lock, self._db:
+            for id_, doc, meta in zip(ids, docs, metas):
+                n = self._remove(id_)
+                meta_json = json.dumps(dict(meta), ensure_ascii=False)
+                if n is None:
+                    n = self._db.execute("INSERT INTO docs (id, doc, meta) VALUES (?, ?, ?)",
+                                         (id_, doc, meta_json)).lastrowid
+                else:
+                    self._db.execute("UPDATE docs SET doc = ?, meta = ? WHERE n = ?", (doc, meta_json, n))
+                self._db.execute("INSERT INTO terms (rowid, body) VALUES (?, ?)", (n, _body(doc)))
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self._lock, self._db:
+            for id_ in ids:
+                n = self._remove(id_)
+                if n is not None:
+                    self._db.execute("DELETE FROM docs WHERE n = ?", (n,))
+
+    def update_meta(self, ids: Sequence[str], metas: Sequence[Dict[str, Any]]) -> None:
+        with self._lock, self._db:
+            self._db.executemany("UPDATE docs SET meta = ? WHERE id = ?",
+                                 [(json.dumps(dict(m), ensure_ascii=False), id_) for id_, m in zip(ids, metas)])
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM docs")
+            self._db.execute("INSERT INTO terms (terms) VALUES ('delete-all')")
+
+    def flush(self) -> None:
+        """Yazmalar zaten işlenmiş durumda; WAL dosyasını ana dosyaya aktarır (ingest sonunda)."""
+        with self._lock:
+            self._db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    # ---- okuma ----
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0])
+
+    def empty(self) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM docs LIMIT 1").fetchone() is None
+
+    def _query(self, query: str, k: int) -> List[Tuple[str, str, str, float]]:
+        terms = dict.fromkeys(tokenize(query))
+        if not terms or k <= 0:
+            return []
+        match = " OR ".join(f'"{t}"' for t in terms)
+        with self._lock:
+            return self._db.execute(
+                "SELECT d.id, d.doc, d.meta, -t.rank FROM "
+                "(SELECT rowid, rank FROM terms WHERE terms MATCH ? ORDER BY rank LIMIT ?) AS t "
+                "JOIN docs d ON d.n = t.rowid ORDER BY t.rank",
+                (match, int(k)),
+            ).fetchall()
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """BM25 ile en iyi k (id, skor); skor büyük olan daha iyi."""
+        return [(id_, score) for id_, _, _, score in self._query(query, k)]
+
+    def search_hits(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """search() ile aynı sıralama, retriever hit sözlüğü biçiminde (vektör mesafesi yok: distance None)."""
+        return [{"id": id_, "doc": doc, "meta": json.loads(meta), "distance": None, "bm25": score}
+                for id_, doc, meta, score in self._query(query, k)]
+
+
+def rrf(rankings: Sequence[Sequence[Dict[str, Any]]], k: int = 5, c: int = 60) -> List[Dict[str, Any]]:
+    """
+    Reciprocal rank fusion: skor(d) = Σ 1 / (c + sıra). Aynı id'nin hit bilgileri birleştirilir
+    (vektör mesafesi ve bm25 skoru korunur).
+    """
+    fused: Dict[str, float] = {}
+    merged: Dict[str, Dict[str, Any]] = {}
+    for hits in rankings:
+        for rank, h in enumerate(hits, 1):
+            fused[h["id"]] = fused.get(h["id"], 0.0) + 1.0 / (c + rank)
+            cur = merged.setdefault(h["id"], dict(h))
+            for key, val in h.items():
+                if cur.get(key) is None and val is not None:
+                    cur[key] = val
+    out = []
+    for id_, s in sorted(fused.items(), key=lambda x: -x[1])[:k]:
+        h = merged[id_]
+        h["rrf"] = s
+        out.append(h)
+    return out
+
+
+_shared: Optional[LexicalIndex] = None
+_shared_lock = threading.Lock()
+
+def get_lexical() -> LexicalIndex:
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = LexicalIndex()
+    return _shared
+
+
+# --------- Hızlı test ---------
+if __name__ == "__main__":
+    import time
+    idx = LexicalIndex(path=None)
+    idx.add(["a-0", "b-0"], [
+        "Kazanılan Harçlık (bonus) kampanyalara göre kullanılır.",
+        "Ekstre kesim tarihinden sonra son ödeme tarihi belirlenir.",
+    ], [{"title": "a"}, {"title": "b"}])
+    print("🔤", tokenize("HARÇLIK ekstrenin İstanbul'da"))
+    t0 = time.perf_counter()
+    res = idx.search("harclik nasil kullanilir", k=2)
+    print(f"🔎 {res} | {1e6 * (time.perf_counter() - t0):.0f} µs")
@@ -0,0 +1,244 @@
+# loadtest.py
+"""
+answer_question için tekrar oynatma (replay) yük testi — ağ ve API anahtarı gerekmez.
+- Sorular: istek günlüğü (logs/requests.jsonl) ya da yerleşik sentetik soru seti.
+- Gemini yerine fake_backends.FakeGenAI (deterministik embedding/üretim, ayarlanabilir gecikme) kullanılır.
+- İndeks, önbellekler (embedding, sayfa çıkarma, sıcak cevaplar) ve istek günlüğü geçici bir klasöre
+  yönlendirilir; DOCS_DIR'in bir kopyası bu klasördeki indekse sahte embedding'lerle yazılır.
+  Gerçek indeks, önbellekler ve doküman klasörü kirlenmez (boş korpusta demo dosyası da kopyaya yazılır).
+- Rapor: QPS, gecikme p50/p95/p99, (stream modunda) TTFT ve telemetry'den aşama bazında döküm.
+  --max-p99-ms verilirse eşik aşıldığında çıkış kodu 1 olur (dağıtım öncesi kontrol için).
+
+Kullanım: python loadtest.py --concurrency 16 --requests 400 --mode sync|stream|async [--no-cache] [--json rapor.json]
+"""
+
+from __future__ import annotations
+import os, sys, json, time, shutil, asyncio, argparse, tempfile, threading, contextlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.dirname(__file__))
+
+SYNTHETIC = [
+    "Ekstre nedir?",
+    "Ekstre kesim tarihi ne zaman?",
+    "Son ödeme tarihi nasıl belirlenir?",
+    "Asgari ödeme tutarı nedir?",
+    "Harçlık nasıl kullanılır?",
+    "Harçlık kampanyaları nelerdir?",
+    "Kart limitimi nasıl artırabilirim?",
+    "Limit aşımı olursa ne olur?",
+    "Gecikme faizi nasıl hesaplanır?",
+    "Taksitli alışveriş yapabilir miyim?",
+    "Kartımı kaybedersem ne yapmalıyım?",
+    "İnternet alışverişine nasıl açarım?",
+    "Yıllık kart ücreti var mı?",
+    "Bonus puanlar ne zaman yüklenir?",
+    "Ekstremi nereden görebilirim?",
+    "ekstre nedir",
+    "harçlık nedir",
+    "Abonelik ödemeleri karttan nasıl çekilir?",
+]
+
+
+def _pct(vals: List[float], p: float) -> float:
+    if not vals:
+        return 0.0
+    s = sorted(vals)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+def _summary(vals: List[float]) -> Dict[str, float]:
+    return {"p50": round(_pct(vals, 50), 2), "p95": round(_pct(vals, 95), 2), "p99": round(_pct(vals, 99), 2),
+            "mean": round(sum(vals) / len(vals), 2) if vals else 0.0, "max": round(max(vals), 2) if vals else 0.0}
+
+def load_queries(log_path: Optional[str], synthetic: int) -> List[str]:
+    qs: List[str] = []
+    if log_path and not synthetic:
+        try:
+            with open(log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if rec.get("kind", "rag") == "rag" and not rec.get("parent") and rec.get("query"):
+                        qs.append(rec["query"])
+        except OSError:
+            pass
+    if not qs:
+        n = synthetic or 200
+        qs = [SYNTHETIC[i % len(SYNTHETIC)] for i in range(n)]
+    return qs
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # Modüller cfg'yi import anında okur: yönlendirmeler import'lardan önce yapılmalı
+    work = args.workdir or tempfile.mkdtemp(prefix="akkoc-load-")
+    docs = os.path.join(ROOT_DIR, os.getenv("DOCS_DIR", os.path.join("data", "docs")))
+    if os.path.isdir(docs):
+        shutil.copytree(docs, os.path.join(work, "docs"), dirs_exist_ok=True)
+    os.environ["DOCS_DIR"] = os.path.join(work, "docs")
+    os.environ.setdefault("GEMINI_API_KEY", "fake-offline-key")
+    os.environ["GEMINI_EMBED_MODEL"] = "fake-embed"
+    os.environ["GEMINI_MODEL"] = "fake-gen"
+    os.environ["CHROMA_DIR"] = os.path.join(work, "index")
+    os.environ["EMBED_CACHE_PATH"] = os.path.join(work, "embeddings.sqlite")
+    os.environ["EXTRACT_CACHE_PATH"] = os.path.join(work, "pages.sqlite")
+    os.environ["HOT_ANSWERS_PATH"] = os.path.join(work, "hot_answers.json")
+    os.environ["REQUEST_LOG_PATH"] = os.path.join(work, "requests.jsonl")
+    if args.backend:
+        os.environ["VECTOR_BACKEND"] = args.backend
+
+    from fake_backends import FakeGenAI, install
+    fake = install(FakeGenAI(
+        dim=args.dim, embed_ms=args.embed_ms, ttft_ms=args.ttft_ms, token_ms=args.token_ms,
+        answer_tokens=args.answer_tokens, jitter=args.jitter, tail_p=args.tail_p, tail_x=args.tail_x,
+    ))
+    import rag
+    from ingest import ingest_docs
+    from telemetry import get_aggregator
+
+    queries = load_queries(args.log, args.synthetic)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        ingest_docs(verbose=False)
+
+    use_cache = not args.no_cache
+    lat: List[float] = []
+    ttft: List[float] = []
+    outcomes: Counter = Counter()
+    flags: Counter = Counter()   # paylaşılan uçuş (coalesced) / yedek cevap (degraded)
+    errors = 0
+    lock = threading.Lock()
+
+    def _tally(resp: Dict[str, Any]) -> None:
+        meta = resp.get("meta", {})
+        outcomes[meta.get("cache", "off")] += 1
+        for k in ("coalesced", "degraded"):
+            if meta.get(k):
+                flags[k] += 1
+
+    def one_sync(q: str) -> None:
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            if args.mode == "stream":
+                first = None
+                for ev in rag.answer_question_stream(q, top_k=args.top_k, use_cache=use_cache):
+                    if ev["type"] == "delta" and first is None:
+                        first = time.perf_counter() - t0
+                    elif ev["type"] == "done":
+                        resp = ev["response"]
+            else:
+                resp = rag.answer_question(q, top_k=args.top_k, use_cache=use_cache)
+                first = None
+            ms = 1e3 * (time.perf_counter() - t0)
+            with lock:
+                lat.append(ms)
+                _tally(resp)
+                if first is not None:
+                    ttft.append(1e3 * first)
+        except Exception:
+            with lock:
+                errors += 1
+
+    async def run_async(seq: List[str]) -> None:
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def one(q: str) -> None:
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    resp = await rag.answer_question_async(q, top_k=args.top_k, use_cache=use_cache)
+                    lat.append(1e3 * (time.perf_counter() - t0))
+                    _tally(resp)
+                except Exception:
+                    errors += 1
+        await asyncio.gather(*(one(q) for q in seq))
+
+    def drive(seq: List[str]) -> float:
+        t0 = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            if args.mode == "async":
+                asyncio.run(run_async(seq))
+            else:
+                with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                    list(pool.map(one_sync, seq))
+        return time.perf_counter() - t0
+
+    seq = [queries[i % len(queries)] for i in range(args.requests)]
+    if args.warmup:
+        drive([queries[i % len(queries)] for i in range(args.warmup)])
+        lat.clear(); ttft.clear(); outcomes.clear(); flags.clear(); errors = 0
+        get_aggregator().clear()
+    wall = drive(seq)
+
+    report: Dict[str, Any] = {
+        "mode": args.mode,
+        "concurrency": args.concurrency,
+        "requests": len(seq),
+        "unique_queries": len(set(seq)),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "qps": round(len(lat) / wall, 2) if wall else 0.0,
+        "latency_ms": _summary(lat),
+        "cache": dict(outcomes),
+        "coalesced": flags["coalesced"],
+        "degraded": flags["degraded"],
+        "backend_calls": dict(fake.calls),
+        "stages_ms": get_aggregator().percentiles("rag"),
+        "workdir": work,
+    }
+    if ttft:
+        report["ttft_ms"] = _summary(ttft)
+    return report
+
+def print_report(r: Dict[str, Any]) -> None:
+    print(f"🚦 mod={r['mode']} eşzamanlılık={r['concurrency']} istek={r['requests']} "
+          f"(tekil {r['unique_queries']}) hata={r['errors']}")
+    print(f"⚡ QPS: {r['qps']} | süre: {r['wall_s']} sn")
+    print(f"⏱️ gecikme (ms): {r['latency_ms']}")
+    if "ttft_ms" in r:
+        print(f"🌊 TTFT (ms): {r['ttft_ms']}")
+    print(f"🗃️ önbellek: {r['cache']} | paylaşılan: {r['coalesced']} | yedek cevap: {r['degraded']} "
+          f"| arka uç çağrıları: {r['backend_calls']}")
+    print(f"{'aşama':<24}{'n':>7}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for k, s in r["stages_ms"].items():
+        print(f"{k:<24}{s['count']:>7}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['p99']:>10.2f}")
+
+
+# --------- Çalıştırma ---------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="answer_question yük testi (çevrimdışı, sahte Gemini)")
+    ap.add_argument("--mode", choices=["sync", "stream", "async"], default="sync")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--warmup", type=int, default=10)
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--no-cache", action="store_true", help="cevap önbelleklerini devre dışı bırak")
+    ap.add_argument("--log", default=os.path.join(ROOT_DIR, os.getenv("REQUEST_LOG_PATH", os.path.join("logs", "requests.jsonl"))),
+                    help="tekrar oynatılacak istek günlüğü")
+    ap.add_argument("--synthetic", type=int, default=0, help=">0 ise günlük yerine bu kadar sentetik soru")
+    ap.add_argument("--backend", choices=["chroma", "numpy"], help="vektör arka ucu (varsayılan: VECTOR_BACKEND)")
+    ap.add_argument("--workdir", help="geçici indeks klasörü (varsayılan: yeni geçici klasör)")
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--embed-ms", type=float, default=40.0)
+    ap.add_argument("--ttft-ms", type=float, default=350.0)
+    ap.add_argument("--token-ms", type=float, default=12.0)
+    ap.add_argument("--answer-tokens", type=int, default=60)
+    ap.add_argument("--jitter", type=float, default=0.2)
+    ap.add_argument("--tail-p", type=float, default=0.01)
+    ap.add_argument("--tail-x", type=float, default=4.0)
+    ap.add_argument("--json", help="raporu bu dosyaya JSON olarak yaz")
+    ap.add_argument("--max-p99-ms", type=float, help="p99 bu değeri aşarsa çıkış kodu 1")
+    args = ap.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.max_p99_ms is not None and report["latency_ms"]["p99"] > args.max_p99_ms:
+        print(f"❌ p99 {report['latency_ms']['p99']} ms > eşik {args.max_p99_ms} ms")
+        sys.exit(1)
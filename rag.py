@@ -1,12 +1,20 @@
 # rag.py
 # ——— RAG: retrieval -> context build -> Gemini yanıtı ———
 from __future__ import annotations
-from typing import List, Dict, Any, Optional
-import textwrap, html, sys
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import textwrap, html, sys, time, asyncio, itertools
 
 from config import cfg                  # TEMPERATURE vb.
 from retriever import search as rsearch # Chroma araması
-from gemini_client import generate_text # Gemini çağrısı
+from retriever import index_version, embed_query_guarded, embed_query_guarded_async
+from gemini_client import generate_text, generate_text_stream, generate_text_async # Gemini çağrısı
+from answer_cache import get_answer_cache
+from context_builder import build_context, count_tokens, extractive_answer
+from hot_answers import get_hot_store
+from telemetry import trace, span, current, query_hash
+from answer_cache import normalize_query
+from singleflight import SingleFlight
 
 SYSTEM = textwrap.dedent("""
 Sen 'Ak-Koç' isimli finansal yardımcı bir asistansın.
@@ -15,22 +23,10 @@ Sen 'Ak-Koç' isimli finansal yardımcı bir asistansın.
 - Cevabın sonunda 'Kaynaklar:' başlığında kullandığın parça başlıklarını listele.
 """).strip()
 
-def _truncate(s: str, n: int = 1200) -> str:
-    s = (s or "").strip()
-    return s if len(s) <= n else (s[:n-1].rstrip() + "…")
-
-def _format_context(hits: List[Dict[str, Any]], max_chars: int = 4000) -> str:
-    """Hit’leri numaralı bloklar halinde birleştirir; toplam uzunluğu sınırlar."""
-    out, total = [], 0
-    for i, h in enumerate(hits, 1):
-        title = h["meta"].get("title") or h["meta"].get("source") or "dokuman"
-        chunk = h["meta"].get("chunk", 0)
-        snippet = _truncate(h.get("doc", ""), 1200)
-        block = f"[{i}] {title} (chunk {chunk}):\n{snippet}\n"
-        if total + len(block) > max_chars:
-            break
-        out.append(block); total += len(block)
-    return "\n".join(out)
+# Eşzamanlı aynı istekler tek hesaplamayı paylaşır (kampanya bildirimi sonrası aynı soru yağmuru)
+FLIGHTS = SingleFlight()
+# Bütçeli üretim çağrıları için (bütçe dolunca çağıran beklemeyi bırakır, özetleyici cevaba düşer)
+_GEN_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="generate")
 
 def _format_sources(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Kaynakları tekilleştirip {title, source, chunk} listesi döndürür."""
@@ -43,28 +39,14 @@ def _format_sources(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         seen.add(key); out.append({"title": t, "source": s, "chunk": c})
     return out
 
-def answer_question(
-    query: str,
-    top_k: int = 5,
-    temperature: Optional[float] = None,
-    max_context_chars: int = 4000,
-) -> Dict[str, Any]:
-    """Sorguyu alır, bağlamı toplayıp Gemini ile cevap üretir."""
-    print("⏩ [RAG] retrieval başlıyor...", flush=True)
-    hits = rsearch(query, k=top_k)
-    print(f"⏹️  [RAG] retrieval bitti — hit sayısı: {len(hits)}", flush=True)
+def _with_cache_meta(cache, resp: Dict[str, Any], outcome: str) -> Dict[str, Any]:
+    if cache is not None:
+        resp.setdefault("meta", {})["cache"] = outcome
+        resp["meta"]["cache_stats"] = cache.stats()
+    return resp
 
-    if not hits:
-        return {
-            "answer": "Bilmiyorum. Şu an için ilgili bir kaynak bulamadım.",
-            "sources": [],
-            "meta": {"used_hits": 0, "top_k": top_k, "context_chars": 0},
-        }
-
-    ctx = html.unescape(_format_context(hits, max_chars=max_context_chars))
-    print(f"🧩 [RAG] bağlam hazır — uzunluk: {len(ctx)}", flush=True)
-
-    prompt = textwrap.dedent(f"""
+def _build_prompt(ctx: str, query: str) -> str:
+    return textwrap.dedent(f"""
     {SYSTEM}
 
     --- BAĞLAM BAŞI ---
@@ -78,17 +60,394 @@ def answer_question(
     Sonunda 'Kaynaklar:' başlığı altında kullandığın parçaların başlıklarını listele.
     """)
 
+def _start(
+    query: str,
+    top_k: int,
+    temperature: Optional[float],
+    max_context_tokens: int,
+    use_cache: bool,
+) -> Dict[str, Any]:
+    """İstek durumunu kurar; önceden hesaplanmış sıcak cevaplara ve tam eşleşme önbelleğine bakar (ağ çağrısı yok)."""
     temp = cfg.TEMPERATURE if temperature is None else temperature
-    print("🤖 [RAG] Gemini çağrısı başlıyor...", flush=True)
-    raw = generate_text(prompt, temperature=temp)
-    print("✅ [RAG] Gemini yanıtı alındı.", flush=True)
+    cache = get_answer_cache() if use_cache else None
+    st: Dict[str, Any] = {
+        "query": query, "top_k": top_k, "temp": temp, "cache": cache, "qvec": None, "embedded": False,
+        "max_context_tokens": max_context_tokens,
+        "params": (top_k, float(temp), max_context_tokens), "version": index_version(),
+    }
+    if cache is not None:
+        with span("hot_lookup"):
+            hot = get_hot_store().get(query, st["params"], st["version"])
+        if hot is not None:
+            print("🔥 [RAG] önceden hesaplanmış cevap", flush=True)
+            st["response"] = hot
+            return st
+        with span("cache_exact"):
+            cached = cache.get_exact(query, st["params"], st["version"])
+        if cached is not None:
+            print("⚡ [RAG] önbellekten (tam eşleşme)", flush=True)
+            st["response"] = _with_cache_meta(cache, cached, "exact")
+    return st
 
+def _semantic(st: Dict[str, Any], qvec: Optional[List[float]]) -> Dict[str, Any]:
+    """Sorgu embedding'i geldikten sonra anlamsal önbellek katmanı."""
+    st["qvec"], st["embedded"] = qvec, True
+    cache = st["cache"]
+    # Embedding servisi yavaş/kapalıysa qvec None olur; anlamsal katman atlanır
+    with span("cache_semantic"):
+        cached = cache.get_semantic(qvec, st["params"], st["version"]) if qvec is not None else None
+    if cached is not None:
+        print("⚡ [RAG] önbellekten (anlamsal)", flush=True)
+        st["response"] = _with_cache_meta(cache, cached, "semantic")
+    return st
+
+def _retrieve(st: Dict[str, Any]) -> Dict[str, Any]:
+    """Retrieval + bağlam + prompt (bloklayan; async yolda thread havuzunda çalışır)."""
+    query, top_k = st["query"], st["top_k"]
+    print("⏩ [RAG] retrieval başlıyor...", flush=True)
+    # Embedding bu istekte zaten denendiyse (qvec None: zaman aşımı/hata) ikinci kez beklenmez
+    hits = rsearch(query, k=top_k, query_vec=st["qvec"], embed=not st["embedded"])
+    print(f"⏹️  [RAG] retrieval bitti — hit sayısı: {len(hits)}", flush=True)
+
+    if not hits:
+        st["response"] = _with_cache_meta(st["cache"], {
+            "answer": "Bilmiyorum. Şu an için ilgili bir kaynak bulamadım.",
+            "sources": [],
+            "meta": {"used_hits": 0, "top_k": top_k, "context_chars": 0, "context_tokens": 0},
+        }, "miss")
+        return st
+
+    # Token bütçeli bağlam: ardışık parçalar birleştirilir, overlap tekrarı atılır; kaynaklar bağlama girenlerdir
+    with span("context_build"):
+        ctx, used = build_context(hits, max_tokens=st["max_context_tokens"])
+        ctx = html.unescape(ctx)
+    print(f"🧩 [RAG] bağlam hazır — ~{count_tokens(ctx)} token ({len(used)}/{len(hits)} hit)", flush=True)
+    st.update(hits=used or hits, ctx=ctx, prompt=_build_prompt(ctx, query))
+    return st
+
+def _prepare(
+    query: str,
+    top_k: int,
+    temperature: Optional[float],
+    max_context_tokens: int,
+    use_cache: bool,
+) -> Dict[str, Any]:
+    """
+    Önbellek kontrolü + retrieval + prompt (üretim hariç her şey).
+    Dönüş sözlüğünde "response" varsa cevap hazırdır (önbellek ya da hit yok); yoksa "hits"/"prompt" vardır.
+    """
+    st = _start(query, top_k, temperature, max_context_tokens, use_cache)
+    if "response" in st:
+        return st
+    if st["cache"] is not None:
+        _semantic(st, embed_query_guarded(query))
+        if "response" in st:
+            return st
+    return _retrieve(st)
+
+def _finish(st: Dict[str, Any], raw: str, degraded: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Üretilen metinden cevap sözlüğünü kurar ve (boş değilse) önbelleğe yazar.
+    degraded ("timeout" / "error") verilirse cevap yedek cevaptır: meta'ya yazılır, önbelleğe alınmaz.
+    """
     answer = (raw or "").strip() or "Bilmiyorum. Şu an için ilgili bir kaynak bulamadım."
-    return {
+    resp = {
         "answer": answer,
-        "sources": _format_sources(hits),
-        "meta": {"used_hits": len(hits), "top_k": top_k, "context_chars": len(ctx)},
+        "sources": _format_sources(st["hits"]),
+        "meta": {"used_hits": len(st["hits"]), "top_k": st["top_k"], "context_chars": len(st["ctx"]),
+                 "context_tokens": count_tokens(st["ctx"])},
     }
+    if degraded:
+        resp["meta"]["degraded"] = degraded
+    cache = st["cache"]
+    if cache is not None and (raw or "").strip() and not degraded:
+        cache.put(st["query"], st["qvec"], st["params"], st["version"], resp)
+    return _with_cache_meta(cache, resp, "miss")
+
+def _degrade(st: Dict[str, Any], reason: str) -> Dict[str, Any]:
+    """Üretim bütçeyi aştı ya da hata verdi: bağlama giren hit'lerden özetleyici cevap."""
+    print(f"🪫 [RAG] üretim başarısız ({reason}) — özetleyici cevap", flush=True)
+    with span("extractive"):
+        answer = extractive_answer(st["query"], st["hits"])
+    return _finish(st, answer, degraded=reason)
+
+def _generate(st: Dict[str, Any]) -> Dict[str, Any]:
+    """generate_text, cfg.GENERATE_BUDGET saniyelik bütçeyle (0: bütçesiz, hatalar yukarı iletilir)."""
+    if cfg.GENERATE_BUDGET <= 0:
+        with span("generate"):
+            raw = generate_text(st["prompt"], temperature=st["temp"])
+        return _finish(st, raw)
+    fut = _GEN_POOL.submit(generate_text, st["prompt"], temperature=st["temp"])
+    try:
+        with span("generate"):
+            raw = fut.result(timeout=cfg.GENERATE_BUDGET)
+    except FutureTimeout:
+        fut.cancel()   # havuzda sırada bekliyorsa hiç çalışmasın
+        return _degrade(st, "timeout")
+    except Exception:
+        return _degrade(st, "error")
+    return _finish(st, raw)
+
+def _first_delta(stream: Iterator[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Akışın ilk parçası ("" = boş akış) ya da bütçe dolduysa / hata olduysa (None, neden)."""
+    if cfg.GENERATE_BUDGET <= 0:
+        return next(stream, ""), None
+    fut = _GEN_POOL.submit(next, stream, "")
+    try:
+        return fut.result(timeout=cfg.GENERATE_BUDGET), None
+    except FutureTimeout:
+        fut.cancel()
+        return None, "timeout"
+    except Exception:
+        return None, "error"
+
+# ---- İstek birleştirme ----
+def _flight_key(query: str, top_k: int, temperature: Optional[float], max_context_tokens: int, use_cache: bool):
+    temp = cfg.TEMPERATURE if temperature is None else temperature
+    return (normalize_query(query), top_k, float(temp), max_context_tokens, use_cache, index_version())
+
+def _coalesced(resp: Dict[str, Any]) -> Dict[str, Any]:
+    resp.setdefault("meta", {})["coalesced"] = True
+    return resp
+
+def _trace_attrs(query: str, **extra: Any) -> Dict[str, Any]:
+    attrs: Dict[str, Any] = {"query_hash": query_hash(normalize_query(query))}
+    if cfg.REQUEST_LOG_QUERY_TEXT:   # varsayılan kapalı; hot_answers.py en sık soruları buradan çıkarır
+        attrs["query"] = query
+    attrs.update(extra)
+    return attrs
+
+def _annotate(tr, resp: Dict[str, Any]) -> None:
+    meta = resp.get("meta", {})
+    tr.set(cache=meta.get("cache", "off"), hits=meta.get("used_hits", 0),
+           context_tokens=meta.get("context_tokens", 0))
+    for k in ("coalesced", "degraded"):
+        if meta.get(k):
+            tr.set(**{k: meta[k]})
+
+def answer_question(
+    query: str,
+    top_k: int = 5,
+    temperature: Optional[float] = None,
+    max_context_tokens: int = cfg.MAX_CONTEXT_TOKENS,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Sorguyu alır, bağlamı toplayıp Gemini ile cevap üretir.
+    use_cache=True iken önce cevap önbelleğine (tam eşleşme, sonra anlamsal) bakılır;
+    meta["cache"] sonucu ("exact" / "semantic" / "miss"), meta["cache_stats"] isabet oranlarını verir.
+    Aynı anda uçuşta olan aynı soru varsa onun sonucu paylaşılır (meta["coalesced"]); üretim
+    cfg.GENERATE_BUDGET'ı aşar ya da hata verirse bağlamdan özetleyici cevap döner (meta["degraded"]).
+    Aşama süreleri telemetry ile ölçülür ve istek günlüğüne yazılır.
+    """
+    with trace("rag", **_trace_attrs(query)) as tr:
+        resp = _answer(query, top_k, temperature, max_context_tokens, use_cache)
+        _annotate(tr, resp)
+        return resp
+
+def _answer(query: str, top_k: int, temperature: Optional[float], max_context_tokens: int,
+            use_cache: bool) -> Dict[str, Any]:
+    args = (query, top_k, temperature, max_context_tokens, use_cache)
+    if not cfg.SINGLE_FLIGHT:
+        return _answer_once(*args)
+    key = _flight_key(*args)
+    call, leader = FLIGHTS.begin(key)
+    if not leader:
+        with span("coalesced_wait"):
+            resp = call.wait()
+        # Lider sonuç bırakmadan çıktıysa (ör. akışı yarıda kesildi) kendimiz hesaplarız
+        return _coalesced(resp) if resp is not None else _answer_once(*args)
+    resp = None
+    try:
+        resp = _answer_once(*args)
+    except Exception as e:
+        FLIGHTS.finish(key, call, error=e)
+        raise
+    finally:
+        if not call.done():
+            FLIGHTS.finish(key, call, resp)
+    return resp
+
+def _answer_once(query: str, top_k: int, temperature: Optional[float], max_context_tokens: int,
+                 use_cache: bool) -> Dict[str, Any]:
+    st = _prepare(query, top_k, temperature, max_context_tokens, use_cache)
+    if "response" in st:
+        return st["response"]
+
+    print("🤖 [RAG] Gemini çağrısı başlıyor...", flush=True)
+    resp = _generate(st)
+    print("✅ [RAG] Gemini yanıtı alındı.", flush=True)
+    return resp
+
+def answer_question_stream(
+    query: str,
+    top_k: int = 5,
+    temperature: Optional[float] = None,
+    max_context_tokens: int = cfg.MAX_CONTEXT_TOKENS,
+    use_cache: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    answer_question'ın akış (streaming) sürümü. Sırasıyla şu olayları üretir:
+      {"type": "sources", "sources": [...]}   — retrieval biter bitmez
+      {"type": "delta", "text": "..."}        — cevap parçaları (model ürettikçe)
+      {"type": "done", "response": {...}}     — answer_question ile aynı biçimde tam cevap
+    meta["ttft_ms"] ilk cevap parçasına kadar geçen süreyi (kullanıcının hissettiği gecikme) verir.
+    """
+    with trace("rag", **_trace_attrs(query, stream=True)) as tr:
+        for ev in _answer_stream(query, top_k, temperature, max_context_tokens, use_cache):
+            if ev["type"] == "done":
+                _annotate(tr, ev["response"])
+            yield ev
+
+def _replay(resp: Dict[str, Any], t0: float) -> Iterator[Dict[str, Any]]:
+    """Hazır bir cevabı (önbellek / paylaşılan uçuş) akış olayları olarak verir."""
+    yield {"type": "sources", "sources": resp.get("sources", [])}
+    yield {"type": "delta", "text": resp.get("answer", "")}
+    resp.setdefault("meta", {})["ttft_ms"] = round(1e3 * (time.perf_counter() - t0), 1)
+    yield {"type": "done", "response": resp}
+
+def _answer_stream(query: str, top_k: int, temperature: Optional[float], max_context_tokens: int,
+                   use_cache: bool) -> Iterator[Dict[str, Any]]:
+    args = (query, top_k, temperature, max_context_tokens, use_cache)
+    if not cfg.SINGLE_FLIGHT:
+        yield from _answer_stream_once(*args)
+        return
+    t0 = time.perf_counter()
+    key = _flight_key(*args)
+    call, leader = FLIGHTS.begin(key)
+    if not leader:
+        # Takipçi, liderin akışı bitince cevabın tamamını tek parça olarak alır
+        with span("coalesced_wait"):
+            resp = call.wait()
+        if resp is not None:
+            yield from _replay(_coalesced(resp), t0)
+        else:
+            yield from _answer_stream_once(*args)
+        return
+    try:
+        for ev in _answer_stream_once(*args):
+            if ev["type"] == "done":
+                FLIGHTS.finish(key, call, ev["response"])   # okuyucu son olayı beklemeden takipçiler uyansın
+            yield ev
+    except Exception as e:
+        if not call.done():
+            FLIGHTS.finish(key, call, error=e)
+        raise
+    finally:
+        if not call.done():   # okuyucu akışı yarıda bıraktı
+            FLIGHTS.finish(key, call, None)
+
+def _answer_stream_once(query: str, top_k: int, temperature: Optional[float], max_context_tokens: int,
+                        use_cache: bool) -> Iterator[Dict[str, Any]]:
+    t0 = time.perf_counter()
+    st = _prepare(query, top_k, temperature, max_context_tokens, use_cache)
+    if "response" in st:
+        yield from _replay(st["response"], t0)
+        return
+
+    yield {"type": "sources", "sources": _format_sources(st["hits"])}
+    print("🤖 [RAG] Gemini akışı başlıyor...", flush=True)
+    parts: List[str] = []
+    ttft = None
+    t_gen = time.perf_counter()
+    # İlk parça bütçe içinde gelmezse özetleyici cevaba düşülür; sonraki parçalar beklenmeden akar
+    stream = generate_text_stream(st["prompt"], temperature=st["temp"])
+    first, degraded = _first_delta(stream)
+    if first:
+        try:
+            for delta in itertools.chain([first], stream):
+                if ttft is None:
+                    ttft = time.perf_counter() - t0
+                    if current() is not None:
+                        current().add("ttft", 1e3 * ttft)
+                    print(f"⚡ [RAG] ilk parça {1e3 * ttft:.0f} ms", flush=True)
+                parts.append(delta)
+                yield {"type": "delta", "text": delta}
+        except Exception:
+            degraded = "error"   # yarıda kesildi: gelen kısım kalır, önbelleğe yazılmaz
+    print("✅ [RAG] Gemini akışı bitti.", flush=True)
+    if current() is not None:
+        current().add("generate", 1e3 * (time.perf_counter() - t_gen))   # okuyucunun tüketme süresi dahil
+
+    if degraded and not parts:
+        resp = _degrade(st, degraded)
+        yield {"type": "delta", "text": resp["answer"]}
+    else:
+        resp = _finish(st, "".join(parts), degraded)
+        if not "".join(parts).strip():
+            yield {"type": "delta", "text": resp["answer"]}
+    resp["meta"]["ttft_ms"] = round(1e3 * (ttft if ttft is not None else time.perf_counter() - t0), 1)
+    resp["meta"]["total_ms"] = round(1e3 * (time.perf_counter() - t0), 1)
+    yield {"type": "done", "response": resp}
+
+async def answer_question_async(
+    query: str,
+    top_k: int = 5,
+    temperature: Optional[float] = None,
+    max_context_tokens: int = cfg.MAX_CONTEXT_TOKENS,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    answer_question'ın asyncio sürümü: embedding ve üretim async çağrılarla, retrieval thread havuzunda yapılır.
+    Aynı olay döngüsündeki eşzamanlı sohbetler ağ beklemelerini birbirinin arkasında sıraya girmeden paylaşır.
+    """
+    with trace("rag", **_trace_attrs(query, concurrent=True)) as tr:
+        resp = await _answer_async(query, top_k, temperature, max_context_tokens, use_cache)
+        _annotate(tr, resp)
+        return resp
+
+async def _answer_async(query: str, top_k: int, temperature: Optional[float], max_context_tokens: int,
+                        use_cache: bool) -> Dict[str, Any]:
+    args = (query, top_k, temperature, max_context_tokens, use_cache)
+    if not cfg.SINGLE_FLIGHT:
+        return await _answer_async_once(*args)
+    key = _flight_key(*args)
+    call, leader = FLIGHTS.begin(key)
+    if not leader:
+        with span("coalesced_wait"):
+            resp = await call.wait_async()
+        return _coalesced(resp) if resp is not None else await _answer_async_once(*args)
+    resp = None
+    try:
+        resp = await _answer_async_once(*args)
+    except Exception as e:
+        FLIGHTS.finish(key, call, error=e)
+        raise
+    finally:
+        if not call.done():   # iptal edildi (CancelledError): takipçiler kendileri hesaplar
+            FLIGHTS.finish(key, call, resp)
+    return resp
+
+async def _answer_async_once(query: str, top_k: int, temperature: Optional[float], max_context_tokens: int,
+                             use_cache: bool) -> Dict[str, Any]:
+    st = _start(query, top_k, temperature, max_context_tokens, use_cache)
+    if "response" in st:
+        return st["response"]
+    if st["cache"] is not None:
+        _semantic(st, await embed_query_guarded_async(query))
+        if "response" in st:
+            return st["response"]
+    elif cfg.RETRIEVAL_MODE != "lexical":
+        st["qvec"], st["embedded"] = await embed_query_guarded_async(query), True
+    await asyncio.to_thread(_retrieve, st)
+    if "response" in st:
+        return st["response"]
+
+    print("🤖 [RAG] Gemini çağrısı başlıyor (async)...", flush=True)
+    if cfg.GENERATE_BUDGET <= 0:
+        with span("generate"):
+            raw = await generate_text_async(st["prompt"], temperature=st["temp"])
+    else:
+        try:
+            with span("generate"):
+                raw = await asyncio.wait_for(generate_text_async(st["prompt"], temperature=st["temp"]),
+                                             cfg.GENERATE_BUDGET)
+        except asyncio.TimeoutError:
+            return _degrade(st, "timeout")
+        except Exception:
+            return _degrade(st, "error")
+    print("✅ [RAG] Gemini yanıtı alındı.", flush=True)
+    return _finish(st, raw)
 
 # ——— CLI testi ———
 if __name__ == "__main__":
@@ -98,3 +457,18 @@ if __name__ == "__main__":
     print("\n🧠 Yanıt:\n", resp["answer"], flush=True)
     print("\n📚 Kaynaklar:", resp["sources"], flush=True)
     print("\n⚙️ Meta:", resp.get("meta", {}), flush=True)
+    resp = answer_question("ekstre nedir, ödeme tarihi nasıl belirlenir", top_k=5)
+    print("\n⚡ Tekrar (önbellek):", resp["meta"].get("cache"), resp["meta"].get("cache_stats"), flush=True)
+    print("\n🌊 Akış:", flush=True)
+    for ev in answer_question_stream("Harçlık nasıl kullanılır?", use_cache=False):
+        if ev["type"] == "delta":
+            print(ev["text"], end="", flush=True)
+        elif ev["type"] == "done":
+            print("\n⚙️ Meta:", ev["response"]["meta"], flush=True)
+
+    async def _many():
+        qs = ["Ekstre nedir?", "Son ödeme tarihi nedir?", "Limit nasıl artırılır?"]
+        t0 = time.perf_counter()
+        out = await asyncio.gather(*(answer_question_async(q, use_cache=False) for q in qs))
+        print(f"\n🚀 {len(out)} eşzamanlı soru: {time.perf_counter() - t0:.2f} sn", flush=True)
+    asyncio.run(_many())
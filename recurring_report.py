@@ -0,0 +1,116 @@
+# recurring_report.py
+"""
+rules.detect_recurring performans karşılaştırması: eski merchant döngüsü vs. vektörel (user, merchant) hattı.
+- Veri: çok kullanıcılı sentetik işlemler (rastgele günlük harcamalar + haftalık/aylık/yıllık abonelikler),
+  numpy ile üretilir; user/merchant sütunları kategorik (10M satırda bellek için).
+- Süre: tarih sütunu metin (CSV'den okunmuş gibi) ve önceden çözülmüş datetime olarak ayrı ölçülür.
+- Doğruluk: üretilen aboneliklerden yaklaşan yenilemesi olanlar (beklenen) ile bulunanlar karşılaştırılır.
+
+Kullanım: python recurring_report.py [--rows 10000,1000000,10000000] [--loop-max-rows 10000000]
+"""
+
+from __future__ import annotations
+import time, argparse, warnings
+from datetime import datetime, timedelta
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from rules import detect_recurring
+
+SUB_MERCHANTS = [("Netflix", 30, 149.9), ("Spotify", 30, 59.9), ("YouTube", 30, 57.99),
+                 ("GymPass", 7, 120.0), ("Yemeksepeti Club", 7, 39.9), ("iCloud", 30, 12.99),
+                 ("Amazon Prime", 365, 469.0), ("Duolingo", 365, 899.0)]
+HORIZON = 3 * 365   # gün
+
+
+def legacy_detect_recurring(df: pd.DataFrame, days_ahead: int = 7):
+    """Eski uygulama (karşılaştırma için olduğu gibi): merchant başına Python döngüsü, sabit 30 gün."""
+    subs = []
+    if df.empty: return subs
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    today = datetime.now().date()
+
+    for name, g in df.groupby("merchant", observed=True):
+        g = g.sort_values("date")
+        if len(g) < 3:
+            continue
+        top_amount = g["amount"].round(1).mode()
+        if top_amount.empty:
+            continue
+        top_amount = float(top_amount.iloc[0])
+        last = g["date"].iloc[-1]
+        next_renewal = last + timedelta(days=30)
+        if 0 <= (next_renewal - today).days <= days_ahead:
+            subs.append({"merchant": name, "amount": top_amount, "last_date": last, "next_renewal": next_renewal})
+    return subs
+
+def synthetic(rows: int, seed: int = 7, days_ahead: int = 7) -> Tuple[pd.DataFrame, int]:
+    """(işlemler, beklenen yaklaşan yenileme sayısı). Kullanıcı başına ~150 satır (~90'ı abonelik)."""
+    rng = np.random.default_rng(seed)
+    today = np.datetime64(datetime.now().date(), "D")
+    n_users = max(1, rows // 150)
+    # Abonelikler: her kullanıcıya 0–3 farklı abonelik, rastgele başlangıç fazı
+    k = rng.integers(0, 4, n_users)
+    pick = np.argsort(rng.random((n_users, len(SUB_MERCHANTS))), axis=1)
+    chosen = np.arange(len(SUB_MERCHANTS)) < k[:, None]
+    sub_user, sub_kind = np.nonzero(chosen)[0], pick[chosen]
+    period = np.array([p for _, p, _ in SUB_MERCHANTS])[sub_kind]
+    price = np.array([a for _, _, a in SUB_MERCHANTS])[sub_kind]
+    phase = (rng.random(len(sub_user)) * period).astype(np.int64)      # son ödemeden bu yana geçen gün
+    n_occ = (HORIZON - phase) // period + 1
+    rep = np.repeat(np.arange(len(sub_user)), n_occ)
+    step = np.arange(len(rep)) - np.repeat(np.cumsum(n_occ) - n_occ, n_occ)
+    s_days = today - phase[rep] - step * period[rep]
+    s_amount = price[rep]
+    s_user, s_merch = sub_user[rep], sub_kind[rep]
+    # Beklenen: en az 3 tekrar + sonraki yenileme (son + periyot) days_ahead içinde
+    due = period - phase
+    expected = int(((n_occ >= 3) & (due >= 0) & (due <= days_ahead)).sum())
+
+    # Kalan satırlar: rastgele günlük harcamalar (abonelik dışı merchant'larda)
+    n_rand = max(0, rows - len(rep))
+    r_user = rng.integers(0, n_users, n_rand)
+    r_merch = len(SUB_MERCHANTS) + rng.integers(0, 2000, n_rand)
+    r_days = today - rng.integers(0, HORIZON, n_rand)
+    r_amount = np.round(rng.uniform(30, 1500, n_rand), 2)
+
+    names = [n for n, _, _ in SUB_MERCHANTS] + [f"merchant_{i}" for i in range(2000)]
+    users = [f"user{i}@uni.edu" for i in range(n_users)]
+    df = pd.DataFrame({
+        "user": pd.Categorical.from_codes(np.r_[s_user, r_user], users),
+        "date": np.r_[s_days, r_days].astype("datetime64[ns]"),
+        "amount": np.r_[s_amount, r_amount],
+        "merchant": pd.Categorical.from_codes(np.r_[s_merch, r_merch], names),
+    })
+    return df.sample(frac=1.0, random_state=seed).reset_index(drop=True), expected
+
+def _time(fn, *a) -> Tuple[float, int]:
+    t0 = time.perf_counter()
+    out = fn(*a)
+    return time.perf_counter() - t0, len(out)
+
+
+# --------- Çalıştırma ---------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="detect_recurring: eski döngü vs. vektörel")
+    ap.add_argument("--rows", default="10000,1000000,10000000")
+    ap.add_argument("--loop-max-rows", type=int, default=10_000_000, help="eski döngüyü bu satır sayısına kadar ölç")
+    args = ap.parse_args()
+    warnings.simplefilter("ignore")
+
+    print(f"{'satır':>11}{'eski döngü':>13}{'vektörel':>11}{'(metin tarih)':>15}{'hızlanma':>10}"
+          f"{'beklenen':>10}{'bulunan':>9}{'eski':>7}")
+    for n in [int(x) for x in args.rows.split(",") if x.strip()]:
+        df, expected = synthetic(n)
+        t_vec, found = _time(detect_recurring, df)
+        as_text = df.assign(date=df["date"].dt.strftime("%Y-%m-%d"))
+        t_txt, _ = _time(detect_recurring, as_text)
+        if n <= args.loop_max_rows:
+            t_loop, legacy = _time(legacy_detect_recurring, as_text)
+            loop_s, speed, legacy_s = f"{t_loop:.3f}s", f"{t_loop / t_txt:.1f}x", str(legacy)
+        else:
+            loop_s, speed, legacy_s = "—", "—", "—"
+        print(f"{n:>11,}{loop_s:>13}{t_vec:>10.3f}s{t_txt:>14.3f}s{speed:>10}{expected:>10}{found:>9}{legacy_s:>7}")
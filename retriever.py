@@ -1,23 +1,117 @@
 # retriever.py
-from typing import List, Dict, Any
-from chromadb import PersistentClient
-from config import cfg
-from gemini_client import embed_query
+import os, time, uuid, asyncio, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from config import cfg, ensure_dirs
+from gemini_client import embed_query, embed_queries, embed_query_async, warm_up
+from lexical import LexicalIndex, get_lexical, rrf
+from compress import VectorCodec
+from telemetry import span
 
 COLLECTION_NAME = "ak_koc_docs"
 
-def _client() -> PersistentClient:
+# Süreç genelinde tek istemci + koleksiyon tutamağı (her çağrıda PersistentClient kurup
+# HNSW indeksini yeniden yüklememek için). reset_collection() tutamağı açıkça geçersiz kılar.
+# Arka uç cfg.VECTOR_BACKEND ile seçilir: "chroma" (varsayılan) ya da "numpy" (vector_store.py).
+_LOCK = threading.RLock()
+_CLIENT = None
+_COLLECTION = None
+
+def _client():
     # Kalıcı Chroma istemcisi (.chroma klasöründe dosyalar)
-    return PersistentClient(path=cfg.CHROMA_DIR)
+    global _CLIENT
+    if _CLIENT is None:
+        with _LOCK:
+            if _CLIENT is None:
+                from chromadb import PersistentClient   # numpy arka ucunda hiç yüklenmez
+                ensure_dirs()
+                _CLIENT = PersistentClient(path=cfg.CHROMA_DIR)
+    return _CLIENT
 
-def get_collection():
-    client = _client()
+def _open_chroma():
     # cosine benzerlik (HNSW vektör uzayı)
-    return client.get_or_create_collection(
+    return _client().get_or_create_collection(
         name=COLLECTION_NAME,
         metadata={"hnsw:space": "cosine"}
     )
 
+def _drop_chroma() -> None:
+    try:
+        _client().delete_collection(COLLECTION_NAME)
+    except Exception:
+        pass
+
+def _open_numpy():
+    from vector_store import NumpyCollection
+    return NumpyCollection(os.path.join(cfg.CHROMA_DIR, "vectors"), quant=cfg.VECTOR_QUANT)
+
+def _drop_numpy() -> None:
+    # Önbellekteki tutamak varsa onu sıfırla; bağlantısı kapatılır (ardından invalidate() bırakır)
+    col = _COLLECTION if _COLLECTION is not None else _open_numpy()
+    try:
+        col.reset()
+    finally:
+        col.close()
+
+# ad -> (aç, sil)
+_BACKENDS = {
+    "chroma": (_open_chroma, _drop_chroma),
+    "numpy": (_open_numpy, _drop_numpy),
+}
+
+def _backend():
+    try:
+        return _BACKENDS[cfg.VECTOR_BACKEND]
+    except KeyError:
+        raise ValueError(f"Bilinmeyen VECTOR_BACKEND: {cfg.VECTOR_BACKEND!r} (seçenekler: {', '.join(_BACKENDS)})")
+
+# Sıkıştırma (compress.py): boyut kesme her arka uçta; nicemleme yalnızca numpy arka ucunda
+# (Chroma float32 saklar: VECTOR_QUANT imzaya girip boş yere yeniden indekslemeye yol açmasın)
+CODEC = VectorCodec(quant=cfg.VECTOR_QUANT if cfg.VECTOR_BACKEND == "numpy" else "none")
+
+def get_collection():
+    global _COLLECTION
+    col = _COLLECTION
+    if col is not None:
+        return col
+    with _LOCK:
+        if _COLLECTION is None:
+            _COLLECTION = _backend()[0]()
+        return _COLLECTION
+
+# ---- İndeks sürümü ----
+# İndekse her yazışta değişen kısa bir belirteç; cevap önbellekleri bununla geçersiz kılınır.
+# Dosyada tutulur ki ayrı süreçte çalışan ingest/watcher yazdığında uygulama da görsün.
+_VERSION_PATH = os.path.join(cfg.CHROMA_DIR, "index_version")
+_version_cache = (None, "0")   # (mtime_ns, sürüm)
+
+def index_version() -> str:
+    """Geçerli indeks sürümü (ucuz: yalnızca dosya mtime'ı değişince okunur)."""
+    global _version_cache
+    try:
+        mtime = os.stat(_VERSION_PATH).st_mtime_ns
+    except OSError:
+        return "0"
+    if _version_cache[0] != mtime:
+        with open(_VERSION_PATH, "r", encoding="utf-8") as f:
+            _version_cache = (mtime, f.read().strip() or "0")
+    return _version_cache[1]
+
+def bump_index_version() -> str:
+    ver = f"{time.time_ns():x}-{uuid.uuid4().hex[:8]}"
+    ensure_dirs()
+    tmp = f"{_VERSION_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(ver)
+    os.replace(tmp, _VERSION_PATH)
+    return ver
+
+def invalidate() -> None:
+    """Önbellekteki koleksiyon tutamağını bırakır (bir sonraki get_collection yeniden açar)."""
+    global _COLLECTION
+    with _LOCK:
+        _COLLECTION = None
+
 def index_texts(
     texts: List[str],
     metadatas: List[Dict[str, Any]],
@@ -25,34 +119,244 @@ def index_texts(
     embeddings: List[List[float]],
 ) -> int:
     """
-    Verilen metin/embedding/metadata listelerini koleksiyona ekler.
+    Verilen metin/embedding/metadata listelerini koleksiyona yazar.
+    Aynı id zaten varsa üzerine yazılır (upsert) — tekrar indekslemede çakışma olmaz.
     """
     if not (len(texts) == len(metadatas) == len(ids) == len(embeddings)):
         raise ValueError("texts/metadatas/ids/embeddings uzunlukları eşleşmiyor.")
+    if not ids:
+        return 0
+    col = get_collection()
+    embeddings = CODEC.prepare(embeddings).tolist()
+    col.upsert(documents=texts, metadatas=metadatas, ids=ids, embeddings=embeddings)
+    get_lexical().add(ids, texts, metadatas)
+    bump_index_version()
+    return len(ids)
+
+def update_metadatas(ids: List[str], metadatas: List[Dict[str, Any]]) -> int:
+    """
+    Var olan kayıtların metadata'sını (embedding'e dokunmadan) günceller.
+    """
+    if len(ids) != len(metadatas):
+        raise ValueError("ids/metadatas uzunlukları eşleşmiyor.")
+    if not ids:
+        return 0
+    col = get_collection()
+    col.update(ids=list(ids), metadatas=list(metadatas))
+    get_lexical().update_meta(ids, metadatas)
+    bump_index_version()
+    return len(ids)
+
+def delete_ids(ids: List[str]) -> int:
+    """
+    Verilen id'leri koleksiyondan siler (silinen/kısalan dosyaların parçaları için).
+    """
+    if not ids:
+        return 0
     col = get_collection()
-    col.add(documents=texts, metadatas=metadatas, ids=ids, embeddings=embeddings)
+    col.delete(ids=list(ids))
+    get_lexical().delete(ids)
+    bump_index_version()
     return len(ids)
 
-def search(query: str, k: int = 5):
+def flush() -> None:
+    """
+    Bellekte biriken yazmaları (BM25 indeksi, numpy arka ucu) diske yazar; ingest bitince çağrılır.
+    """
+    get_lexical().flush()
+    col = get_collection()
+    if hasattr(col, "flush") and col.flush():
+        bump_index_version()   # diğer süreçler yeni matrisi görsün
+
+# ---- Sorgu embedding'i: zaman aşımı + devre kesici ----
+# Embedding servisi yavaş/erişilemezse arama beklemeden sözcüksel (BM25) yola düşer.
+# Tek bir yavaş/hatalı çağrı kesiciyi açmaz: EMBED_FAIL_THRESHOLD ardışık hatadan sonra
+# EMBED_COOLDOWN sn boyunca servis hiç denenmez; süre dolunca ilk çağrı deneme sayılır
+# (başarısızsa kesici hemen yeniden açılır, başarılıysa sayaç sıfırlanır).
+# İstemcinin ilk kurulumu (google.generativeai importu + configure) zaman ölçümünün dışında yapılır.
+_EMBED_WORKERS = 4
+_EMBED_POOL = ThreadPoolExecutor(max_workers=_EMBED_WORKERS, thread_name_prefix="qembed")
+_embed_lock = threading.Lock()
+_embed_down_until = 0.0
+_embed_failures = 0
+_embed_inflight = 0
+_embed_warm = False
+
+def _embed_available() -> bool:
+    return time.monotonic() >= _embed_down_until
+
+def _embed_ok() -> None:
+    global _embed_failures
+    with _embed_lock:
+        _embed_failures = 0
+
+def _embed_failed() -> None:
+    global _embed_failures, _embed_down_until
+    with _embed_lock:
+        _embed_failures += 1
+        if _embed_failures >= cfg.EMBED_FAIL_THRESHOLD:
+            _embed_down_until = time.monotonic() + cfg.EMBED_COOLDOWN
+
+def _warm_embed() -> bool:
+    # Süreçteki ilk sorgu istemci kurulumunu zaman aşımı olmadan öder; kurulum hatası (ör. anahtar yok) hata sayılır.
+    global _embed_warm
+    if not _embed_warm:
+        try:
+            warm_up()
+        except Exception:
+            _embed_failed()
+            return False
+        _embed_warm = True
+    return True
+
+def _embed_done(fut) -> None:
+    # Zaman aşımında bırakılan çağrı da burada düşer; sonucu embed_query önbelleğe yazmış olur.
+    global _embed_inflight
+    with _embed_lock:
+        _embed_inflight -= 1
+
+def embed_query_guarded(query: str, timeout: Optional[float] = None) -> Optional[List[float]]:
+    """Sorgu embedding'i ya da (servis yavaş/kapalıysa) None."""
+    global _embed_inflight
+    if not _embed_available() or not _warm_embed():
+        return None
+    with _embed_lock:
+        # Havuz doluysa (eşzamanlı sorgular ya da askıda kalan çağrılar) yeni iş kuyruğa yığılmaz.
+        # Bu yerel bir darboğazdır, servis hatası değil: devre kesici sayacına yansımaz.
+        if _embed_inflight >= _EMBED_WORKERS:
+            return None
+        _embed_inflight += 1
+    fut = _EMBED_POOL.submit(embed_query, query)
+    fut.add_done_callback(_embed_done)
+    try:
+        with span("query_embed"):
+            vec = fut.result(timeout=cfg.EMBED_TIMEOUT if timeout is None else timeout)
+    except Exception:
+        fut.cancel()
+        _embed_failed()
+        return None
+    _embed_ok()
+    return vec
+
+async def embed_query_guarded_async(query: str, timeout: Optional[float] = None) -> Optional[List[float]]:
+    """embed_query_guarded'ın asyncio sürümü (aynı devre kesiciyi paylaşır)."""
+    if not _embed_available():
+        return None
+    if not _embed_warm and not await asyncio.to_thread(_warm_embed):
+        return None
+    try:
+        with span("query_embed"):
+            vec = await asyncio.wait_for(embed_query_async(query), cfg.EMBED_TIMEOUT if timeout is None else timeout)
+    except Exception:
+        _embed_failed()
+        return None
+    _embed_ok()
+    return vec
+
+_LEX_PAGE = 1000        # BM25 indeksini koleksiyondan kurarken tek seferde okunan kayıt
+_lex_checked = False
+
+def _lexical() -> LexicalIndex:
+    global _lex_checked
+    lex = get_lexical()
+    if not _lex_checked:
+        with _LOCK:
+            if not _lex_checked:
+                col = get_collection()
+                if lex.empty() and col.count():
+                    # BM25 indeksi yoksa (eski kurulum) koleksiyondan sayfa sayfa bir kez kur
+                    offset = 0
+                    while True:
+                        res = col.get(include=["documents", "metadatas"], limit=_LEX_PAGE, offset=offset)
+                        if not res["ids"]:
+                            break
+                        lex.add(res["ids"], res["documents"], res["metadatas"])
+                        offset += len(res["ids"])
+                    lex.flush()
+                _lex_checked = True
+    return lex
+
+def lexical_search(query: str, k: int = 5) -> List[Dict[str, Any]]:
+    """Yalnızca yerel BM25 indeksiyle arama (embedding çağrısı yok); hit'lerde distance None."""
+    with span("lexical_query"):
+        return _lexical().search_hits(query, k)
+
+def search(query: str, k: int = 5, query_vec: Optional[List[float]] = None, mode: Optional[str] = None,
+           embed: bool = True):
     """
     Sorguyu embed edip en yakın k dokümanı döndürür.
+    query_vec verilirse (ör. önbellek kontrolü için zaten hesaplandıysa) yeniden embed edilmez.
+    mode: "hybrid" (BM25 + vektör, RRF ile), "vector" ya da "lexical" (varsayılan cfg.RETRIEVAL_MODE).
+    hybrid modda embedding alınamazsa sonuç yalnızca BM25'ten gelir.
+    Hit: {"id", "doc", "meta", "distance"}; BM25'ten gelen hit'lerde "bm25" skoru vardır ve vektör
+    aramasında bulunmadıysa "distance" None'dır (varsayılan "vector" modda embedding alındığı sürece hep dolu).
+    embed=False: çağıran embedding'i bu istek için zaten denedi ve alamadı (query_vec None); tekrar
+    denenmez, sonuç her modda yalnızca BM25'ten gelir.
+    """
+    return search_many([query], k=k, query_vecs=None if query_vec is None else [query_vec], mode=mode,
+                       embed=embed)[0]
+
+def search_many(
+    queries: List[str],
+    k: int = 5,
+    query_vecs: Optional[List[List[float]]] = None,
+    mode: Optional[str] = None,
+    embed: bool = True,
+):
+    """
+    Birden çok sorguyu tek batch embedding isteği ve tek col.query çağrısıyla arar.
+    Dönüş: her sorgu için search() ile aynı biçimde hit listesi (sıra korunur).
     """
+    if not queries:
+        return []
+    mode = mode or cfg.RETRIEVAL_MODE
+    if mode == "lexical" or (query_vecs is None and not embed):
+        return [lexical_search(q, k) for q in queries]
+
+    qvecs = query_vecs
+    if qvecs is None:
+        if mode == "vector":
+            with span("query_embed"):
+                qvecs = embed_queries(queries)
+        elif len(queries) == 1:
+            v = embed_query_guarded(queries[0])
+            qvecs = None if v is None else [v]
+        elif _embed_available():
+            try:
+                with span("query_embed"):
+                    qvecs = embed_queries(queries)
+            except Exception:
+                _embed_failed()
+                qvecs = None
+            else:
+                _embed_ok()
+    if qvecs is None:
+        # Hızlı yol: embedding servisi yavaş/kapalı -> yalnızca yerel BM25
+        return [lexical_search(q, k) for q in queries]
+
+    n = k if mode == "vector" else max(3 * k, 10)
     col = get_collection()
-    qvec = embed_query(query)
-    res = col.query(
-        query_embeddings=[qvec],
-        n_results=k,
-        include=["documents", "metadatas", "distances"],
-    )
+    with span("vector_query"):
+        res = col.query(
+            query_embeddings=CODEC.prepare(qvecs).tolist(),
+            n_results=n,
+            include=["documents", "metadatas", "distances"],
+        )
+    vec_hits = [_hits(res, qi) for qi in range(len(queries))]
+    if mode == "vector":
+        return vec_hits
+    return [rrf([vh, lexical_search(q, n)], k=k) for q, vh in zip(queries, vec_hits)]
+
+def _hits(res: Dict[str, Any], qi: int) -> List[Dict[str, Any]]:
     hits = []
-    # Sonuç yapısı listelerin listesi şeklinde döner
-    if res["ids"]:
-        for i in range(len(res["ids"][0])):
+    # Sonuç yapısı listelerin listesi şeklinde döner (her sorgu için bir liste)
+    if res["ids"] and qi < len(res["ids"]):
+        for i in range(len(res["ids"][qi])):
             hits.append({
-                "id": res["ids"][0][i],
-                "doc": res["documents"][0][i],
-                "meta": res["metadatas"][0][i],
-                "distance": res["distances"][0][i],
+                "id": res["ids"][qi][i],
+                "doc": res["documents"][qi][i],
+                "meta": res["metadatas"][qi][i],
+                "distance": res["distances"][qi][i],
             })
     return hits
 
@@ -64,12 +368,12 @@ def reset_collection():
     Koleksiyonu sıfırlar (dikkat: tüm veriler silinir!).
     Geliştirme/test amaçlı.
     """
-    client = _client()
-    try:
-        client.delete_collection(COLLECTION_NAME)
-    except Exception:
-        pass
-    return get_collection()
+    with _LOCK:
+        _backend()[1]()
+        invalidate()
+        get_lexical().clear()
+        bump_index_version()
+        return get_collection()
 
 # --------- Hızlı test ---------
 if __name__ == "__main__":
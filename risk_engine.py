@@ -0,0 +1,229 @@
+# risk_engine.py
+"""
+Bildirimsel (declarative) risk/koçluk kuralları ve vektörel değerlendirme (rules.risk_check bunu kullanır).
+- Kural: eşik, pencere (gün), ardışık seri uzunluğu, tutar filtresi, kapsam (kullanıcı başına / tek akış) ve
+  bağlantı noktası ("now": bugünde biten pencere, "any": geçmişteki herhangi bir an). JSON'dan da okunabilir.
+- compile_rules() kuralları bir plana çevirir: işlemler bir kez (kapsam, tarih) sırasına konur; pencere başlangıçları
+  (searchsorted) ve tutar filtresi başına kümülatif toplamlar kurallar arasında paylaşılır. Her kural birkaç
+  numpy işlemidir — kural eklemek işlemler üzerinde Python döngüsü eklemez.
+- Toplamlar kuruş cinsinden tamsayıdır: pencere değerleri toplama sırasından bağımsız ve kesindir
+  (risk_stream.py'deki olay-olay değerlendirici aynı sonuçları üretir).
+- Çıktı: tetiklenen her (kullanıcı, kural) için ilk tetiklenme tarihi ve o andaki değer.
+"""
+
+from __future__ import annotations
+import json
+from dataclasses import dataclass, asdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+KINDS = ("window_sum", "window_count", "streak")
+ANCHORS = ("now", "any")
+ALL_USERS = "*"   # per_user=False kurallarında kullanıcı alanı
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    kind:
+      window_sum   — window_days gün geriye (bugün/işlem günü dahil) tutar toplamı > threshold
+      window_count — aynı pencerede işlem sayısı > threshold
+      streak       — tutarı > threshold olan ardışık işlem sayısı >= streak
+    min_amount: window_* kurallarında yalnızca tutarı bundan büyük işlemler sayılır.
+    anchor: "now" — pencere bugünde biter (streak için: seri son window_days gün içinde tamamlanmalı);
+            "any" — geçmişteki herhangi bir işlemde koşul sağlanmışsa.
+    per_user: False ise tüm kullanıcıların işlemleri tek akış olarak değerlendirilir.
+    """
+    name: str
+    kind: str
+    threshold: float
+    message: str
+    window_days: int = 0
+    streak: int = 3
+    min_amount: float = 0.0
+    anchor: str = "any"
+    per_user: bool = True
+
+
+DEFAULT_RULES: List[Rule] = [
+    Rule("spend_3d", "window_sum", 3000, "Son 3 günde toplam harcama 3000₺ üzeri – Kart Koçun Uyardı! 🚨",
+         window_days=3, anchor="now"),
+    Rule("high_streak", "streak", 1000,
+         "Arka arkaya yüksek tutarlı harcamalar tespit edildi – Cüzdanı yavaşlatma zamanı olabilir.", streak=3),
+]
+
+def load_rules(path: str) -> List[Rule]:
+    """JSON dosyasından kural listesi: [{"name": ..., "kind": ..., "threshold": ..., "message": ...}, ...]."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [Rule(**d) for d in json.load(f)]
+
+def dump_rules(rules: Iterable[Rule], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([asdict(r) for r in rules], f, ensure_ascii=False, indent=2)
+
+
+class _Frame:
+    """Bir kapsam (kullanıcı başına ya da tek akış) için sıralanmış diziler ve paylaşılan ara sonuçlar."""
+
+    def __init__(self, df: pd.DataFrame, per_user: bool) -> None:
+        n = len(df)
+        if per_user and "user" in df.columns:
+            codes, self.users = pd.factorize(df["user"], sort=False)
+        else:
+            codes, self.users = np.zeros(n, dtype=np.int64), np.array([ALL_USERS], dtype=object)
+        codes = np.asarray(codes, dtype=np.int64)
+        day = df["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        self._d0 = int(day.min()) if n else 0
+        self._stride = int(day.max()) - self._d0 + 1 if n else 1
+        # (kapsam, gün) tek anahtarla, kararlı sıralama: aynı gündeki işlemler dosyadaki sırasını korur
+        order = np.argsort(codes * self._stride + (day - self._d0), kind="stable")
+        self.gid, self.day = codes[order], day[order]
+        self.amount = df["amount"].to_numpy(dtype=float)[order]
+        self.cents = to_cents(self.amount)
+        self.first = np.r_[True, self.gid[1:] != self.gid[:-1]] if n else np.zeros(0, dtype=bool)
+        self._starts: Dict[int, np.ndarray] = {}
+        self._csum: Dict[Tuple[str, float], np.ndarray] = {}
+
+    def window_start(self, days: int) -> np.ndarray:
+        """Her satır için [gün - days, gün] penceresinin (aynı grupta) ilk satırı."""
+        if days not in self._starts:
+            stride = self._stride + days + 1   # gruplar arası mesafe pencereden büyük: arama grup sınırını aşmaz
+            key = self.gid * stride + (self.day - self._d0)
+            self._starts[days] = np.searchsorted(key, key - days, side="left")
+        return self._starts[days]
+
+    def cumsum(self, what: str, min_amount: float) -> np.ndarray:
+        """Filtreli kümülatif toplam (başına 0 eklenmiş): what = "sum" (kuruş) ya da "count"."""
+        k = (what, min_amount)
+        if k not in self._csum:
+            ind = self.amount > min_amount
+            vals = np.where(ind, self.cents, 0) if what == "sum" else ind.astype(np.int64)
+            self._csum[k] = np.r_[0, np.cumsum(vals)]
+        return self._csum[k]
+
+
+def to_cents(amount):
+    """Tutar(lar) -> kuruş (tamsayı); pencere toplamları bununla kesin tutulur."""
+    return np.rint(np.asarray(amount, dtype=float) * 100).astype(np.int64)
+
+def _streak_lengths(x: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """Her satırda biten (grup içi) ardışık True sayısı — döngüsüz."""
+    c = np.cumsum(x)
+    # Sayacın sıfırlandığı noktalar: False satırlar ve grup başları (grubun öncesindeki toplam)
+    base = np.where(first, c - x, c)
+    reset = (~x) | first
+    return c - np.maximum.accumulate(np.where(reset, base, 0))
+
+def _first_per_group(gid: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    """idx (artan satır indeksleri) içinden her grubun ilk satırı."""
+    if not len(idx):
+        return idx
+    _, pos = np.unique(gid[idx], return_index=True)
+    return idx[pos]
+
+
+class RulePlan:
+    """compile_rules() çıktısı: kurallar doğrulanmış, kapsamlarına göre gruplanmış."""
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        self.rules = list(rules)
+        for r in self.rules:
+            if r.kind not in KINDS:
+                raise ValueError(f"Bilinmeyen kural türü: {r.kind!r} ({r.name}); seçenekler: {', '.join(KINDS)}")
+            if r.anchor not in ANCHORS:
+                raise ValueError(f"Bilinmeyen anchor: {r.anchor!r} ({r.name}); seçenekler: {', '.join(ANCHORS)}")
+
+    def evaluate(self, df: pd.DataFrame, today: Optional[date] = None) -> pd.DataFrame:
+        """Tetiklenen (user, rule) çiftleri: sütunlar user, rule, date, value, message."""
+        cols = ["user", "rule", "date", "value", "message"]
+        if df.empty or not self.rules:
+            return pd.DataFrame(columns=cols)
+        today = today or datetime.now().date()
+        t = (today - date(1970, 1, 1)).days
+        if not pd.api.types.is_datetime64_any_dtype(df["date"]):
+            df = df.assign(date=pd.to_datetime(df["date"], cache=True))   # kapsamlar arasında bir kez
+        frames: Dict[bool, _Frame] = {}
+        out: List[pd.DataFrame] = []
+        for r in self.rules:
+            f = frames.get(r.per_user)
+            if f is None:
+                f = frames[r.per_user] = _Frame(df, r.per_user)
+            g, v, d = self._eval_rule(f, r, t)
+            if len(g):
+                out.append(pd.DataFrame({"user": f.users[g], "rule": r.name,
+                                         "date": d.astype("datetime64[D]"), "value": v,
+                                         "message": r.message}))
+        if not out:
+            return pd.DataFrame(columns=cols)
+        res = pd.concat(out, ignore_index=True)
+        res["date"] = res["date"].dt.date
+        return res[cols]
+
+    @staticmethod
+    def _eval_rule(f: _Frame, r: Rule, t: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(grup kodları, değerler, tarihler[gün]) — tetiklenen gruplar için."""
+        if r.kind == "streak":
+            length = _streak_lengths(f.amount > r.threshold, f.first)
+            hit = length >= r.streak
+            if r.anchor == "now":
+                hit &= f.day >= t - r.window_days
+            rows = _first_per_group(f.gid, np.flatnonzero(hit))
+            return f.gid[rows], length[rows].astype(float), f.day[rows]
+
+        what = "sum" if r.kind == "window_sum" else "count"
+        scale = 100 if what == "sum" else 1   # toplamlar kuruş cinsinden
+        cs = f.cumsum(what, r.min_amount)
+        if r.anchor == "now":
+            # Bugünde biten pencere: [bugün - window_days, bugün]
+            recent = f.day >= t - r.window_days
+            step = np.diff(cs)
+            total = np.bincount(f.gid[recent], weights=step[recent], minlength=len(f.users))
+            last_day = np.full(len(f.users), -1, dtype=np.int64)
+            np.maximum.at(last_day, f.gid[recent], f.day[recent])
+            g = np.flatnonzero(total > r.threshold * scale)
+            return g, total[g] / scale, last_day[g]
+        start = f.window_start(r.window_days)
+        value = cs[1:] - cs[start]
+        rows = _first_per_group(f.gid, np.flatnonzero(value > r.threshold * scale))
+        return f.gid[rows], value[rows] / scale, f.day[rows]
+
+
+def compile_rules(rules: Iterable[Rule] = DEFAULT_RULES) -> RulePlan:
+    return RulePlan(rules)
+
+def alerts_from(result: pd.DataFrame) -> List[str]:
+    """Değerlendirme sonucundan kullanıcıya gösterilecek mesajlar (birden çok kullanıcı varsa kullanıcı önekli)."""
+    if result.empty:
+        return []
+    multi = result["user"].nunique() > 1
+    return [f"{u}: {m}" if multi and u != ALL_USERS else m for u, m in zip(result["user"], result["message"])]
+
+
+# --------- Hızlı test ---------
+if __name__ == "__main__":
+    import time
+    rng = np.random.default_rng(0)
+    n, users = 1_000_000, 20_000
+    today = datetime.now().date()
+    df = pd.DataFrame({
+        "user": rng.integers(0, users, n),
+        "date": np.datetime64(today, "D") - rng.integers(0, 120, n),
+        "amount": np.round(rng.lognormal(5, 1, n), 2),
+    })
+    rules = DEFAULT_RULES + [
+        Rule(f"spend_{w}d_{thr}", "window_sum", thr, f"{w} günde {thr}₺ üzeri", window_days=w)
+        for w in (1, 3, 7, 14, 30) for thr in (2000, 5000, 10000)
+    ] + [
+        Rule(f"count_{w}d", "window_count", 5, f"{w} günde 5'ten fazla işlem", window_days=w) for w in (1, 2, 3)
+    ] + [
+        Rule(f"streak_{k}", "streak", 500, f"art arda {k} işlem 500₺ üzeri", streak=k) for k in (2, 3, 4, 5)
+    ]
+    plan = compile_rules(rules)
+    t0 = time.perf_counter()
+    res = plan.evaluate(df, today)
+    print(f"🧮 {len(rules)} kural × {n:,} işlem ({users:,} kullanıcı): {time.perf_counter() - t0:.2f} sn, "
+          f"{len(res):,} tetiklenme")
+    print(res.groupby("rule").size().sort_values(ascending=False).head(8))
@@ -0,0 +1,463 @@
+# risk_stream.py
+"""
+Olay-olay (streaming) kural değerlendirme: işlemler tek tek işlenir, geçmiş her seferinde yeniden taranmaz.
+- Kullanıcı başına küçük durum: pencere uzunluğu başına son window_days günün işlemleri (deque) ve kural başına
+  kayan toplam, yüksek tutar serisi sayacı; (user, merchant) başına son görülme tarihi, tutar/aralık sayaçları
+  ve tahmini periyot.
+- Olay başına iş kural sayısıyla sınırlıdır (amortize O(1)): pencereden düşen işlemler toplamdan çıkarılır.
+  "any" kuralları tetiklendikleri olayda uyarı döndürür; "now" kuralları ve yaklaşan yenilemeler sorgu anında
+  (bugüne göre) durumdan okunur — yenilemeler sonraki yenileme gününe göre dizinlidir.
+- save()/load(): durumun JSON anlık görüntüsü (atomik yazım), yeniden başlatmalarda korunur. Kurallar ya da
+  abonelik parametreleri değiştiyse anlık görüntü yok sayılır ve geçmiş yeniden oynatılır.
+- Çıktı aynı veride toplu fonksiyonlarla aynıdır (risk_engine.RulePlan.evaluate / rules.risk_check ve
+  rules.detect_recurring). Koşul: her kullanıcının işlemleri tarih sırasıyla gelir (sync() yeni satırları tarihe
+  göre sıralar). İşlenmiş son tarihten eski (geç gelen) işlemler kabul edilir ama eşleşme garanti edilmez.
+"""
+
+from __future__ import annotations
+import os, json, threading
+from collections import deque
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from risk_engine import ALL_USERS, DEFAULT_RULES, Rule, alerts_from, compile_rules
+from rules import AMOUNT_STABLE_SHARE, AMOUNT_TOL, MIN_OCCURRENCES, PERIODS, _as_datetime
+
+EPOCH = date(1970, 1, 1)
+SNAPSHOT_VERSION = 2
+
+
+def _day(d: Any) -> int:
+    """Tarih (metin / date / datetime / Timestamp / datetime64 / gün sayısı) -> 1970'ten beri gün."""
+    if isinstance(d, (int, np.integer)):
+        return int(d)
+    if isinstance(d, np.datetime64):
+        return int(d.astype("datetime64[D]").astype(np.int64))
+    if isinstance(d, str):
+        d = date.fromisoformat(d[:10])
+    elif isinstance(d, datetime):
+        d = d.date()
+    return (d - EPOCH).days
+
+def _cents(amount: float) -> int:
+    return int(round(amount * 100))   # risk_engine.to_cents ile aynı (yarıda çifte yuvarlama)
+
+def _median(counts: Dict[Any, int], n: int) -> float:
+    """{değer: adet} çoklu kümesinin medyanı (çift adette ortadaki iki değerin ortalaması)."""
+    lo, hi = (n - 1) // 2, n // 2
+    seen, a = 0, None
+    for v in sorted(counts):
+        seen += counts[v]
+        if a is None and seen > lo:
+            a = v
+        if seen > hi:
+            return float(v) if a == v else (a + v) / 2
+    return float("nan")
+
+
+class _Plan:
+    """Bir kapsamın (kullanıcı başına ya da tek akış) kuralları, pencere uzunluklarına göre gruplanmış."""
+
+    def __init__(self, rules: List[Rule]) -> None:
+        self.rules = rules
+        self.windows = [r for r in rules if r.kind != "streak"]
+        self.streaks = [r for r in rules if r.kind == "streak"]
+        self.by_window: Dict[int, List[int]] = {}
+        for i, r in enumerate(self.windows):
+            self.by_window.setdefault(r.window_days, []).append(i)
+
+    def contrib(self, i: int, amount: float) -> int:
+        """Bir işlemin i. pencere kuralına katkısı: kuruş (window_sum) ya da 1 (window_count)."""
+        r = self.windows[i]
+        if amount <= r.min_amount:
+            return 0
+        return _cents(amount) if r.kind == "window_sum" else 1
+
+    @staticmethod
+    def scale(r: Rule) -> int:
+        return 100 if r.kind == "window_sum" else 1
+
+
+class _Scope:
+    """Tek kullanıcının (ya da ALL_USERS akışının) kural durumu."""
+    __slots__ = ("wins", "vals", "runs", "qualified", "fired")
+
+    def __init__(self, plan: _Plan) -> None:
+        self.wins: Dict[int, Deque[Tuple[int, float]]] = {w: deque() for w in plan.by_window}
+        self.vals = [0] * len(plan.windows)          # pencere kuralı başına kayan toplam (kuruş / adet)
+        self.runs = [0] * len(plan.streaks)          # seri kuralı başına ardışık yüksek tutar sayısı
+        # "now" serileri: son window_days gün içinde eşiği geçen (gün, seri uzunluğu) kayıtları
+        self.qualified: List[Deque[Tuple[int, int]]] = [deque() for _ in plan.streaks]
+        self.fired: Dict[str, Tuple[int, float]] = {}   # "any" kuralı -> (ilk tetiklenme günü, değer)
+
+    def step(self, plan: _Plan, day: int, amount: float) -> List[Rule]:
+        """İşlemi uygular; bu olayda ilk kez tetiklenen "any" kurallarını döndürür."""
+        for w, dq in self.wins.items():
+            idx = plan.by_window[w]
+            while dq and dq[0][0] < day - w:          # pencere: [gün - w, gün]
+                _, old = dq.popleft()
+                for i in idx:
+                    self.vals[i] -= plan.contrib(i, old)
+            dq.append((day, amount))
+            for i in idx:
+                self.vals[i] += plan.contrib(i, amount)
+        new: List[Rule] = []
+        for i, r in enumerate(plan.windows):
+            if r.anchor == "any" and r.name not in self.fired and self.vals[i] > r.threshold * plan.scale(r):
+                self.fired[r.name] = (day, self.vals[i] / plan.scale(r))
+                new.append(r)
+        for j, r in enumerate(plan.streaks):
+            run = self.runs[j] = self.runs[j] + 1 if amount > r.threshold else 0
+            if r.anchor == "any":
+                if run >= r.streak and r.name not in self.fired:
+                    self.fired[r.name] = (day, float(run))
+                    new.append(r)
+                continue
+            q = self.qualified[j]
+            while q and q[0][0] < day - r.window_days:
+                q.popleft()
+            if run >= r.streak:
+                q.append((day, run))
+        return new
+
+    def now(self, plan: _Plan, r: Rule, t: int) -> Optional[Tuple[int, float]]:
+        """Bugünde (t) biten pencere / seri için (gün, değer) ya da None."""
+        if r.kind == "streak":
+            q = self.qualified[plan.streaks.index(r)]
+            return next(((d, float(n)) for d, n in q if d >= t - r.window_days), None)
+        i = plan.windows.index(r)
+        total, last = 0, -1
+        for d, a in reversed(self.wins[r.window_days]):
+            if d < t - r.window_days:
+                break
+            total += plan.contrib(i, a)
+            last = max(last, d)
+        if total > r.threshold * plan.scale(r):
+            return last, total / plan.scale(r)
+        return None
+
+    def dump(self) -> Dict[str, Any]:
+        return {
+            "wins": {str(w): [list(e) for e in dq] for w, dq in self.wins.items()},
+            "runs": self.runs,
+            "qualified": [[list(e) for e in q] for q in self.qualified],
+            "fired": {k: list(v) for k, v in self.fired.items()},
+        }
+
+    @classmethod
+    def restore(cls, plan: _Plan, d: Dict[str, Any]) -> "_Scope":
+        s = cls(plan)
+        for w, entries in d["wins"].items():
+            dq = s.wins[int(w)]
+            for day, amount in entries:
+                dq.append((day, amount))
+                for i in plan.by_window[int(w)]:
+                    s.vals[i] += plan.contrib(i, amount)   # kayan toplamlar pencereden yeniden kurulur
+        s.runs = list(d["runs"])
+        s.qualified = [deque((day, n) for day, n in q) for q in d["qualified"]]
+        s.fired = {k: (v[0], v[1]) for k, v in d["fired"].items()}
+        return s
+
+
+class _Pair:
+    """(user, merchant) çifti: son görülme, tutar ve aralık (gün) sayaçları, tahmini periyot."""
+    __slots__ = ("n", "last", "gaps", "amounts", "med_amount", "period", "step", "next")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.last = 0
+        self.gaps: Dict[int, int] = {}
+        self.amounts: Dict[float, int] = {}
+        self.med_amount = 0.0
+        self.period = ""
+        self.step = 0
+        self.next: Optional[int] = None   # abonelik sayılıyorsa sonraki yenileme günü
+
+    def observe(self, day: int, amount: float) -> None:
+        if self.n:
+            gap = day - self.last
+            self.gaps[gap] = self.gaps.get(gap, 0) + 1
+            self.last = max(self.last, day)
+        else:
+            self.last = day
+        self.amounts[amount] = self.amounts.get(amount, 0) + 1
+        self.n += 1
+
+    def refresh(self, amount_tol: float, min_count: int) -> None:
+        """detect_recurring ile aynı ölçüt: medyan aralık bir periyoda yakın ve tutar yeterince sabit."""
+        self.next = None
+        if self.n < min_count:
+            return
+        med_gap = _median(self.gaps, self.n - 1)
+        self.period = ""
+        for name, (nominal, tol) in PERIODS.items():
+            if abs(med_gap - nominal) <= tol:
+                self.period = name
+        ref = self.med_amount = _median(self.amounts, self.n)
+        stable = sum(c for a, c in self.amounts.items() if abs(a - ref) <= amount_tol * abs(ref))
+        if self.period and stable / self.n >= AMOUNT_STABLE_SHARE:
+            self.step = int(round(med_gap))
+            self.next = self.last + self.step
+
+    def dump(self) -> List[Any]:
+        return [self.n, self.last, [[g, c] for g, c in self.gaps.items()], [[a, c] for a, c in self.amounts.items()]]
+
+    @classmethod
+    def restore(cls, d: List[Any]) -> "_Pair":
+        p = cls()
+        p.n, p.last = d[0], d[1]
+        p.gaps = {g: c for g, c in d[2]}
+        p.amounts = {a: c for a, c in d[3]}
+        return p
+
+
+class RiskStream:
+    """Risk kuralları + abonelik tespiti için olay-olay değerlendirici (thread-safe)."""
+
+    def __init__(
+        self,
+        rules: Iterable[Rule] = DEFAULT_RULES,
+        amount_tol: float = AMOUNT_TOL,
+        min_count: int = MIN_OCCURRENCES,
+    ) -> None:
+        self.rules = compile_rules(rules).rules      # doğrulama toplu motorla aynı
+        self.amount_tol, self.min_count = amount_tol, min_count
+        self._local = _Plan([r for r in self.rules if r.per_user])
+        self._global = _Plan([r for r in self.rules if not r.per_user])
+        self.signature = json.dumps({
+            "rules": [asdict(r) for r in self.rules],
+            "recurring": [amount_tol, min_count, AMOUNT_STABLE_SHARE, PERIODS],
+        }, sort_keys=True, ensure_ascii=False)
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._users: Dict[str, _Scope] = {}
+            self._all: Optional[_Scope] = None
+            self._pairs: Dict[Tuple[str, str], _Pair] = {}
+            self._due: Dict[int, Set[Tuple[str, str]]] = {}   # sonraki yenileme günü -> çiftler
+            self.events = 0
+            self.rows = 0              # sync() imleci: işlenen satır sayısı ya da (seq sütunu varsa) sıradaki seq
+            self.by_seq = False        # imleç seq'e mi (tx_store) satır konumuna mı (CSV) göre
+            self.tail: Optional[str] = None
+
+    # ---------------- Olaylar ----------------
+    def process(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Tek işlem ({"user", "date", "amount", "merchant"}); bu olayda yeni tetiklenen uyarılar."""
+        with self._lock:
+            return self._process(str(event.get("user", "")), _day(event["date"]), float(event["amount"]),
+                                 event.get("merchant"))
+
+    def _process(self, user: str, day: int, amount: float, merchant: Any) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for key, plan in ((user, self._local), (ALL_USERS, self._global)):
+            if not plan.rules:
+                continue
+            if plan is self._global:
+                s = self._all = self._all or _Scope(plan)
+            else:
+                s = self._users.get(key) or self._users.setdefault(key, _Scope(plan))
+            for r in s.step(plan, day, amount):
+                d, v = s.fired[r.name]
+                out.append({"user": key, "rule": r.name, "date": EPOCH + timedelta(days=d), "value": v,
+                            "message": r.message})
+        if merchant is not None:
+            pk = (user, str(merchant))
+            p = self._pairs.get(pk) or self._pairs.setdefault(pk, _Pair())
+            old = p.next
+            p.observe(day, amount)
+            p.refresh(self.amount_tol, self.min_count)
+            if old != p.next:
+                if old is not None:
+                    self._due[old].discard(pk)
+                    if not self._due[old]:
+                        del self._due[old]
+                if p.next is not None:
+                    self._due.setdefault(p.next, set()).add(pk)
+        self.events += 1
+        return out
+
+    @staticmethod
+    def _fingerprint(df: pd.DataFrame, i: int) -> str:
+        row = df.iloc[i]
+        return json.dumps([str(row.get("user", "")), _day(pd.Timestamp(row["date"]).to_datetime64()),
+                           float(row["amount"]), str(row.get("merchant", ""))])
+
+    def _last(self, df: pd.DataFrame, seq: Optional[np.ndarray]) -> Optional[int]:
+        # İmleçteki son işlenmiş satırın konumu (yoksa None)
+        if seq is None:
+            return self.rows - 1 if len(df) >= self.rows else None
+        pos = np.flatnonzero(seq == self.rows - 1)
+        return int(pos[0]) if len(pos) == 1 else None
+
+    def sync(self, df: pd.DataFrame) -> int:
+        """
+        Yalnızca eklenen (henüz işlenmemiş) satırları işler; işlenen satır sayısını döndürür.
+        df'de "seq" sütunu varsa (tx_store) yeni satırlar seq'i imleçten büyük olanlardır; satır sırası önemsizdir
+        (depo bölüm sırasıyla döner). Yoksa (CSV) tablo yalnızca sona ekleniyor varsayılır. Son işlenen satır
+        bulunamaz ya da değişmişse (depo yeniden dönüştürüldü, CSV yeniden üretildi) durum sıfırlanır ve tablo
+        baştan oynatılır.
+        """
+        with self._lock:
+            seq = df["seq"].to_numpy(dtype=np.int64) if "seq" in df.columns else None
+            if self.rows:
+                last = self._last(df, seq) if self.by_seq == (seq is not None) else None
+                if last is None or self._fingerprint(df, last) != self.tail:
+                    self.reset()
+            self.by_seq = seq is not None
+            if seq is None:
+                new = df.iloc[self.rows:]
+            else:
+                new = df[seq >= self.rows]
+                new = new.iloc[np.argsort(new["seq"].to_numpy(), kind="stable")]   # aynı gün: yazım sırası
+            if new.empty:
+                return 0
+            stamps = _as_datetime(new["date"]).to_numpy().astype("datetime64[D]")
+            days = stamps.astype(np.int64)
+            order = np.argsort(days, kind="stable")   # kullanıcı içinde tarih sırası (aynı gün: dosya sırası)
+            order = order[~np.isnat(stamps[order])]   # tarihsiz satırlar (toplu detect_recurring gibi) atlanır
+            users = new["user"].astype(str).to_numpy()[order] if "user" in new.columns else np.full(len(new), "")
+            merchants = (new["merchant"].to_numpy()[order] if "merchant" in new.columns
+                         else np.full(len(new), None, dtype=object))
+            amounts = new["amount"].to_numpy(dtype=float)[order]
+            for u, d, a, m in zip(users.tolist(), days[order].tolist(), amounts.tolist(), merchants.tolist()):
+                self._process(u, d, a, m)
+            if seq is None:
+                self.rows = len(df)
+                self.tail = self._fingerprint(df, self.rows - 1)
+            else:
+                self.rows = int(new["seq"].iloc[-1]) + 1
+                self.tail = self._fingerprint(new, len(new) - 1)
+            return len(new)
+
+    # ---------------- Sorgular ----------------
+    def evaluate(self, today: Optional[date] = None) -> pd.DataFrame:
+        """risk_engine.RulePlan.evaluate ile aynı biçim: user, rule, date, value, message."""
+        cols = ["user", "rule", "date", "value", "message"]
+        t = _day(today or datetime.now().date())
+        rows = []
+        with self._lock:
+            for r in self.rules:
+                plan = self._local if r.per_user else self._global
+                scopes = self._users.items() if r.per_user else ([(ALL_USERS, self._all)] if self._all else [])
+                for key, s in scopes:
+                    hit = s.now(plan, r, t) if r.anchor == "now" else s.fired.get(r.name)
+                    if hit:
+                        rows.append((key, r.name, EPOCH + timedelta(days=hit[0]), hit[1], r.message))
+        return pd.DataFrame(rows, columns=cols)
+
+    def alerts(self, today: Optional[date] = None) -> List[str]:
+        """rules.risk_check ile aynı mesajlar."""
+        return alerts_from(self.evaluate(today))
+
+    def upcoming(self, days_ahead: int = 7, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """rules.detect_recurring ile aynı çıktı; yalnızca yenilemesi [bugün, bugün + days_ahead] içindeki çiftler."""
+        t = _day(today or datetime.now().date())
+        subs = []
+        with self._lock:
+            for d in range(t, t + days_ahead + 1):
+                for user, merchant in self._due.get(d, ()):
+                    p = self._pairs[(user, merchant)]
+                    subs.append({
+                        "user": user, "merchant": merchant,
+                        "amount": round(p.med_amount, 2),
+                        "last_date": EPOCH + timedelta(days=p.last),
+                        "next_renewal": EPOCH + timedelta(days=d),
+                        "period": p.period,
+                        "period_days": p.step,
+                        "count": p.n,
+                    })
+        subs.sort(key=lambda s: (s["next_renewal"], s["user"], s["merchant"]))
+        return subs
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"events": self.events, "rows": self.rows, "users": len(self._users), "pairs": len(self._pairs),
+                    "subscriptions": sum(len(v) for v in self._due.values())}
+
+    # ---------------- Anlık görüntü ----------------
+    def save(self, path: str) -> None:
+        with self._lock:
+            snap = {
+                "version": SNAPSHOT_VERSION,
+                "signature": self.signature,
+                "events": self.events, "rows": self.rows, "by_seq": self.by_seq, "tail": self.tail,
+                "users": {u: s.dump() for u, s in self._users.items()},
+                "all": self._all.dump() if self._all else None,
+                "pairs": [[u, m, p.dump()] for (u, m), p in self._pairs.items()],
+            }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snap, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, rules: Iterable[Rule] = DEFAULT_RULES, **kw: Any) -> "RiskStream":
+        """Anlık görüntüden kurar; dosya yoksa, bozuksa ya da kurallar değiştiyse boş değerlendirici döner."""
+        rs = cls(rules, **kw)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+        except (OSError, ValueError):
+            return rs
+        if snap.get("version") != SNAPSHOT_VERSION or snap.get("signature") != rs.signature:
+            return rs
+        rs.events, rs.rows, rs.by_seq, rs.tail = snap["events"], snap["rows"], snap["by_seq"], snap["tail"]
+        rs._users = {u: _Scope.restore(rs._local, d) for u, d in snap["users"].items()}
+        rs._all = _Scope.restore(rs._global, snap["all"]) if snap["all"] else None
+        for u, m, d in snap["pairs"]:
+            p = rs._pairs[(u, m)] = _Pair.restore(d)
+            p.refresh(rs.amount_tol, rs.min_count)
+            if p.next is not None:
+                rs._due.setdefault(p.next, set()).add((u, m))
+        return rs
+
+
+# --------- Hızlı test: toplu fonksiyonlarla eşleşme + anlık görüntü ---------
+if __name__ == "__main__":
+    import time, tempfile
+    from rules import detect_recurring
+    from recurring_report import synthetic
+
+    df, _ = synthetic(60_000)
+    rng = np.random.default_rng(1)
+    df["amount"] = np.where(rng.random(len(df)) < 0.05, np.round(rng.uniform(900, 2500, len(df)), 2), df["amount"])
+    df = df.sort_values("date", kind="stable").reset_index(drop=True)
+    today = datetime.now().date()
+    rules = DEFAULT_RULES + [
+        Rule("spend_7d", "window_sum", 6000, "7 günde 6000₺ üzeri", window_days=7),
+        Rule("count_2d", "window_count", 4, "2 günde 4'ten fazla işlem", window_days=2, min_amount=50),
+        Rule("streak_now", "streak", 900, "son 30 günde art arda 2 yüksek işlem", streak=2, window_days=30,
+             anchor="now"),
+        Rule("all_1d", "window_sum", 200000, "tüm kullanıcılar: 1 günde 200000₺ üzeri", window_days=1,
+             per_user=False),
+    ]
+
+    # Önce geçmişin %70'i, anlık görüntü, yeniden yükleme, sonra kalanı (sona eklenen satırlar gibi)
+    cut = int(len(df) * 0.7)
+    path = os.path.join(tempfile.mkdtemp(), "risk_state.json")
+    rs = RiskStream(rules)
+    t0 = time.perf_counter()
+    rs.sync(df.iloc[:cut])
+    rs.save(path)
+    rs = RiskStream.load(path, rules)
+    rs.sync(df)
+    dt = time.perf_counter() - t0
+    print(f"🌊 {len(df):,} olay: {dt:.2f} sn ({1e6 * dt / len(df):.1f} µs/olay) | {rs.stats()} | "
+          f"anlık görüntü: {os.path.getsize(path) / 1e6:.1f} MB")
+
+    key = lambda x: (x["user"], x["rule"])
+    batch = sorted(compile_rules(rules).evaluate(df, today).to_dict("records"), key=key)
+    stream = sorted(rs.evaluate(today).to_dict("records"), key=key)
+    print(f"⚠️ kurallar: toplu {len(batch)} | akış {len(stream)} | eşleşme: {'✅' if batch == stream else '❌'}")
+    subs_b = detect_recurring(df, days_ahead=7, today=today)
+    for s in subs_b:
+        s["user"], s["merchant"] = str(s["user"]), str(s["merchant"])
+    subs_s = rs.upcoming(days_ahead=7, today=today)
+    print(f"🔁 yenilemeler: toplu {len(subs_b)} | akış {len(subs_s)} | eşleşme: {'✅' if subs_b == subs_s else '❌'}")
@@ -1,70 +1,129 @@
 # rules.py
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+from risk_engine import compile_rules, alerts_from
+
+_DEFAULT_PLAN = compile_rules()
 
 def _as_date(s):
     return pd.to_datetime(s).date()
 
-def detect_recurring(df: pd.DataFrame, days_ahead: int = 7):
+# Abonelik periyotları: ad -> (nominal gün, medyan aralık için tolerans gün)
+PERIODS = {
+    "weekly": (7, 1),
+    "monthly": (30, 3),
+    "yearly": (365, 10),
+}
+MIN_OCCURRENCES = 3        # en az 3 tekrar
+AMOUNT_TOL = 0.10          # tutarın grup medyanından en fazla %10 sapması "aynı tutar" sayılır
+AMOUNT_STABLE_SHARE = 0.75 # işlemlerin en az bu oranı tolerans içinde olmalı (zam/tek seferlik alımlar için pay)
+
+def _as_datetime(s: pd.Series) -> pd.Series:
+    """Tarih sütunu zaten datetime ise olduğu gibi; değilse (CSV'den metin) bir kez çözülür."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    return pd.to_datetime(s, cache=True)   # cache: tekrar eden tarih metinleri bir kez çözülür
+
+def detect_recurring(
+    df: pd.DataFrame,
+    days_ahead: int = 7,
+    today=None,
+    amount_tol: float = AMOUNT_TOL,
+    min_count: int = MIN_OCCURRENCES,
+):
     """
-    Basit hayalet abonelik tespiti:
-    - Aynı merchant adına ~30 günde bir tekrar eden ve benzer tutarlı işlemler
-    - Son işlem + 30 gün ≈ bir sonraki yenileme; yenileme days_ahead gün içindeyse bildir
+    Hayalet abonelik tespiti, her (user, merchant) çifti için (user sütunu yoksa yalnızca merchant):
+    - İşlemler çift + tarihe göre sıralanır, ardışık işlemler arası gün farkları (inter-arrival) çıkarılır
+    - Medyan aralık haftalık / aylık / yıllık periyotlardan birine tolerans içinde yakınsa periyot odur
+    - Tutarların en az AMOUNT_STABLE_SHARE'i grup medyanının ±amount_tol'u içindeyse tutar sabittir
+    - Sonraki yenileme = son işlem + medyan aralık; days_ahead gün içindeyse bildirilir
+    Python döngüsü yok: gruplar numpy dizileri üzerinde sınır maskeleriyle işlenir (milyonlarca satır için).
     """
     subs = []
     if df.empty: return subs
-    df = df.copy()
-    df["date"] = pd.to_datetime(df["date"]).dt.date
-    today = datetime.now().date()
-
-    for name, g in df.groupby("merchant"):
-        g = g.sort_values("date")
-        if len(g) < 3:  # en az 3 tekrar
-            continue
-        # benzer tutar kontrolü: en çok geçen tutarı moda al
-        top_amount = g["amount"].round(1).mode()
-        if top_amount.empty:
-            continue
-        top_amount = float(top_amount.iloc[0])
-        # kabaca 30 günlük periyot say
-        last = g["date"].iloc[-1]
-        next_renewal = last + timedelta(days=30)
-        if 0 <= (next_renewal - today).days <= days_ahead:
-            subs.append({
-                "merchant": name,
-                "amount": top_amount,
-                "last_date": last,
-                "next_renewal": next_renewal
-            })
+    keys = ["user", "merchant"] if "user" in df.columns else ["merchant"]
+    today = today or datetime.now().date()
+
+    # Tarihi olmayan (NaT) satırlar atılır: int64'e çevrilince en küçük değer olup aralık/sıralamayı bozar
+    dates = _as_datetime(df["date"])
+    valid = dates.notna().to_numpy()
+    if not valid.all():
+        df, dates = df[valid], dates[valid]
+        if df.empty: return subs
+
+    # (user, merchant) -> tek tamsayı grup kodu; tarih -> gün sayısı
+    gid = np.zeros(len(df), dtype=np.int64)
+    for k in keys:
+        codes, uniques = pd.factorize(df[k], sort=False)
+        gid = gid * (len(uniques) + 1) + (codes + 1)
+    days = dates.to_numpy().astype("datetime64[D]").astype(np.int64)
+    amount = df["amount"].to_numpy(dtype=float)
+
+    # Tek anahtarlı sıralama (grup, gün): iki anahtarlı lexsort'tan belirgin hızlı (taşma riski yoksa)
+    d0, span = days.min(), days.max() - days.min() + 1
+    if gid.max() < (1 << 62) // span:
+        order = np.argsort(gid * span + (days - d0), kind="stable")
+    else:
+        order = np.lexsort((days, gid))
+    gid, days, amount = gid[order], days[order], amount[order]
+    first = np.r_[True, gid[1:] != gid[:-1]]           # grubun ilk satırı
+    last = np.r_[first[1:], True]                       # grubun son satırı
+    grp = np.cumsum(first) - 1                          # 0..G-1
+    count = np.bincount(grp)
+
+    # Aralık istatistikleri (grup sınırlarını aşan farklar atılır)
+    gap = np.diff(days)
+    inner = ~first[1:]
+    med_gap = (pd.Series(gap[inner]).groupby(grp[1:][inner]).median()
+               .reindex(range(len(count))).to_numpy())
+
+    # Periyot tahmini: medyan aralığa tolerans içinde en yakın nominal periyot
+    period = np.full(len(count), "", dtype=object)
+    for name, (nominal, tol) in PERIODS.items():
+        period[np.abs(med_gap - nominal) <= tol] = name
+
+    # Tutar kararlılığı
+    med_amount = pd.Series(amount).groupby(grp).median().to_numpy()
+    ref = med_amount[grp]
+    stable = np.abs(amount - ref) <= amount_tol * np.abs(ref)
+    stable_share = np.bincount(grp, weights=stable) / count
+
+    last_day = days[last]
+    step = np.rint(np.nan_to_num(med_gap)).astype(np.int64)
+    next_day = last_day + step
+    epoch = date(1970, 1, 1)
+    due = next_day - (today - epoch).days
+    hit = (count >= min_count) & (period != "") & (stable_share >= AMOUNT_STABLE_SHARE) & (due >= 0) & (due <= days_ahead)
+
+    rows = order[np.flatnonzero(last)[hit]]            # her eşleşen grubun son işleminin orijinal konumu
+    key_vals = [df[k].iloc[rows].tolist() for k in keys]
+    for j, i in enumerate(np.flatnonzero(hit)):
+        item = {k: vals[j] for k, vals in zip(keys, key_vals)}
+        item.update({
+            "amount": round(float(med_amount[i]), 2),
+            "last_date": epoch + timedelta(days=int(last_day[i])),
+            "next_renewal": epoch + timedelta(days=int(next_day[i])),
+            "period": period[i],
+            "period_days": int(step[i]),
+            "count": int(count[i]),
+        })
+        subs.append(item)
+    subs.sort(key=lambda s: (s["next_renewal"], str(s.get("user", "")), str(s["merchant"])))
     return subs
 
-def risk_check(df: pd.DataFrame):
+def risk_check(df: pd.DataFrame, rules=None, today=None):
     """
-    Basit risk kuralları:
+    Risk / koçluk kuralları (varsayılan: risk_engine.DEFAULT_RULES):
     - Son 3 günde toplam harcama > 3000 TL
     - Art arda 3 yüksek tutar (> 1000 TL)
+    Kurallar bildirimseldir (risk_engine.Rule); kullanıcı başına, tek geçişte vektörel değerlendirilir.
     """
     alerts = []
     if df.empty: return alerts
-    df = df.copy()
-    df["date"] = pd.to_datetime(df["date"]).dt.date
-    df = df.sort_values("date")
-
-    # Kural 1: son 3 gün toplamı
-    last3 = df[df["date"] >= (datetime.now().date() - timedelta(days=3))]
-    if last3["amount"].sum() > 3000:
-        alerts.append("Son 3 günde toplam harcama 3000₺ üzeri – Kart Koçun Uyardı! 🚨")
-
-    # Kural 2: art arda 3 yüksek harcama
-    highs = (df["amount"] > 1000).astype(int).tolist()
-    streak = 0
-    for x in highs:
-        streak = streak + 1 if x == 1 else 0
-        if streak >= 3:
-            alerts.append("Arka arkaya yüksek tutarlı harcamalar tespit edildi – Cüzdanı yavaşlatma zamanı olabilir.")
-            break
-
-    return alerts
+    plan = _DEFAULT_PLAN if rules is None else compile_rules(rules)
+    return alerts_from(plan.evaluate(df, today))
 
 if __name__ == "__main__":
     import os
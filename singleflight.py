@@ -0,0 +1,129 @@
+# singleflight.py
+"""
+Eşzamanlı aynı isteklerin tek bir hesaplamayı paylaşması (single-flight / istek birleştirme).
+- Aynı anahtarla gelen ilk çağrı lider olur ve işi yapar; o sürerken gelenler (takipçiler) bekler
+  ve liderin sonucunun bir kopyasını (ya da aynı hatayı) alır. İş bitince anahtar silinir:
+  bu bir önbellek değildir, yalnızca o an uçuşta olan hesaplamayı paylaştırır.
+- Thread'ler (answer_question, akış) ve asyncio görevleri (answer_question_async) aynı uçuşu
+  paylaşabilir: bekleme hem bloklayan (wait) hem de olay döngüsünü bloklamayan (wait_async) biçimde yapılır.
+"""
+
+from __future__ import annotations
+import copy, asyncio, threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class Call:
+    """Uçuştaki tek bir hesaplama."""
+
+    def __init__(self) -> None:
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self._value: Any = None
+        self._error: Optional[BaseException] = None
+        self.followers = 0
+
+    def _resolve(self, value: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._value, self._error = value, error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for cb in callbacks:
+            cb()
+
+    def _add_callback(self, cb: Callable[[], None]) -> None:
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(cb)
+                return
+        cb()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def result(self) -> Any:
+        """Takipçi için sonuç: liderin değerinin derin kopyası (çağıranlar cevabı değiştirebilir)."""
+        if self._error is not None:
+            raise self._error
+        return copy.deepcopy(self._value)
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        if not self._done.wait(timeout):
+            raise TimeoutError("single-flight: lider zamanında bitmedi")
+        return self.result()
+
+    async def wait_async(self) -> Any:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        def _wake() -> None:
+            loop.call_soon_threadsafe(lambda: fut.done() or fut.set_result(None))
+        self._add_callback(_wake)
+        await fut
+        return self.result()
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def begin(self, key: Hashable) -> Tuple[Call, bool]:
+        """(çağrı, lider_mi). Lider işi bitirince finish() çağırmak zorundadır."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = Call()
+            self.leaders += 1
+            return call, True
+
+    def finish(self, key: Hashable, call: Call, value: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        # Anlık görüntü: lider kendi kopyasını sonradan değiştirse de takipçiler etkilenmez
+        call._resolve(copy.deepcopy(value) if error is None else None, error)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """fn()'i anahtar başına bir kez çalıştırır; (sonuç, paylaşıldı_mı)."""
+        call, leader = self.begin(key)
+        if not leader:
+            return call.wait(), True
+        try:
+            value = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, value)
+        return value, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": self.in_flight()}
+
+
+# --------- Hızlı test ---------
+if __name__ == "__main__":
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    sf = SingleFlight()
+    runs = []
+
+    def slow():
+        runs.append(1)
+        time.sleep(0.2)
+        return {"answer": "tek hesaplama"}
+
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        out = list(pool.map(lambda _: sf.do("ekstre nedir", slow), range(50)))
+    print(f"🧵 50 eşzamanlı çağrı -> {len(runs)} hesaplama | paylaşılan: {sum(s for _, s in out)} | {sf.stats()}")
@@ -0,0 +1,248 @@
+# telemetry.py
+"""
+Hafif gecikme ölçümü (span) + yapılandırılmış istek günlüğü + yüzdelik (p50/p95/p99) toplayıcı.
+- trace("rag") bir isteğin kaydını açar; alt katmanlar (retriever, rag, ingest) span("vector_query") ile
+  aşama sürelerini ekler. Geçerli kayıt contextvars ile taşınır: asyncio görevleri ve to_thread'e kendiliğinden
+  geçer; kayıt yokken span() neredeyse bedavadır.
+- Her kayıt bitince: aşama süreleri get_aggregator()'a eklenir, JSON satırı get_request_log()'a yazılır.
+  Günlük partiler halinde (cfg.REQUEST_LOG_BATCH satır ya da cfg.REQUEST_LOG_FLUSH_SEC sn) diske eklenir.
+
+Kullanım: python telemetry.py [günlük yolu]   # günlükten aşama bazında p50/p95/p99
+"""
+
+from __future__ import annotations
+import os, json, time, atexit, hashlib, threading, contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from config import cfg
+
+_CURRENT: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+
+
+def query_hash(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:16]
+
+
+class Trace:
+    """Tek bir isteğin (ya da ingest çalışmasının) aşama süreleri ve özellikleri."""
+
+    def __init__(self, kind: str, **attrs: Any) -> None:
+        self.kind = kind
+        self.attrs: Dict[str, Any] = dict(attrs)
+        self.stages: Dict[str, float] = {}   # aşama -> toplam ms (tekrarlanan aşamalar toplanır)
+        self._lock = threading.Lock()        # ingest'te boru hattı thread'leri aynı kayda yazar
+        self._t0 = time.perf_counter()
+        self.ts = time.time()
+
+    def add(self, stage: str, ms: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + ms
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def elapsed_ms(self) -> float:
+        return 1e3 * (time.perf_counter() - self._t0)
+
+    def record(self) -> Dict[str, Any]:
+        stages = {k: round(v, 3) for k, v in self.stages.items()}
+        stages["total"] = round(self.elapsed_ms(), 3)
+        return dict({"ts": round(self.ts, 3), "kind": self.kind}, **self.attrs, stages=stages)
+
+
+def current() -> Optional[Trace]:
+    return _CURRENT.get()
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Geçerli kayda bir aşama süresi ekler (kayıt yoksa yalnızca çalıştırır)."""
+    tr = _CURRENT.get()
+    if tr is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        tr.add(stage, 1e3 * (time.perf_counter() - t0))
+
+def timed_iter(it: Iterable[Any], stage: str) -> Iterator[Any]:
+    """Bir üretecin (ör. PDF çıkarma + parçalama) next() içinde geçirdiği süreyi aşamaya yazar."""
+    tr = _CURRENT.get()
+    if tr is None:
+        yield from it
+        return
+    it = iter(it)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            tr.add(stage, 1e3 * (time.perf_counter() - t0))
+            return
+        tr.add(stage, 1e3 * (time.perf_counter() - t0))
+        yield item
+
+def annotate(**attrs: Any) -> None:
+    tr = _CURRENT.get()
+    if tr is not None:
+        tr.set(**attrs)
+
+@contextmanager
+def trace(kind: str, **attrs: Any) -> Iterator[Trace]:
+    """Bir istek kaydı açar; blok bitince toplayıcıya ve istek günlüğüne yazar."""
+    parent = _CURRENT.get()
+    if parent is not None:
+        attrs.setdefault("parent", parent.kind)
+    tr = Trace(kind, **attrs)
+    token = _CURRENT.set(tr)
+    try:
+        yield tr
+    except BaseException as e:
+        tr.set(error=type(e).__name__)
+        raise
+    finally:
+        try:
+            _CURRENT.reset(token)
+        except ValueError:   # üreteç farklı bir bağlamda kapatıldıysa
+            _CURRENT.set(None)
+        rec = tr.record()
+        get_aggregator().add(kind, rec["stages"])
+        get_request_log().append(rec)
+
+
+# ---- Toplayıcı ----
+def _pct(sorted_vals: List[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    i = min(len(sorted_vals) - 1, max(0, int(round(p / 100.0 * (len(sorted_vals) - 1)))))
+    return sorted_vals[i]
+
+class LatencyAggregator:
+    """Aşama başına son `window` ölçümden p50/p95/p99 (süreç içi)."""
+
+    def __init__(self, window: int = cfg.TELEMETRY_WINDOW) -> None:
+        self.window = max(1, int(window))
+        self._lock = threading.Lock()
+        self._data: Dict[str, Deque[float]] = {}
+
+    def add(self, kind: str, stages: Dict[str, float]) -> None:
+        with self._lock:
+            for stage, ms in stages.items():
+                key = f"{kind}.{stage}"
+                q = self._data.get(key)
+                if q is None:
+                    q = self._data[key] = deque(maxlen=self.window)
+                q.append(float(ms))
+
+    def percentiles(self, kind: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snap = {k: sorted(v) for k, v in self._data.items() if kind is None or k.startswith(kind + ".")}
+        return {
+            k: {"count": len(v), "p50": round(_pct(v, 50), 3), "p95": round(_pct(v, 95), 3),
+                "p99": round(_pct(v, 99), 3), "mean": round(sum(v) / len(v), 3)}
+            for k, v in sorted(snap.items())
+        }
+
+    def report(self, kind: Optional[str] = None) -> str:
+        rows = self.percentiles(kind)
+        lines = [f"{'aşama':<28}{'n':>7}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)"]
+        for k, r in rows.items():
+            lines.append(f"{k:<28}{r['count']:>7}{r['p50']:>10.2f}{r['p95']:>10.2f}{r['p99']:>10.2f}")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# ---- İstek günlüğü ----
+class RequestLog:
+    """JSONL istek günlüğü; satırlar bellekte biriktirilip tek yazımla eklenir."""
+
+    def __init__(self, path: str = cfg.REQUEST_LOG_PATH, batch: int = cfg.REQUEST_LOG_BATCH,
+                 flush_sec: float = cfg.REQUEST_LOG_FLUSH_SEC) -> None:
+        self.path = path
+        self.batch = max(1, int(batch))
+        self.flush_sec = float(flush_sec)
+        self._buf: List[str] = []
+        self._lock = threading.Lock()
+        self._last = time.monotonic()
+        self._timer: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+
+    def append(self, rec: Dict[str, Any]) -> None:
+        if not self.path:
+            return
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._buf.append(line)
+            due = len(self._buf) >= self.batch or time.monotonic() - self._last >= self.flush_sec
+            if self._timer is None and self.flush_sec > 0:
+                self._timer = threading.Thread(target=self._tick, name="request-log", daemon=True)
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def _tick(self) -> None:
+        while True:
+            time.sleep(self.flush_sec)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._buf:
+                return
+            data, self._buf = "\n".join(self._buf) + "\n", []
+            self._last = time.monotonic()
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(data)
+            except OSError:
+                pass
+
+
+_aggregator: Optional[LatencyAggregator] = None
+_log: Optional[RequestLog] = None
+_shared_lock = threading.Lock()
+
+def get_aggregator() -> LatencyAggregator:
+    global _aggregator
+    if _aggregator is None:
+        with _shared_lock:
+            if _aggregator is None:
+                _aggregator = LatencyAggregator()
+    return _aggregator
+
+def get_request_log() -> RequestLog:
+    global _log
+    if _log is None:
+        with _shared_lock:
+            if _log is None:
+                _log = RequestLog()
+    return _log
+
+
+# --------- Çalıştırma ---------
+if __name__ == "__main__":
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else cfg.REQUEST_LOG_PATH
+    agg = LatencyAggregator(window=10**9)
+    n = 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(rec.get("stages"), dict):
+                    agg.add(rec.get("kind", "rag"), rec["stages"])
+                    n += 1
+    except OSError:
+        raise SystemExit(f"❌ Günlük bulunamadı: {path}")
+    print(f"📊 {n} kayıt — {path}")
+    print(agg.report())
@@ -0,0 +1,328 @@
+# tx_store.py
+"""
+Sütunsal (Parquet/Arrow) işlem deposu — data/transactions.csv'nin yerine.
+- Yerleşim: <kök>/user=<kullanıcı>/month=<YYYY-MM>/part-<zaman>-<i>.parquet (hive bölümleme; kullanıcı adı
+  URI kodlu). Sütunlar tiplidir: date (date32), amount (float64), user / merchant (string), seq (int64).
+- seq: deponun yazım sırası (CSV satır sırası, sonra append() sırası); 0'dan artan ve hiç tekrar etmeyen numara.
+  Dosyalar ve load() çıktısı bölüm sırasındadır (kullanıcı, ay), ekleme sırasında değil: "en son eklenenler"
+  ya da "kaldığı yerden devam" (risk_stream.RiskStream.sync) seq ile bulunur, satır konumuyla değil.
+- Okuma: kullanıcı verilirse yalnızca onun klasörü, since/until verilirse yalnızca ilgili ay klasörleri listelenir
+  (bölüm budama); tarih koşulu Parquet satır grubu istatistiklerine itilir (predicate pushdown). Dosyalar bellek
+  eşlemeli (mmap) okunur. Bir kullanıcının yakın geçmişini okumak toplam hacimle büyümez.
+- load() sonuçları deponun _manifest.json'ına (her yazım günceller) göre, read_csv() ise CSV'nin mtime'ına göre
+  önbelleklenir: Streamlit'in her yeniden çizimi diskten okumaz. Dönen DataFrame'ler paylaşılır — değiştirmeyin.
+- convert_csv(): CSV -> depo, tek seferlik ve akışlı (CSV belleğe alınmaz); append(): yeni işlemleri ekler;
+  compact(): eklemelerle çoğalan bölüm dosyalarını birleştirir.
+- pyarrow opsiyoneldir: yoksa available() False döner ve uygulama CSV'ye düşer.
+
+Kullanım: python tx_store.py --convert data/transactions.csv [--root data/transactions] [--compact]
+          python tx_store.py --bench 5000000 [--users 500]
+"""
+
+from __future__ import annotations
+import os, json, time, shutil, threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from config import cfg
+
+COLUMNS = ["user", "date", "amount", "merchant", "seq"]
+CSV_COLUMNS = COLUMNS[:-1]   # kaynak CSV'de seq yok; dönüştürmede satır sırasından verilir
+MANIFEST = "_manifest.json"   # "_" önekli: Arrow bölüm taramasında yok sayılır
+CACHE_ITEMS = 16
+ROW_GROUP = 128 * 1024   # satır; tarih koşulu satır grubu min/max istatistikleriyle budanır
+
+_arrow_mods: Optional[SimpleNamespace] = None
+_cache: "OrderedDict[Hashable, Tuple[Any, pd.DataFrame]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _arrow() -> SimpleNamespace:
+    global _arrow_mods
+    if _arrow_mods is None:
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            import pyarrow.csv as pacsv
+            import pyarrow.dataset as ds
+            import pyarrow.fs as pafs
+            import pyarrow.parquet as pq
+        except Exception:
+            raise RuntimeError("pyarrow kurulu değil. `pip install pyarrow` ile kurun veya CSV kullanın.")
+        _arrow_mods = SimpleNamespace(pa=pa, pc=pc, csv=pacsv, ds=ds, fs=pafs, pq=pq)
+    return _arrow_mods
+
+def available() -> bool:
+    try:
+        _arrow()
+        return True
+    except RuntimeError:
+        return False
+
+def _schema(A: SimpleNamespace, seq: bool = True):
+    pa = A.pa
+    fields = [("user", pa.string()), ("date", pa.date32()), ("amount", pa.float64()), ("merchant", pa.string())]
+    return pa.schema(fields + [("seq", pa.int64())] if seq else fields)
+
+def _with_seq(A: SimpleNamespace, table: Any, start: int) -> Any:
+    return table.append_column("seq", A.pa.array(np.arange(start, start + table.num_rows, dtype=np.int64)))
+
+def _partitioning(A: SimpleNamespace):
+    pa = A.pa
+    return A.ds.partitioning(pa.schema([("user", pa.string()), ("month", pa.string())]), flavor="hive")
+
+def _user_dir(root: str, user: Any) -> str:
+    return os.path.join(root, "user=" + quote(str(user), safe=""))   # Arrow'un hive kodlamasıyla aynı
+
+def _as_day(d: Any) -> date:
+    return d if isinstance(d, date) and not isinstance(d, datetime) else pd.Timestamp(d).date()
+
+
+# ---------------- Önbellek ----------------
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def _cached(key: Hashable, stamp: Any, fn: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            _cache.move_to_end(key)
+            return hit[1]
+    df = fn()
+    with _cache_lock:
+        _cache[key] = (stamp, df)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_ITEMS:
+            _cache.popitem(last=False)
+    return df
+
+def read_csv(path: str) -> pd.DataFrame:
+    """CSV (tarih bir kez çözülür); dosya değişmedikçe önbellekten."""
+    path = os.path.abspath(path)
+    return _cached(("csv", path), _stamp(path), lambda: pd.read_csv(path, parse_dates=["date"]))
+
+
+# ---------------- Depo ----------------
+def exists(root: str = cfg.TX_STORE_DIR) -> bool:
+    return os.path.exists(os.path.join(root, MANIFEST))
+
+def stale(root: str, csv_path: str) -> bool:
+    """CSV depodan sonra değiştiyse True (ör. simulator.py yeniden çalıştırıldı; depo yeniden dönüştürülmeli)."""
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(os.path.join(root, MANIFEST))
+
+def _manifest(root: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(root, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"version": 1, "rows": 0, "writes": 0}
+
+def _touch(root: str, rows: int) -> None:
+    m = _manifest(root)
+    m.update(rows=m["rows"] + rows, writes=m["writes"] + 1, updated=datetime.now().isoformat(timespec="seconds"))
+    tmp = os.path.join(root, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(m, f)
+    os.replace(tmp, os.path.join(root, MANIFEST))
+
+def _write(A: SimpleNamespace, root: str, table: Any) -> int:
+    """Tabloyu bölümlerine yazar. (kullanıcı, tarih) sırası: her bölüm dosyası bir kez açılır, satır grubu
+    tarih aralıkları dar kalır. Zaman damgalı dosya adları: bir bölümdeki dosyaların ad sırası yazım sırasıdır."""
+    table = table.sort_by([("user", "ascending"), ("date", "ascending")])
+    table = table.append_column("month", A.pc.strftime(table["date"], format="%Y-%m"))
+    A.ds.write_dataset(
+        table, root, format="parquet", partitioning=_partitioning(A),
+        basename_template=f"part-{time.time_ns():020d}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        max_partitions=1 << 30, max_open_files=512,
+        max_rows_per_group=ROW_GROUP,
+    )
+    return table.num_rows
+
+def _partitions(root: str) -> List[str]:
+    return [os.path.join(root, u, m)
+            for u in sorted(os.listdir(root)) if u.startswith("user=")
+            for m in sorted(os.listdir(os.path.join(root, u))) if m.startswith("month=")]
+
+def compact(root: str = cfg.TX_STORE_DIR) -> int:
+    """Birden çok dosyalı bölümleri tek dosyada (tarihe göre kararlı sıralı) birleştirir; birleştirilen bölüm sayısı."""
+    A = _arrow()
+    merged = 0
+    for part in _partitions(root):
+        files = sorted(os.path.join(part, p) for p in os.listdir(part) if p.endswith(".parquet"))
+        if len(files) < 2:
+            continue
+        table = A.ds.dataset(files, format="parquet").to_table().sort_by([("date", "ascending"), ("seq", "ascending")])
+        out = os.path.join(part, f"part-{time.time_ns():020d}-0.parquet")
+        A.pq.write_table(table, out + ".tmp", row_group_size=ROW_GROUP)
+        os.replace(out + ".tmp", out)
+        for p in files:
+            os.remove(p)
+        merged += 1
+    if merged and exists(root):
+        _touch(root, 0)
+    return merged
+
+def append(df: pd.DataFrame, root: str = cfg.TX_STORE_DIR) -> int:
+    """İşlemleri depoya ekler (tek yazar varsayılır); eklenen satır sayısı. seq, df sırasıyla devam eder."""
+    A = _arrow()
+    if df.empty:
+        return 0
+    df = df.assign(date=pd.to_datetime(df["date"]).dt.normalize())[CSV_COLUMNS]
+    table = A.pa.Table.from_pandas(df, preserve_index=False).cast(_schema(A, seq=False))
+    table = _with_seq(A, table, _manifest(root)["rows"])   # rows: şimdiye dek yazılan satır = sıradaki seq
+    os.makedirs(root, exist_ok=True)
+    n = _write(A, root, table)
+    _touch(root, n)
+    return n
+
+def convert_csv(csv_path: str, root: str = cfg.TX_STORE_DIR, chunk_rows: int = 2_000_000) -> int:
+    """
+    CSV -> depo (var olan depo değiştirilir). CSV Arrow ile akışlı okunur ve chunk_rows satırlık parçalar
+    halinde yazılır (bellek parça boyutuyla sınırlı); sonra bölümler tek dosyada birleştirilir.
+    Yazım geçici klasöre yapılır, bitince eski deponun yerine geçer.
+    """
+    A = _arrow()
+    if os.path.isdir(root) and os.listdir(root) and not exists(root):
+        raise RuntimeError(f"{root} boş değil ve bir işlem deposu değil; başka bir klasör seçin.")
+    tmp = f"{os.path.abspath(root).rstrip(os.sep)}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    reader = A.csv.open_csv(csv_path, convert_options=A.csv.ConvertOptions(column_types=_schema(A, seq=False)))
+    rows, batches, pending = 0, [], 0
+    for batch in reader:
+        batches.append(batch)
+        pending += batch.num_rows
+        if pending >= chunk_rows:
+            rows += _write(A, tmp, _with_seq(A, A.pa.Table.from_batches(batches).select(CSV_COLUMNS), rows))
+            batches, pending = [], 0
+    if batches:
+        rows += _write(A, tmp, _with_seq(A, A.pa.Table.from_batches(batches).select(CSV_COLUMNS), rows))
+    compact(tmp)
+    _touch(tmp, rows)
+    if os.path.isdir(root):
+        shutil.rmtree(root)
+    os.replace(tmp, root)
+    return rows
+
+def _files(root: str, user: Any, since: Optional[date], until: Optional[date]) -> List[str]:
+    """Bölüm budama: yalnızca istenen kullanıcı ve ay klasörlerindeki dosyalar (ad sırasıyla)."""
+    if user is not None:
+        users = [_user_dir(root, user)]
+    else:
+        users = [os.path.join(root, d) for d in sorted(os.listdir(root)) if d.startswith("user=")]
+    lo = f"month={since:%Y-%m}" if since else ""
+    hi = f"month={until:%Y-%m}" if until else "month=~"
+    out: List[str] = []
+    for u in users:
+        if not os.path.isdir(u):
+            continue
+        for m in sorted(os.listdir(u)):
+            if m.startswith("month=") and lo <= m <= hi:
+                d = os.path.join(u, m)
+                out.extend(os.path.join(d, p) for p in sorted(os.listdir(d)) if p.endswith(".parquet"))
+    return out
+
+def _read(root: str, user: Any, since: Optional[date], until: Optional[date]) -> pd.DataFrame:
+    A = _arrow()
+    files = _files(root, user, since, until)
+    if not files:
+        return pd.DataFrame({"user": pd.Series(dtype=object), "date": pd.Series(dtype="datetime64[ms]"),
+                             "amount": pd.Series(dtype=float), "merchant": pd.Series(dtype=object),
+                             "seq": pd.Series(dtype="int64")})
+    dset = A.ds.dataset(files, format="parquet", partitioning=_partitioning(A), partition_base_dir=root,
+                        filesystem=A.fs.LocalFileSystem(use_mmap=True))
+    cond = None
+    f, pa = A.ds.field, A.pa
+    if since:
+        cond = f("date") >= pa.scalar(since, pa.date32())
+    if until:
+        c = f("date") <= pa.scalar(until, pa.date32())
+        cond = c if cond is None else cond & c
+    table = dset.to_table(columns=COLUMNS, filter=cond)
+    return table.to_pandas(date_as_object=False)   # date -> datetime64 (kurallar tekrar çözmez)
+
+def load(
+    root: str = cfg.TX_STORE_DIR,
+    user: Any = None,
+    since: Any = None,
+    until: Any = None,
+) -> pd.DataFrame:
+    """
+    İşlemler (sütunlar: user, date, amount, merchant, seq); since/until dahil. Depo değişmedikçe önbellekten.
+    Satırlar bölüm sırasındadır (kullanıcı, ay, dosya); yazım sırası için seq'e göre sıralayın.
+    """
+    since = _as_day(since) if since is not None else None
+    until = _as_day(until) if until is not None else None
+    root = os.path.abspath(root)
+    key = ("store", root, None if user is None else str(user), since, until)
+    return _cached(key, _stamp(os.path.join(root, MANIFEST)), lambda: _read(root, user, since, until))
+
+def recent(user: Any, days: int = 3, today: Optional[date] = None, root: str = cfg.TX_STORE_DIR) -> pd.DataFrame:
+    """Kullanıcının son `days` günü (bugün dahil), ör. recent("ogrenci1@uni.edu", 3)."""
+    today = today or datetime.now().date()
+    return load(root, user=user, since=today - timedelta(days=days))
+
+
+# --------- Çalıştırma ---------
+if __name__ == "__main__":
+    import argparse, tempfile
+
+    ap = argparse.ArgumentParser(description="Sütunsal işlem deposu (Parquet, user/month bölümlü)")
+    ap.add_argument("--convert", metavar="CSV", help="CSV'yi depoya dönüştür")
+    ap.add_argument("--root", default=cfg.TX_STORE_DIR)
+    ap.add_argument("--compact", action="store_true", help="çok dosyalı bölümleri birleştir")
+    ap.add_argument("--bench", type=int, metavar="SATIR", help="sentetik depoda okuma süreleri")
+    ap.add_argument("--users", type=int, default=500)
+    args = ap.parse_args()
+
+    if args.convert:
+        t0 = time.perf_counter()
+        n = convert_csv(args.convert, args.root)
+        print(f"✅ {args.convert} -> {args.root}: {n:,} satır, {time.perf_counter() - t0:.2f} sn")
+
+    if args.compact:
+        print(f"🧹 birleştirilen bölüm: {compact(args.root)}")
+
+    if args.bench:
+        n, users = args.bench, args.users
+        rng = np.random.default_rng(0)
+        today = datetime.now().date()
+        df = pd.DataFrame({
+            "user": pd.Categorical.from_codes(rng.integers(0, users, n), [f"user{i}@uni.edu" for i in range(users)]),
+            "date": np.datetime64(today, "D") - rng.integers(0, 3 * 365, n),
+            "amount": np.round(rng.lognormal(4, 1, n), 2),
+            "merchant": pd.Categorical.from_codes(rng.integers(0, 200, n), [f"merchant_{i}" for i in range(200)]),
+        })
+        work = tempfile.mkdtemp(prefix="txstore-")
+        csv_path, root = os.path.join(work, "tx.csv"), os.path.join(work, "store")
+        df.to_csv(csv_path, index=False)
+        t0 = time.perf_counter(); convert_csv(csv_path, root); t_conv = time.perf_counter() - t0
+
+        def _t(fn: Callable[[], pd.DataFrame]) -> Tuple[float, int]:
+            t0 = time.perf_counter()
+            out = fn()
+            return 1e3 * (time.perf_counter() - t0), len(out)
+
+        u, since = "user7@uni.edu", today - timedelta(days=3)
+        since_ts = pd.Timestamp(since)
+        rows = [
+            ("CSV okuma + filtre", _t(lambda: (lambda d: d[(d["user"] == u) & (d["date"] >= since_ts)])(
+                pd.read_csv(csv_path, parse_dates=["date"])))),
+            ("depo: kullanıcı, son 3 gün", _t(lambda: recent(u, 3, today, root))),
+            ("depo: aynısı (önbellek)", _t(lambda: recent(u, 3, today, root))),
+            ("depo: kullanıcı, tüm geçmiş", _t(lambda: load(root, user=u))),
+            ("depo: tümü", _t(lambda: load(root))),
+        ]
+        print(f"🗃️ {n:,} satır, {users:,} kullanıcı | dönüştürme: {t_conv:.2f} sn | "
+              f"CSV {os.path.getsize(csv_path) / 1e6:.0f} MB")
+        for name, (ms, k) in rows:
+            print(f"  {name:<30}{ms:>10.1f} ms{k:>12,} satır")
+        shutil.rmtree(work, ignore_errors=True)
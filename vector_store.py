@@ -0,0 +1,378 @@
+# vector_store.py
+"""
+Süreç içi NumPy vektör indeksi (Chroma'ya alternatif arka uç; cfg.VECTOR_BACKEND="numpy").
+- Embedding'ler birim uzunluğa normalize edilip ham (başlıksız) sabit satırlı dosyalara yazılır:
+  vectors-<nesil>.bin (kodlar), scales-<nesil>.bin (int8 ölçekleri), live-<nesil>.bin (satır canlı mı).
+  Dosyalar np.memmap ile belleğe eşlenir: açılış milisaniyeler sürer, matris RAM'e kopyalanmaz ve aynı
+  dosyaları açan worker süreçleri sayfaları işletim sistemi önbelleğinden paylaşır.
+- Yazmalar yalnızca eklemedir: yeni satırlar dosyanın sonuna yazılır, kapasite büyüme katsayısıyla (GROWTH)
+  önceden ayrılır -> ingest satır başına amortize O(1). Var olan id'nin upsert'ü yeni satır ekler, eskisi
+  "ölü" işaretlenir; ölü oranı COMPACT_RATIO'yu aşınca flush() yeni nesle sıkıştırır.
+- id / doküman / metadata ve satır numarası (slot) SQLite yan dosyasında (meta.sqlite, WAL) tutulur;
+  her yazım yalnızca değişen satırlara dokunur ve kendi kısa işleminde commit edilir (yazma kilidi ingest
+  boyunca tutulmaz). Aramada yalnızca top-k satırın dokümanı okunur.
+- Tutarlılık: okuyucular yalnızca yayımlanmış satır sayısının (info.n) altındaki slotları okur; yeni satırlar
+  flush() info'yu yayımlayınca görünür. Upsert edilen/silinen kaydın eski satırı da flush'a kadar yerinde
+  kalır (aynı id'nin birden çok satırı olabilir, en büyük slot geçerlidir). Sorgular tek bir okuma işlemi
+  (snapshot) içinde yapılır.
+- Arama: matris çarpımı + argpartition ile top-k; mesafe Chroma'nın cosine uzayıyla aynıdır (1 - benzerlik).
+- quant="float16" / "int8" ile matris sıkıştırılmış saklanır (int8: vektör başına ölçek).
+
+Chroma koleksiyonunun retriever'da kullanılan alt kümesini (upsert/update/delete/get/query/count) uygular.
+"""
+
+from __future__ import annotations
+import os, json, time, glob, sqlite3, threading, contextlib
+from typing import Any, Dict, Iterator, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from compress import unit_rows, quantize, dequantize, scores
+
+DB_FILE = "meta.sqlite"
+GROWTH = 1.5                # kapasite dolunca büyüme katsayısı
+MIN_CAPACITY = 1024         # satır
+COMPACT_RATIO = 0.3         # ölü satır oranı bunu aşınca flush() sıkıştırır
+COPY_BLOCK = 65536          # sıkıştırmada bir seferde kopyalanan satır
+SQL_VARS = 500              # IN (...) sorgularında parti boyu
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    slot INTEGER PRIMARY KEY,
+    id   TEXT NOT NULL,
+    doc  TEXT NOT NULL,
+    meta TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rows_id ON rows(id);
+CREATE TABLE IF NOT EXISTS info (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _dtype(quant: str) -> np.dtype:
+    return quantize(np.zeros((0, 1), dtype=np.float32), quant)[0].dtype
+
+def _chunks(seq: Sequence[Any], n: int = SQL_VARS) -> Iterator[Sequence[Any]]:
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+
+class NumpyCollection:
+    def __init__(self, path: str, quant: str = "none") -> None:
+        """
+        :param path: Matris dosyaları ve yan veritabanının klasörü.
+        :param quant: Yeni indeks için saklama tipi ("none" | "float16" | "int8");
+                      var olan indeks kendi tipiyle açılır.
+        """
+        self.path = path
+        self.quant = quant
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._dead: Set[int] = set()     # flush'ta satırı silinip live dosyasında sıfırlanacak slotlar
+        self._dirty = False
+        self._open_db()
+        self.load()
+
+    # ---- kalıcılık ----
+    def _open_db(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.path, DB_FILE), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def _info(self) -> Dict[str, str]:
+        return dict(self._db.execute("SELECT key, value FROM info"))
+
+    def _file(self, kind: str, gen: str) -> str:
+        return os.path.join(self.path, f"{kind}-{gen}.bin")
+
+    def _map(self) -> None:
+        """Mevcut nesil dosyalarını kapasite kadar eşler (kapasite 0 ise boş diziler)."""
+        dt = _dtype(self.quant)
+        if not self._cap:
+            self._vecs = np.zeros((0, self._dim), dtype=dt)
+            self._scales = np.zeros(0, dtype=np.float32)
+            self._live = np.zeros(0, dtype=np.uint8)
+            return
+        self._vecs = np.memmap(self._file("vectors", self._gen), dtype=dt, mode="r+", shape=(self._cap, self._dim))
+        self._scales = np.memmap(self._file("scales", self._gen), dtype=np.float32, mode="r+", shape=(self._cap,))
+        self._live = np.memmap(self._file("live", self._gen), dtype=np.uint8, mode="r+", shape=(self._cap,))
+
+    def load(self) -> bool:
+        with self._lock:
+            info = self._info()
+            self.quant = info.get("quant", self.quant)
+            self._dim = int(info.get("dim", 0))
+            self._gen = info.get("gen", "")
+            self._cap = int(info.get("cap", 0))
+            self._n = int(info.get("n", 0))          # kullanılan slot sayısı (ölüler dahil)
+            self._rows = int(info.get("rows", 0))    # canlı kayıt sayısı
+            self._version = info.get("version", "")
+            self._dead.clear()
+            self._dirty = False
+            self._map()
+            return bool(info)
+
+    def refresh(self) -> None:
+        """Dosyalar başka bir süreçte (ingest/watcher) yazıldıysa yeniden eşler."""
+        if self._dirty:
+            return
+        with self._lock:
+            row = self._db.execute("SELECT value FROM info WHERE key='version'").fetchone()
+            if row is not None and row[0] != self._version:
+                self.load()
+
+    @contextlib.contextmanager
+    def _snapshot(self) -> Iterator[None]:
+        """Okuma işlemi: sorgu boyunca slot numaraları ile eşlenen nesil tutarlı kalır (WAL anlık görüntüsü)."""
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self.refresh()
+                yield
+            finally:
+                self._db.commit()
+
+    def _begin_write(self) -> None:
+        """Flush'tan sonraki ilk yazım: yarıda kalmış (çöken) bir yazarın yayımlanmamış satırları atılır."""
+        if not self._dirty:
+            self._db.execute("DELETE FROM rows WHERE slot >= ?", (self._n,))
+            self._dirty = True
+
+    def _reserve(self, need: int) -> None:
+        """En az `need` slotluk kapasite; dosyalar GROWTH katsayısıyla büyütülür (kopyalama yok)."""
+        if need <= self._cap:
+            return
+        cap = max(need, int(self._cap * GROWTH), MIN_CAPACITY)
+        if not self._gen:
+            self._gen = f"{time.time_ns():x}"
+        for kind, itemsize in (("vectors", self._dim * _dtype(self.quant).itemsize), ("scales", 4), ("live", 1)):
+            with open(self._file(kind, self._gen), "ab") as f:
+                f.truncate(cap * itemsize)   # seyrek dosya: yeni bölge sıfır
+        self._cap = cap
+        self._map()
+
+    def _write_info(self) -> None:
+        self._version = f"{time.time_ns():x}"
+        self._db.executemany("INSERT OR REPLACE INTO info(key, value) VALUES (?,?)", [
+            ("quant", self.quant), ("dim", str(self._dim)), ("gen", self._gen), ("cap", str(self._cap)),
+            ("n", str(self._n)), ("rows", str(self._rows)), ("version", self._version),
+        ])
+
+    def flush(self) -> bool:
+        """Bekleyen yazmaları diske yazar (commit); bir şey yazıldıysa True."""
+        with self._lock:
+            if not self._dirty:
+                return False
+            if self._cap:
+                self._vecs.flush(); self._scales.flush(); self._live.flush()
+            self._write_info()
+            for part in _chunks(sorted(self._dead)):
+                self._db.execute(f"DELETE FROM rows WHERE slot IN ({','.join('?' * len(part))})", list(part))
+            self._db.commit()               # yeni satırlar okuyuculara şimdi görünür, eskileri aynı anda kalkar
+            if self._dead:
+                # live commit'ten sonra: okuyucu bu arada ölü slotu seçebilir, satırı bulamayınca atlar
+                self._live[sorted(self._dead)] = 0
+                self._live.flush()
+                self._dead.clear()
+            self._dirty = False
+            if self._n - self._rows > max(MIN_CAPACITY, COMPACT_RATIO * self._n):
+                self._compact()
+            return True
+
+    def _compact(self) -> None:
+        """Canlı satırları yeni nesle kopyalar, slotları yeniden numaralar; eski nesil dosyaları silinir."""
+        old_gen, old = self._gen, (self._vecs, self._scales)
+        keep = np.flatnonzero(np.asarray(self._live[:self._n]))
+        self._gen, self._cap = f"{time.time_ns():x}", 0
+        self._reserve(max(len(keep), 1))
+        for s in range(0, len(keep), COPY_BLOCK):
+            idx = keep[s:s + COPY_BLOCK]
+            self._vecs[s:s + len(idx)] = old[0][idx]
+            self._scales[s:s + len(idx)] = old[1][idx]
+            self._live[s:s + len(idx)] = 1
+        self._vecs.flush(); self._scales.flush(); self._live.flush()
+        # Artan sırada güncelleme: yeni slot <= eski slot, çakışma olmaz
+        self._db.executemany("UPDATE rows SET slot=? WHERE slot=?", ((j, int(i)) for j, i in enumerate(keep)))
+        self._n = self._rows = len(keep)
+        self._write_info()
+        self._db.commit()
+        del old
+        for p in glob.glob(os.path.join(self.path, f"*-{old_gen}.bin")):
+            try:
+                os.remove(p)   # açık mmap'ler (Linux) silinen dosyayı okumaya devam eder
+            except OSError:
+                pass
+
+    def reset(self) -> None:
+        with self._lock:
+            self._db.close()
+            for p in glob.glob(os.path.join(self.path, "*.bin")) + glob.glob(os.path.join(self.path, DB_FILE + "*")):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            self._open_db()
+            self.load()
+
+    def close(self) -> None:
+        """Bağlantıyı kapatır ve eşlemeleri bırakır (bekleyen yazmalar için önce flush())."""
+        with self._lock:
+            self._cap = 0
+            self._map()
+            self._db.close()
+
+    # ---- Chroma uyumlu arayüz ----
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def count(self) -> int:
+        self.refresh()
+        return self._rows
+
+    def _slots(self, ids: Sequence[str]) -> Dict[str, int]:
+        """id -> geçerli slot: görünür (n'nin altındaki) en büyük slot; ölü işaretliyse kayıt yok sayılır."""
+        out: Dict[str, int] = {}
+        for part in _chunks(list(ids)):
+            q = f"SELECT id, MAX(slot) FROM rows WHERE id IN ({','.join('?' * len(part))}) AND slot < ? GROUP BY id"
+            out.update((i, s) for i, s in self._db.execute(q, list(part) + [self._n]) if s not in self._dead)
+        return out
+
+    def _append(self, ids: Sequence[str], codes: np.ndarray, scales: np.ndarray,
+                docs: Sequence[str], metas: Sequence[Dict[str, Any]]) -> None:
+        """Satırları sona ekler; aynı id'nin eski satırı ölü işaretlenir (yerinde yazma yok)."""
+        last = {id_: r for r, id_ in enumerate(ids)}          # partide tekrar eden id: sonuncusu geçerli
+        rows = sorted(last.values())
+        self._begin_write()
+        old = self._slots([ids[r] for r in rows])
+        self._dead.update(old.values())
+        if not self._dim:
+            self._dim = int(codes.shape[1])
+        start = self._n
+        self._reserve(start + len(rows))
+        self._vecs[start:start + len(rows)] = codes[rows]
+        self._scales[start:start + len(rows)] = scales[rows]
+        self._live[start:start + len(rows)] = 1
+        # Eski satır flush'a kadar kalır: okuyucular (n'nin altı) onu görmeye devam eder
+        self._db.executemany("INSERT INTO rows(slot, id, doc, meta) VALUES (?,?,?,?)", [
+            (start + j, ids[r], docs[r], json.dumps(dict(metas[r]), ensure_ascii=False)) for j, r in enumerate(rows)
+        ])
+        self._db.commit()
+        self._n += len(rows)
+        self._rows += len(rows) - len(old)
+
+    def upsert(self, ids: Sequence[str], embeddings: Sequence[Sequence[float]],
+               documents: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> None:
+        with self._lock:
+            codes, scales = quantize(unit_rows(embeddings), self.quant)
+            if self._dim and codes.shape[1] != self._dim:
+                raise ValueError(f"Embedding boyutu uyuşmuyor: {codes.shape[1]} != {self._dim}")
+            self._append(list(ids), codes, scales, list(documents), list(metadatas))
+
+    def update(self, ids: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._begin_write()
+            self._db.executemany("UPDATE rows SET meta=? WHERE id=?",
+                                 [(json.dumps(dict(m), ensure_ascii=False), i) for i, m in zip(ids, metadatas)])
+            self._db.commit()
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            old = self._slots(ids)
+            if not old:
+                return
+            self._begin_write()
+            self._db.commit()
+            self._dead.update(old.values())   # satırlar flush'ta silinir
+            self._rows -= len(old)
+
+    def _fetch(self, slots: Sequence[int]) -> Dict[int, Tuple[str, str, Dict[str, Any]]]:
+        out: Dict[int, Tuple[str, str, Dict[str, Any]]] = {}
+        for part in _chunks([int(s) for s in slots]):
+            q = f"SELECT slot, id, doc, meta FROM rows WHERE slot IN ({','.join('?' * len(part))})"
+            for slot, id_, doc, meta in self._db.execute(q, list(part)):
+                out[slot] = (id_, doc, json.loads(meta))
+        return out
+
+    def get(self, ids: Optional[Sequence[str]] = None, include: Sequence[str] = ("documents", "metadatas"),
+            limit: Optional[int] = None, offset: int = 0) -> Dict[str, Any]:
+        """Chroma'daki gibi; ids verilmezse limit/offset ile sayfa sayfa okunabilir."""
+        with self._snapshot():
+            if ids is None:
+                q = "SELECT slot, id, doc, meta FROM rows WHERE slot < ? ORDER BY slot"
+                if self._dead:   # yazarın flush'lanmamış ölüleri: sayfalama Python'da
+                    rows = [(slot, id_, doc, json.loads(meta)) for slot, id_, doc, meta
+                            in self._db.execute(q, (self._n,)) if slot not in self._dead]
+                    rows = rows[int(offset):None if limit is None else int(offset) + int(limit)]
+                else:
+                    rows = [(slot, id_, doc, json.loads(meta)) for slot, id_, doc, meta
+                            in self._db.execute(q + " LIMIT ? OFFSET ?",
+                                                (self._n, -1 if limit is None else int(limit), int(offset)))]
+            else:
+                by_slot = self._fetch(list(self._slots(ids).values()))
+                rows = [(slot,) + by_slot[slot] for slot in sorted(by_slot)]
+            out: Dict[str, Any] = {"ids": [r[1] for r in rows]}
+            if "documents" in include:
+                out["documents"] = [r[2] for r in rows]
+            if "metadatas" in include:
+                out["metadatas"] = [r[3] for r in rows]
+            if "embeddings" in include:
+                slots = [r[0] for r in rows]
+                out["embeddings"] = dequantize(np.asarray(self._vecs[slots]), np.asarray(self._scales[slots]))
+            return out
+
+    def query(self, query_embeddings: Sequence[Sequence[float]], n_results: int = 5,
+              include: Sequence[str] = ("documents", "metadatas", "distances")) -> Dict[str, Any]:
+        q = unit_rows(query_embeddings)
+        with self._snapshot():
+            n = self._n
+            res: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            if not self._rows:
+                for _ in range(len(q)):
+                    for key in res:
+                        res[key].append([])
+                return res
+            if q.shape[1] != self._dim:
+                raise ValueError(f"Sorgu boyutu uyuşmuyor: {q.shape[1]} != {self._dim}")
+            sims = scores(self._vecs[:n], self._scales[:n], q)             # (sorgu, N)
+            dead = np.asarray(self._live[:n]) == 0
+            if self._dead:
+                dead[[s for s in self._dead if s < n]] = True
+            sims[:, dead] = -np.inf
+            k = min(int(n_results), self._rows)
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (len(q), 1))
+            picked = [top[qi][np.argsort(-sims[qi, top[qi]], kind="stable")] for qi in range(len(q))]
+            rows = self._fetch(sorted({int(i) for idx in picked for i in idx}))
+            for qi, idx in enumerate(picked):
+                idx = [int(i) for i in idx if int(i) in rows][:k]   # başka süreçte silinmiş satırlar atlanır
+                res["ids"].append([rows[i][0] for i in idx])
+                res["documents"].append([rows[i][1] for i in idx])
+                res["metadatas"].append([rows[i][2] for i in idx])
+                res["distances"].append([float(1.0 - sims[qi, i]) for i in idx])
+            return res
+
+
+# --------- Hızlı test ---------
+if __name__ == "__main__":
+    import sys, tempfile
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as d:
+        col = NumpyCollection(d, quant=sys.argv[1] if len(sys.argv) > 1 else "none")
+        n, dim, batch = 20000, 768, 64
+        t0 = time.perf_counter()
+        for s in range(0, n, batch):   # ingest gibi küçük partiler: toplam süre satır sayısıyla doğrusal
+            col.upsert(ids=[f"d-{i}" for i in range(s, s + batch)], embeddings=rng.standard_normal((batch, dim)),
+                       documents=[f"doc {i}" for i in range(s, s + batch)],
+                       metadatas=[{"chunk": i} for i in range(s, s + batch)])
+        col.flush()
+        t1 = time.perf_counter()
+        col2 = NumpyCollection(d)
+        t2 = time.perf_counter()
+        res = col2.query(rng.standard_normal((1, dim)), n_results=5)
+        t3 = time.perf_counter()
+        print(f"✍️ {n:,} satır ({batch}'lik partiler): {t1 - t0:.2f} sn | 📂 açılış: {1e3 * (t2 - t1):.1f} ms | "
+              f"🔎 sorgu: {1e3 * (t3 - t2):.2f} ms | {res['ids'][0]}")
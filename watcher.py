@@ -0,0 +1,283 @@
+# watcher.py
+"""
+data/docs için izleme (watch) modu.
+- DOCS_DIR alt klasörleriyle birlikte izlenir: inotify_simple kuruluysa inotify, değilse yoklama (polling).
+  inotify kullanılsa da kaçan olaylara karşı seyrek bir tam tarama yapılır.
+- Olay patlamaları debounce edilir: bir dosya `debounce` sn sessiz kalınca (ya da ilk olayından
+  beri `max_delay` sn geçince) kuyruktan alınır; hazır dosyalar tek partide ingest_docs(paths=...) ile işlenir.
+- Başarısız parti kaybolmaz: dosyalar kuyruğa geri konur ve üstel bekleme (RETRY_BASE..RETRY_MAX) sonrası
+  tekrar denenir (anlık görüntü zaten ilerlediği için aksi halde dosya yeniden düzenlenene kadar işlenmezdi).
+- status(): kuyruk derinliği, gecikme (lag) ve son partilerin süreleri.
+
+Kullanım: python ingest.py --watch   (ya da python watcher.py)
+"""
+
+from __future__ import annotations
+import os, time, json, threading, traceback
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import cfg
+
+try:
+    from inotify_simple import INotify, flags as _inflags   # opsiyonel, yalnızca Linux
+    HAS_INOTIFY = True
+except Exception:
+    HAS_INOTIFY = False
+
+POLL_INTERVAL = 1.0     # yoklama aralığı (sn)
+DEBOUNCE = 2.0          # dosya bu kadar sessiz kalınca işlenir (sn)
+MAX_DELAY = 30.0        # sürekli değişen dosya en geç bu kadar sonra işlenir (sn)
+MAX_BATCH = 64          # bir partide işlenecek en fazla dosya
+RESCAN_EVERY = 60.0     # inotify modunda güvenlik amaçlı tam tarama aralığı (sn)
+RETRY_BASE = 5.0        # başarısız partiden sonra ilk bekleme (sn); ardışık hatalarda ikiye katlanır
+RETRY_MAX = 300.0       # en uzun bekleme (sn)
+
+Snapshot = Dict[str, Tuple[int, int]]   # yol -> (boyut, mtime_ns)
+
+
+def _is_doc(name: str) -> bool:
+    return name.lower().endswith((".txt", ".pdf")) and not name.startswith((".", "~$"))
+
+def snapshot(root: str) -> Snapshot:
+    snap: Snapshot = {}
+    for dirpath, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for n in names:
+            if not _is_doc(n):
+                continue
+            p = os.path.join(dirpath, n)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            snap[p] = (st.st_size, st.st_mtime_ns)
+    return snap
+
+def diff(old: Snapshot, new: Snapshot) -> List[str]:
+    """Eklenen, değişen ya da silinen dosyalar."""
+    changed = [p for p, sig in new.items() if old.get(p) != sig]
+    changed += [p for p in old if p not in new]
+    return changed
+
+
+class _InotifySource:
+    """Alt klasörlere de watch ekleyen basit inotify sarmalayıcı."""
+
+    def __init__(self, root: str) -> None:
+        self.ino = INotify()
+        self.mask = (_inflags.CREATE | _inflags.MODIFY | _inflags.CLOSE_WRITE | _inflags.DELETE
+                     | _inflags.MOVED_FROM | _inflags.MOVED_TO | _inflags.DELETE_SELF)
+        self.wd: Dict[int, str] = {}
+        for dirpath, dirs, _ in os.walk(root):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            self._add(dirpath)
+
+    def _add(self, path: str) -> None:
+        try:
+            self.wd[self.ino.add_watch(path, self.mask)] = path
+        except OSError:
+            pass
+
+    def read(self, timeout: float) -> List[str]:
+        out: List[str] = []
+        for ev in self.ino.read(timeout=int(timeout * 1000)):
+            base = self.wd.get(ev.wd)
+            if base is None or not ev.name:
+                continue
+            p = os.path.join(base, ev.name)
+            if ev.mask & _inflags.ISDIR:
+                if ev.mask & (_inflags.CREATE | _inflags.MOVED_TO):
+                    self._add(p)
+                    out.extend(snapshot(p))   # klasörle birlikte gelen dosyalar
+                continue
+            if _is_doc(ev.name):
+                out.append(p)
+        return out
+
+    def close(self) -> None:
+        self.ino.close()
+
+
+class DocsWatcher:
+    def __init__(
+        self,
+        root: str = cfg.DOCS_DIR,
+        ingest_fn: Optional[Callable[[List[str]], int]] = None,
+        poll_interval: float = POLL_INTERVAL,
+        debounce: float = DEBOUNCE,
+        max_delay: float = MAX_DELAY,
+        max_batch: int = MAX_BATCH,
+        use_inotify: Optional[bool] = None,
+        status_path: Optional[str] = None,
+    ) -> None:
+        """
+        :param root: İzlenecek klasör (alt klasörler dahil).
+        :param ingest_fn: Hazır dosya partisini işleyen fonksiyon (varsayılan: ingest.ingest_docs(paths=...)).
+                          Hata durumunda fırlatmalıdır; parti kuyruğa geri konup tekrar denenir.
+        :param poll_interval: Yoklama / inotify okuma aralığı (sn).
+        :param debounce: Dosya bu kadar sessiz kalınca işlenir (sn).
+        :param max_delay: İlk olaydan sonra en fazla bekleme (sn).
+        :param max_batch: Bir partideki en fazla dosya.
+        :param use_inotify: None -> kuruluysa kullan.
+        :param status_path: Verilirse status() her partiden sonra bu JSON dosyasına yazılır.
+        """
+        self.root = root
+        self.ingest_fn = ingest_fn or _default_ingest
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.max_batch = max(1, max_batch)
+        self.use_inotify = HAS_INOTIFY if use_inotify is None else (use_inotify and HAS_INOTIFY)
+        self.status_path = status_path
+
+        # bekleyen dosya -> (ilk olay zamanı, son olay zamanı)
+        self._pending: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snap: Snapshot = {}
+        self.batches = 0
+        self.files_ingested = 0
+        self.chunks_written = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self._retry_at = 0.0          # monotonic; hata sonrası bu ana kadar parti alınmaz
+        self.last_batch_size = 0
+        self.last_batch_seconds = 0.0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    # ---- olay kuyruğu ----
+    def notify(self, paths: Iterable[str], now: Optional[float] = None) -> None:
+        """Dışarıdan ya da kaynaklardan gelen dosya olaylarını kuyruğa ekler."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for p in paths:
+                first, _ = self._pending.get(p, (now, now))
+                self._pending[p] = (first, now)
+
+    def _take_ready(self, now: float) -> Dict[str, Tuple[float, float]]:
+        """Hazır dosyalar ve kuyruk zamanları (hata olursa _requeue ile geri konur)."""
+        if now < self._retry_at:
+            return {}
+        with self._lock:
+            ready = [p for p, (first, last) in self._pending.items()
+                     if now - last >= self.debounce or now - first >= self.max_delay]
+            ready.sort(key=lambda p: self._pending[p][0])
+            ready = ready[: self.max_batch]
+            if ready:
+                self.last_lag = now - min(self._pending[p][0] for p in ready)
+                self.max_lag = max(self.max_lag, self.last_lag)
+            return {p: self._pending.pop(p) for p in ready}
+
+    def _requeue(self, taken: Dict[str, Tuple[float, float]]) -> None:
+        with self._lock:
+            for p, (first, last) in taken.items():
+                cur = self._pending.get(p)
+                # İngest sürerken yeni olay geldiyse ilk olay zamanı korunur, son olay yenisi olur
+                self._pending[p] = (min(first, cur[0]), max(last, cur[1])) if cur else (first, last)
+
+    def status(self) -> Dict[str, float]:
+        now = time.monotonic()
+        with self._lock:
+            depth = len(self._pending)
+            oldest = min((f for f, _ in self._pending.values()), default=None)
+        return {
+            "backend": "inotify" if self.use_inotify else "polling",
+            "queue_depth": depth,
+            "lag_seconds": round(now - oldest, 3) if oldest is not None else 0.0,
+            "last_batch_lag_seconds": round(self.last_lag, 3),
+            "max_lag_seconds": round(self.max_lag, 3),
+            "last_batch_size": self.last_batch_size,
+            "last_batch_seconds": round(self.last_batch_seconds, 3),
+            "batches": self.batches,
+            "files_ingested": self.files_ingested,
+            "chunks_written": self.chunks_written,
+            "errors": self.errors,
+            "retry_in_seconds": round(max(0.0, self._retry_at - now), 3),
+        }
+
+    # ---- çalışma döngüsü ----
+    def _flush(self, now: float) -> None:
+        taken = self._take_ready(now)
+        if not taken:
+            return
+        batch = list(taken)
+        t0 = time.time()
+        try:
+            self.chunks_written += int(self.ingest_fn(batch) or 0)
+        except Exception:
+            self.errors += 1
+            self.consecutive_errors += 1
+            wait = min(RETRY_MAX, RETRY_BASE * 2 ** (self.consecutive_errors - 1))
+            self._retry_at = time.monotonic() + wait
+            self._requeue(taken)
+            print(f"❌ watcher: parti işlenemedi, {wait:.0f} sn sonra tekrar denenecek\n"
+                  + traceback.format_exc(), flush=True)
+        else:
+            self.consecutive_errors = 0
+            self.files_ingested += len(batch)
+            self.batches += 1
+            self.last_batch_size = len(batch)
+            self.last_batch_seconds = time.time() - t0
+            print(f"👀 watcher: {len(batch)} dosya işlendi | {self.status()}", flush=True)
+        self._write_status()
+
+    def _write_status(self) -> None:
+        if not self.status_path:
+            return
+        tmp = self.status_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.status_path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(dict(self.status(), updated_at=time.time()), f)
+            os.replace(tmp, self.status_path)
+        except OSError:
+            pass
+
+    def run_forever(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        self._snap = snapshot(self.root)
+        source = _InotifySource(self.root) if self.use_inotify else None
+        last_scan = time.monotonic()
+        print(f"👀 watcher başladı — {self.root} ({'inotify' if source else 'polling'})", flush=True)
+        try:
+            while not self._stop.is_set():
+                if source is not None:
+                    self.notify(source.read(timeout=self.poll_interval))
+                else:
+                    self._stop.wait(self.poll_interval)
+                now = time.monotonic()
+                if source is None or now - last_scan >= RESCAN_EVERY:
+                    new = snapshot(self.root)
+                    self.notify(diff(self._snap, new), now=now)
+                    self._snap, last_scan = new, now
+                self._flush(time.monotonic())
+        finally:
+            if source is not None:
+                source.close()
+
+    def start(self) -> "DocsWatcher":
+        """Arka plan thread'inde çalıştırır."""
+        self._thread = threading.Thread(target=self.run_forever, name="docs-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def _default_ingest(paths: List[str]) -> int:
+    from ingest import ingest_docs   # döngüsel import'tan kaçınmak için geç yükleme
+    return ingest_docs(verbose=False, paths=paths, raise_errors=True)
+
+
+# --------- Çalıştırma ---------
+if __name__ == "__main__":
+    w = DocsWatcher(status_path=os.path.join(cfg.ROOT_DIR, ".cache", "watch_status.json"))
+    try:
+        w.run_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 watcher durdu:", w.status())